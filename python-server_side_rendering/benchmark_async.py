@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+"""
+Load test the sync (task_04_db) and async (task_05_async) product pages.
+
+Both apps are served over HTTP by a threaded Werkzeug server, as with
+`app.run()`, against a generated catalog. Many concurrent clients mix fast
+requests on the cached json source with SQL lookups that are slowed down
+by --delay ms to simulate a congested database: every query holds its
+pooled connection that much longer. Latency percentiles are printed per
+app, per kind of request and over all requests.
+
+Usage: ./benchmark_async.py [--clients 500] [--requests 20] [--delay 50]
+"""
+import argparse
+from contextlib import contextmanager
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+
+def percentile(values, fraction):
+    """Return the value below which `fraction` of the sorted values fall."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def build_catalog(rows):
+    """Write products.json and products.db to the current directory."""
+    import create_database
+
+    products = [{'id': i, 'name': f'Product {i}',
+                 'category': f'Category {i % 10}', 'price': i * 0.5}
+                for i in range(1, rows + 1)]
+    with open('products.json', 'w') as f:
+        json.dump(products, f)
+    create_database.import_products('products.json')
+
+
+def load_test(app, clients, requests, slow_share, rows):
+    """
+    Run concurrent clients against an app served on a local port.
+
+    Args:
+        app: The Flask application
+        clients (int): Number of concurrent client threads
+        requests (int): Requests sent by each client
+        slow_share (float): Fraction of requests hitting the slow source
+        rows (int): Highest product id
+
+    Returns:
+        dict: Latencies in seconds, keyed by 'fast' and 'slow'
+    """
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.socket.listen(clients)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.socket.getsockname()[1]
+
+    latencies = {'fast': [], 'slow': []}
+    errors = []
+    start_line = threading.Barrier(clients)
+
+    def client(index):
+        rng = random.Random(index)
+        start_line.wait()
+        for _ in range(requests):
+            if rng.random() < slow_share:
+                kind = 'slow'
+                path = f'/products?source=sql&id={rng.randint(1, rows)}'
+            else:
+                kind = 'fast'
+                path = f'/products?source=json&id={rng.randint(1, rows)}'
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port,
+                                                  timeout=60)
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    errors.append(response.status)
+            except OSError as e:
+                errors.append(e)
+                continue
+            latencies[kind].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    latencies['errors'] = errors
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--delay', type=float, default=50,
+                        help="milliseconds added to every SQL lookup")
+    parser.add_argument('--slow-share', type=float, default=0.2)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        build_catalog(args.rows)
+
+        import task_04_db
+        import task_05_async
+
+        # Slow down the database, as seen by both apps: every query holds
+        # its pooled connection for --delay ms longer
+        connection = task_04_db.db_pool.connection
+
+        @contextmanager
+        def slow_connection():
+            with connection() as conn:
+                time.sleep(args.delay / 1000)
+                yield conn
+        task_04_db.db_pool.connection = slow_connection
+
+        print(f"{args.clients} clients x {args.requests} requests, "
+              f"{args.slow_share:.0%} on a source slowed by {args.delay}ms")
+        print(f"{'app':<6} {'kind':<5} {'count':>6} {'p50 ms':>8} "
+              f"{'p95 ms':>8} {'p99 ms':>8}")
+        for name, app in (('sync', task_04_db.app),
+                          ('async', task_05_async.app)):
+            result = load_test(app, args.clients, args.requests,
+                               args.slow_share, args.rows)
+            result['all'] = result['fast'] + result['slow']
+            for kind in ('fast', 'slow', 'all'):
+                values = result[kind]
+                if not values:
+                    continue
+                print(f"{name:<6} {kind:<5} {len(values):>6} "
+                      f"{percentile(values, 0.50) * 1000:>8.1f} "
+                      f"{percentile(values, 0.95) * 1000:>8.1f} "
+                      f"{percentile(values, 0.99) * 1000:>8.1f}")
+            if result['errors']:
+                print(f"{name:<6} {len(result['errors'])} failed requests")
+        os.chdir(HERE)
+
+
+if __name__ == '__main__':
+    main()
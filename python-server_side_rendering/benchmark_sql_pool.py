@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""
+Benchmark /products?source=sql&id=N with pooled vs per-request connections.
+
+Builds a throwaway products.db, then drives the Flask app from several
+threads, first with the original connect-per-request behavior and then
+with the shared connection pool, and prints requests/sec for each.
+
+Usage: ./benchmark_sql_pool.py [--rows N] [--threads N] [--seconds S]
+"""
+import argparse
+from contextlib import closing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import task_04_db  # noqa: E402
+from db_pool import SQLitePool  # noqa: E402
+
+
+def build_database(path, rows):
+    """
+    Create a products.db with `rows` generated products.
+
+    Args:
+        path (str): Path of the database to create
+        rows (int): Number of products to insert
+    """
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+        CREATE TABLE Products (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price REAL NOT NULL
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO Products VALUES (?, ?, ?, ?)',
+        ((i, f'Product {i}', f'Category {i % 10}', i * 0.5)
+         for i in range(1, rows + 1)))
+    conn.commit()
+    conn.close()
+
+
+class ConnectPerRequest:
+    """Stand-in pool reproducing the original connect/close per call."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def connection(self):
+        return closing(sqlite3.connect(self.path))
+
+
+def run(pool, rows, threads, seconds):
+    """
+    Hammer /products?source=sql&id=N from several threads.
+
+    Args:
+        pool: Object providing connection(), installed as task_04_db.db_pool
+        rows (int): Highest product id to request
+        threads (int): Number of client threads
+        seconds (float): Duration of the run
+
+    Returns:
+        float: Requests per second
+    """
+    task_04_db.db_pool = pool
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        client = task_04_db.app.test_client()
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            product_id = rng.randint(1, rows)
+            response = client.get(f'/products?source=sql&id={product_id}')
+            assert response.status_code == 200
+            counts[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.db')
+        build_database(path, args.rows)
+        os.chdir(HERE)  # templates/ is resolved relative to the app
+
+        baseline = run(ConnectPerRequest(path), args.rows,
+                       args.threads, args.seconds)
+        pool = SQLitePool(path, size=args.threads)
+        pooled = run(pool, args.rows, args.threads, args.seconds)
+        stats = pool.stats()
+        pool.close()
+
+    print(f"connect-per-request: {baseline:10.1f} req/s")
+    print(f"pooled:              {pooled:10.1f} req/s "
+          f"({pooled / baseline:.2f}x)")
+    print(f"pool stats: {stats}")
+
+
+if __name__ == '__main__':
+    main()
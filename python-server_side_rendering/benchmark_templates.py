@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+Benchmark cold-start template compilation of the Flask apps.
+
+Each scenario runs in a fresh interpreter, so nothing is shared between
+them except the on-disk bytecode cache:
+
+    lazy      templates compiled on the first request (previous behavior)
+    warmup    templates compiled while the app is created
+    bytecode  warmup loading compiled templates from a bytecode cache
+              filled by an earlier process
+
+For each scenario the app creation time and the latency of the first
+request to every page are printed.
+
+Usage: ./benchmark_templates.py [--app task_02_logic] [--runs N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Run in a fresh interpreter: create the app, then time the first requests
+PROBE = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+created = time.perf_counter() - start
+client = module.app.test_client()
+first = {}
+for path in sys.argv[2:]:
+    start = time.perf_counter()
+    client.get(path)
+    first[path] = time.perf_counter() - start
+print(json.dumps({"created": created, "first": first}))
+'''
+
+PAGES = {
+    'task_01_jinja': ['/', '/about', '/contact'],
+    'task_02_logic': ['/', '/about', '/contact', '/items'],
+    'task_03_files': ['/products?source=json', '/products?source=csv'],
+    'task_04_db': ['/products?source=json', '/products?source=sql'],
+}
+
+
+def probe(app, env):
+    """
+    Time app creation and first requests in a new interpreter.
+
+    Args:
+        app (str): Module name of the Flask app
+        env (dict): Extra environment variables
+
+    Returns:
+        dict: created (seconds) and first (seconds per page)
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, app] + PAGES[app],
+        cwd=HERE, env={**os.environ, **env},
+        capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--app', choices=sorted(PAGES),
+                        default='task_02_logic')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        scenarios = {
+            'lazy': {'JINJA_WARMUP': '0'},
+            'warmup': {'JINJA_WARMUP': '1'},
+            'bytecode': {'JINJA_WARMUP': '1',
+                         'JINJA_BYTECODE_CACHE_DIR': cache_dir},
+        }
+        # Fill the bytecode cache once, as a previous worker would have
+        probe(args.app, scenarios['bytecode'])
+
+        print(f"{'scenario':<10} {'create ms':>10} {'1st req ms':>11} "
+              f"{'slowest ms':>11}")
+        for name, env in scenarios.items():
+            runs = [probe(args.app, env) for _ in range(args.runs)]
+            created = min(run['created'] for run in runs) * 1000
+            total = min(sum(run['first'].values()) for run in runs) * 1000
+            slowest = min(max(run['first'].values()) for run in runs) * 1000
+            print(f"{name:<10} {created:>10.1f} {total:>11.1f} "
+                  f"{slowest:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/python3
+"""
+Columnar binary snapshot of a product catalog, loaded with mmap.
+
+Parsing products.json or products.csv builds one dict per product and
+converts every id and price. A snapshot instead stores the catalog as
+columns: ids and prices as packed arrays, names and categories as indexes
+into a table of unique strings. Loading one maps the file read-only, so
+it costs no parsing, and every worker process shares the same pages.
+
+A snapshot records the version of the source file it was built from and
+is ignored once that file changes.
+
+Usage: ./catalog_snapshot.py products.json [products.csv ...]
+"""
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+import logging
+import mmap
+import os
+import struct
+import sys
+
+from product_cache import file_version
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PRODSNAP'
+FORMAT_VERSION = 1
+FIELDS = {'id', 'name', 'category', 'price'}
+
+# magic, byte order, format version, product count, string count,
+# string data size, then the (inode, size, mtime_ns) of the source file
+HEADER = struct.Struct('<8s2s2xIQQQQQq')
+
+
+def _layout(count, strings, blob_size):
+    """
+    Compute where each column lives in a snapshot file.
+
+    Every column starts on an 8-byte boundary after the header.
+
+    Args:
+        count (int): Number of products
+        strings (int): Number of strings in the string table
+        blob_size (int): Size of the encoded strings, in bytes
+
+    Returns:
+        list: (name, typecode, offset, length) of each column
+    """
+    columns = [('ids', 'q', count), ('prices', 'd', count),
+               ('names', 'I', count), ('categories', 'I', count),
+               ('offsets', 'Q', strings + 1), ('blob', 'B', blob_size)]
+    layout = []
+    offset = HEADER.size
+    for name, typecode, length in columns:
+        offset = (offset + 7) & ~7
+        layout.append((name, typecode, offset, length))
+        offset += length * array(typecode).itemsize
+    return layout
+
+
+def export_snapshot(products, path, source_version=None):
+    """
+    Write products to a snapshot file.
+
+    The file is written next to its destination and renamed into place,
+    so workers never map a partial snapshot.
+
+    Args:
+        products (iterable): Product dictionaries with exactly the id,
+                             name, category and price keys
+        path (str): Path of the snapshot file
+        source_version (tuple): file_version() of the source the products
+                                were read from
+
+    Returns:
+        int: Number of products written
+
+    Raises:
+        ValueError: If a product cannot be stored in a snapshot
+    """
+    ids = array('q')
+    prices = array('d')
+    names = array('I')
+    categories = array('I')
+    table = {}
+    strings = []
+
+    def intern(value):
+        if not isinstance(value, str):
+            raise TypeError(f"expected a string, got {value!r}")
+        index = table.get(value)
+        if index is None:
+            index = table[value] = len(strings)
+            strings.append(value.encode('utf-8'))
+        return index
+
+    for number, product in enumerate(products, start=1):
+        try:
+            if product.keys() != FIELDS:
+                raise KeyError(sorted(product.keys() ^ FIELDS))
+            ids.append(product['id'])
+            prices.append(product['price'])
+            names.append(intern(product['name']))
+            categories.append(intern(product['category']))
+        except (AttributeError, KeyError, TypeError, OverflowError) as e:
+            raise ValueError(f"Invalid product #{number}: {e!r}")
+
+    offsets = array('Q', accumulate((len(s) for s in strings), initial=0))
+    blob = b''.join(strings)
+    columns = {'ids': ids, 'prices': prices, 'names': names,
+               'categories': categories, 'offsets': offsets, 'blob': blob}
+    byteorder = b'le' if sys.byteorder == 'little' else b'be'
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, byteorder, FORMAT_VERSION, len(ids),
+                                len(strings), len(blob),
+                                *(source_version or (0, 0, 0))))
+            for name, typecode, offset, length in _layout(
+                    len(ids), len(strings), len(blob)):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(columns[name])
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(ids)
+
+
+class ProductSnapshot(Sequence):
+    """
+    Read-only product sequence backed by a memory-mapped snapshot file.
+
+    Products are built as dictionaries when accessed; `column()` gives
+    the Catalog indexes direct access to a field of every product.
+
+    Attributes:
+        source_version (tuple): Version of the source file, or None
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the snapshot file
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not a valid snapshot for this machine
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"{path} is not a product snapshot")
+        (magic, byteorder, version, count, strings, blob_size,
+         *source_version) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a product snapshot")
+        if byteorder != (b'le' if sys.byteorder == 'little' else b'be'):
+            raise ValueError(f"{path} was written on another byte order")
+        self.source_version = tuple(source_version) \
+            if any(source_version) else None
+
+        view = memoryview(self._mmap)
+        for name, typecode, offset, length in _layout(count, strings,
+                                                      blob_size):
+            end = offset + length * array(typecode).itemsize
+            if end > len(self._mmap):
+                raise ValueError(f"{path} is truncated")
+            setattr(self, f'_{name}', view[offset:end].cast(typecode))
+        self._strings = [None] * strings
+
+    def _string(self, index):
+        """Decode a string of the string table, once."""
+        value = self._strings[index]
+        if value is None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            value = self._strings[index] = \
+                sys.intern(str(self._blob[start:end], 'utf-8'))
+        return value
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            'id': self._ids[index],
+            'name': self._string(self._names[index]),
+            'category': self._string(self._categories[index]),
+            'price': self._prices[index]
+        }
+
+    def column(self, field):
+        """
+        Return one field of every product, in snapshot order.
+
+        Args:
+            field (str): 'id', 'name', 'category' or 'price'
+
+        Returns:
+            Sequence: The field values
+        """
+        if field == 'id':
+            return self._ids
+        if field == 'price':
+            return self._prices
+        if field in ('name', 'category'):
+            indexes = self._names if field == 'name' else self._categories
+            # Decode each distinct string once, then map indexes to them
+            table = {i: self._string(i) for i in set(indexes)}
+            return list(map(table.__getitem__, indexes))
+        return [None] * len(self)
+
+
+def load_snapshot(path, source_version=None):
+    """
+    Map a snapshot file, if it is current.
+
+    Args:
+        path (str): Path of the snapshot file
+        source_version (tuple): Required version of its source file, or
+                                None to accept any snapshot
+
+    Returns:
+        ProductSnapshot: The products, or None if the snapshot is missing,
+                         invalid or out of date
+    """
+    try:
+        snapshot = ProductSnapshot(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring snapshot %s: %s", path, e)
+        return None
+    if source_version is not None and \
+            snapshot.source_version != tuple(source_version):
+        return None
+    return snapshot
+
+
+def snapshot_loader(path, reader, write=False):
+    """
+    Wrap a product loader to use the snapshot of its source file.
+
+    Args:
+        path (str): Path of the source file, e.g. 'products.json'; its
+                    snapshot is path + '.snap'
+        reader (callable): Parses the source file, returning the product
+                           list or None on error
+        write (bool): Write a snapshot after parsing the source, for the
+                      next processes to load
+
+    Returns:
+        callable: Loader returning the products, or None on error
+    """
+    snapshot_path = path + '.snap'
+
+    def load():
+        version = file_version(path)
+        if version is not None:
+            snapshot = load_snapshot(snapshot_path, version)
+            if snapshot is not None:
+                return snapshot
+
+        products = reader()
+        # Only snapshot a source that did not change while it was parsed
+        if write and products is not None and version is not None \
+                and file_version(path) == version:
+            try:
+                export_snapshot(products, snapshot_path, version)
+            except (OSError, ValueError) as e:
+                logger.warning("Cannot write snapshot %s: %s",
+                               snapshot_path, e)
+        return products
+
+    return load
+
+
+def main():
+    """Export the snapshot of each source file given on the command line."""
+    from create_database import iter_source_products
+
+    if len(sys.argv) < 2:
+        sys.exit(__doc__.strip().splitlines()[-1])
+    for path in sys.argv[1:]:
+        version = file_version(path)
+        try:
+            products = ({'id': product_id, 'name': name,
+                         'category': category, 'price': price}
+                        for product_id, name, category, price
+                        in iter_source_products(path))
+            count = export_snapshot(products, path + '.snap', version)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error: {e}")
+        print(f"{path}.snap: {count} products")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/python3
+"""
+Thread-safe pool of read-only SQLite connections for the Flask apps.
+
+Opening a connection loads the schema and starts with a cold page cache,
+so connections are kept open and handed out to request threads instead of
+being opened and closed on every request.
+
+Work can be given a deadline by setting the `deadline` context variable:
+waiting for a connection gives up at the deadline, and a query still
+running past it is interrupted, which frees its connection and thread.
+"""
+from contextlib import contextmanager
+import contextvars
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+# time.monotonic() value after which the current context's queries abort
+deadline = contextvars.ContextVar('deadline', default=None)
+
+# Number of SQLite virtual machine instructions between deadline checks
+PROGRESS_STEPS = 1000
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection becomes available in time."""
+
+
+def _past_deadline():
+    """SQLite progress handler interrupting queries past the deadline."""
+    limit = deadline.get()
+    return limit is not None and time.monotonic() > limit
+
+
+class SQLitePool:
+    """
+    Bounded pool of SQLite connections to a single database file.
+
+    Connections are opened lazily, up to `size` of them, with a read-only
+    URI by default. A connection that raised an error is discarded rather
+    than returned to the pool, and idle connections are dropped when the
+    database file is replaced.
+    """
+
+    def __init__(self, path, size=4, read_only=True, timeout=5.0):
+        """
+        Args:
+            path (str): Path of the SQLite database
+            size (int): Maximum number of open connections
+            read_only (bool): Open connections with `mode=ro`
+            timeout (float): Seconds to wait for a free connection
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.path = path
+        self.size = size
+        self.read_only = read_only
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._inode = None
+        self._born = {}
+        self.open = 0
+        self.created = 0
+        self.reused = 0
+        self.waits = 0
+        self.discarded = 0
+
+    def _connect(self):
+        """Open a new connection to the database."""
+        mode = 'ro' if self.read_only else 'rw'
+        conn = sqlite3.connect(f'file:{self.path}?mode={mode}', uri=True,
+                               check_same_thread=False)
+        if not self.read_only:
+            # Readers never block the writer, nor the writer the readers
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.set_progress_handler(_past_deadline, PROGRESS_STEPS)
+        return conn
+
+    def _check_file(self):
+        """Drop idle connections if the database file was replaced."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            inode = None
+        if inode != self._inode:
+            self._inode = inode
+            self._drain()
+
+    def _discard(self, conn):
+        """Close a connection for good. Caller holds the lock."""
+        conn.close()
+        self._born.pop(conn, None)
+        self.open -= 1
+        self.discarded += 1
+
+    def _drain(self):
+        """Close every idle connection. Caller holds the lock."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def acquire(self):
+        """
+        Take a connection from the pool, opening one if allowed.
+
+        Returns:
+            sqlite3.Connection: An open connection
+
+        Raises:
+            PoolTimeout: If every connection stays busy for `timeout` seconds
+                         or until the deadline
+        """
+        # One slot per lent connection: a connection is only opened when
+        # none is idle, so at most `size` connections are ever open.
+        if not self._slots.acquire(blocking=False):
+            self.waits += 1
+            timeout = self.timeout
+            limit = deadline.get()
+            if limit is not None:
+                timeout = max(0, min(timeout, limit - time.monotonic()))
+            if not self._slots.acquire(timeout=timeout):
+                raise PoolTimeout(
+                    f"No connection available after {timeout:.3g}s")
+
+        try:
+            with self._lock:
+                self._check_file()
+                try:
+                    conn = self._idle.get_nowait()
+                    self.reused += 1
+                    return conn
+                except queue.Empty:
+                    pass
+                conn = self._connect()
+                self._born[conn] = self._inode
+                self.open += 1
+                self.created += 1
+                return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn (sqlite3.Connection): Connection obtained from acquire()
+            discard (bool): Close the connection instead of reusing it
+        """
+        with self._lock:
+            # Connections lent out before the file was replaced are stale
+            if discard or self._born.get(conn) != self._inode:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager lending a pooled connection.
+
+        Yields:
+            sqlite3.Connection: An open connection, returned on exit
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except sqlite3.Error:
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            self._drain()
+
+    def stats(self):
+        """
+        Return the pool size and usage counters.
+
+        Returns:
+            dict: size, open, idle, in_use, created, reused, waits, discarded
+        """
+        idle = self._idle.qsize()
+        return {
+            'size': self.size,
+            'open': self.open,
+            'idle': idle,
+            'in_use': self.open - idle,
+            'created': self.created,
+            'reused': self.reused,
+            'waits': self.waits,
+            'discarded': self.discarded,
+        }
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+In-memory snapshot of a JSON file, reloaded in the background on change.
+
+Requests read `store.snapshot` and never touch the disk. A polling thread
+stats the file and, when it changed, parses it and swaps the snapshot in
+with a single assignment. A file that fails to parse, typically because
+it is still being written, leaves the last good snapshot in place.
+
+Threads do not survive fork(), so a store started before the server forks
+its workers (gunicorn --preload) starts a new polling thread in each one.
+"""
+import json
+import logging
+import os
+import threading
+import weakref
+
+from product_cache import file_version
+
+
+logger = logging.getLogger(__name__)
+
+
+class JSONFileStore:
+    """
+    Hot-reloaded snapshot of a JSON file.
+
+    Attributes:
+        snapshot: The last successfully parsed value
+        generation (int): Incremented every time the snapshot changes
+    """
+
+    def __init__(self, path, extract=lambda data: data, default=None,
+                 interval=1.0):
+        """
+        Args:
+            path (str): Path of the JSON file
+            extract (callable): Turns the parsed document into the
+                                snapshot; may raise to reject it
+            default: Snapshot used while the file does not exist
+            interval (float): Seconds between two polls of the file
+        """
+        self.path = path
+        self.extract = extract
+        self.default = default
+        self.interval = interval
+        self.snapshot = default
+        self.generation = 0
+        self._version = None
+        self._rejected = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if hasattr(os, 'register_at_fork'):
+            ref = weakref.ref(self)
+            os.register_at_fork(
+                after_in_child=lambda: ref() and ref()._after_fork())
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload the file if it changed since the last successful load.
+
+        Returns:
+            bool: True if the snapshot was replaced
+        """
+        with self._lock:
+            version = file_version(self.path)
+            if version == self._version or \
+                    (version is not None and version == self._rejected):
+                return False
+
+            if version is None:
+                # The file was removed: serve the default again
+                snapshot = self.default
+            else:
+                try:
+                    with open(self.path, 'r') as f:
+                        snapshot = self.extract(json.load(f))
+                except (OSError, ValueError, AttributeError, KeyError,
+                        TypeError) as e:
+                    logger.warning("Keeping previous %s snapshot: %s",
+                                   self.path, e)
+                    self._rejected = version
+                    return False
+                # Written to while we were reading: load it again next poll
+                if file_version(self.path) != version:
+                    return False
+
+            self.snapshot = snapshot
+            self._version = version
+            self.generation += 1
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Reloading %s failed", self.path)
+
+    def start(self):
+        """Start polling the file from a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._watch, name=f'watch {self.path}', daemon=True)
+            self._thread.start()
+        return self
+
+    def _after_fork(self):
+        """Recreate the lock and the polling thread in a forked child."""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        running, self._thread = self._thread is not None, None
+        if running:
+            self.start()
+
+    def stop(self):
+        """Stop the polling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,255 @@
+#!/usr/bin/python3
+"""
+Request-stage timing and counters for the product pages.
+
+`metrics.span(stage, source=...)` times a stage of a request, and
+`metrics.timed(...)` one whose work is done lazily, while a streamed
+response is sent. The timings are aggregated into Prometheus histograms
+served at /metrics, and, when enabled, reported to the client in a
+`Server-Timing` response header (streamed stages end after the headers
+are sent, so they only reach the histograms).
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+
+from flask import Response, g, has_request_context
+
+
+# Upper bounds, in seconds, of the stage duration histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(labels):
+    """Format a label dict as a Prometheus label set."""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metrics:
+    """
+    Thread-safe registry of stage histograms, counters and gauges.
+    """
+
+    def __init__(self, prefix):
+        """
+        Args:
+            prefix (str): Prefix of every metric name, e.g. 'products'
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = []
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        Time a stage of the current request.
+
+        Args:
+            stage (str): Name of the stage, e.g. 'load' or 'render'
+            **labels: Extra labels, e.g. source='json'
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def timed(self, iterable, stage, elapsed=0.0, count=None, **labels):
+        """
+        Time a stage whose work happens while an iterable is consumed, such
+        as reading the rows of a streamed page or rendering it.
+
+        Only the time spent producing items is counted, not the time the
+        consumer spends between them, e.g. sending them to the client.
+
+        Args:
+            iterable: The lazily produced items
+            stage (str): Name of the stage
+            elapsed (float): Seconds already spent on the stage
+            count (str): Counter increased by the number of items, if any
+            **labels: Extra labels
+
+        Yields:
+            The items of the iterable
+        """
+        iterator = iter(iterable)
+        items = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+            self.observe(stage, elapsed, **labels)
+            if count is not None:
+                self.inc(count, items, **labels)
+
+    def observe_response(self, stage, start, response, **labels):
+        """
+        Record a stage that ends once a view's response is produced.
+
+        A streamed response is only produced while it is sent, so its
+        stage is recorded when its body has been fully generated.
+
+        Args:
+            stage (str): Name of the stage, e.g. 'render'
+            start (float): time.perf_counter() at the start of the stage
+            response: The view's return value
+            **labels: Extra labels
+
+        Returns:
+            The response, unchanged or with its body timed
+        """
+        elapsed = time.perf_counter() - start
+        if isinstance(response, Response) and response.is_streamed:
+            response.response = self.timed(response.response, stage,
+                                           elapsed, **labels)
+        else:
+            self.observe(stage, elapsed, **labels)
+        return response
+
+    def observe(self, stage, seconds, **labels):
+        """
+        Record the duration of a stage.
+
+        Args:
+            stage (str): Name of the stage
+            seconds (float): Its duration
+            **labels: Extra labels
+        """
+        key = tuple(sorted({'stage': stage, **labels}.items()))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = \
+                    [[0] * len(BUCKETS), 0, 0.0]
+            index = bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+
+        if has_request_context():
+            g.setdefault('server_timing', []).append(
+                f'{stage};dur={seconds * 1000:.2f}')
+
+    def note(self, name, description):
+        """
+        Add a description-only entry to the request's Server-Timing header.
+
+        Args:
+            name (str): Entry name, e.g. 'cache'
+            description (str): Its value, e.g. 'hit'
+        """
+        if has_request_context():
+            g.setdefault('server_timing', []).append(
+                f'{name};desc="{description}"')
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increase a counter.
+
+        Args:
+            name (str): Counter name, without prefix and '_total' suffix
+            value (int): Amount to add
+            **labels: Labels of the counter
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, help_text, collect):
+        """
+        Register a gauge read when the metrics are scraped.
+
+        Args:
+            name (str): Gauge name, without prefix
+            help_text (str): Description of the gauge
+            collect (callable): Returns {label tuple: value}
+        """
+        self._gauges.append((name, help_text, collect))
+
+    def render(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text
+        """
+        name = f'{self.prefix}_stage_seconds'
+        lines = [f'# HELP {name} Time spent in each request stage.',
+                 f'# TYPE {name} histogram']
+        with self._lock:
+            histograms = sorted(
+                (key, ([*h[0]], h[1], h[2]))
+                for key, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        for key, (buckets, count, total) in histograms:
+            cumulative = 0
+            for bound, hits in zip(BUCKETS, buckets):
+                cumulative += hits
+                lines.append(f'{name}_bucket'
+                             f'{_labels(key + (("le", bound),))} '
+                             f'{cumulative}')
+            lines.append(f'{name}_bucket{_labels(key + (("le", "+Inf"),))} '
+                         f'{count}')
+            lines.append(f'{name}_sum{_labels(key)} {total}')
+            lines.append(f'{name}_count{_labels(key)} {count}')
+
+        typed = set()
+        for (counter, labels), value in counters:
+            name = f'{self.prefix}_{counter}_total'
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{_labels(labels)} {value}')
+
+        for gauge, help_text, collect in self._gauges:
+            name = f'{self.prefix}_{gauge}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in sorted(collect().items()):
+                lines.append(f'{name}{_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app, server_timing=False):
+        """
+        Serve /metrics from an app and optionally add Server-Timing headers.
+
+        Args:
+            app: The Flask application
+            server_timing (bool): Report stage timings to clients
+        """
+        @app.route('/metrics')
+        def metrics():
+            return Response(self.render(),
+                            mimetype='text/plain; version=0.0.4')
+
+        if server_timing:
+            @app.after_request
+            def add_server_timing(response):
+                timings = g.get('server_timing')
+                if timings:
+                    response.headers['Server-Timing'] = ', '.join(timings)
+                return response
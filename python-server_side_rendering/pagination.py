@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+"""
+Pagination and streamed rendering helpers for the product pages.
+
+`page`/`per_page` query parameters select a window of the catalog, and
+`stream=1` renders the page with Jinja's `Template.stream`, so the first
+bytes are sent before the last product has been read.
+"""
+from itertools import chain, islice
+from collections.abc import Sequence
+
+from flask import Response, current_app, render_template, request
+from flask import stream_with_context, url_for
+
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 1000
+
+# Number of template chunks buffered into each streamed write
+STREAM_BUFFER = 64
+
+
+class Pagination:
+    """
+    A window of `per_page` products starting at `offset`.
+
+    `has_next` is only known once the window has been consumed, which lets
+    a streamed page decide on its "Next" link after its rows are sent.
+    """
+
+    def __init__(self, page, per_page):
+        self.page = page
+        self.per_page = per_page
+        self.offset = (page - 1) * per_page
+        self.has_next = False
+
+    def paginate(self, products):
+        """
+        Yield the products of this page out of the whole product sequence.
+
+        Args:
+            products: A sequence or iterable of all matching products
+
+        Yields:
+            dict: The products of this page
+        """
+        if isinstance(products, Sequence):
+            window = products[self.offset:self.offset + self.per_page + 1]
+        else:
+            window = islice(products, self.offset,
+                            self.offset + self.per_page + 1)
+        yield from self.window(window)
+
+    def window(self, products):
+        """
+        Yield the products of an already offset result, such as a SQL query
+        run with LIMIT per_page + 1, and record whether a next page exists.
+
+        Args:
+            products: Iterable starting at this page's first product
+
+        Yields:
+            dict: The products of this page
+        """
+        count = 0
+        for product in products:
+            if count == self.per_page:
+                self.has_next = True
+                return
+            count += 1
+            yield product
+
+    def _url(self, page):
+        args = request.args.to_dict()
+        args['page'] = page
+        return url_for(request.endpoint, **args)
+
+    @property
+    def prev_url(self):
+        """URL of the previous page, or None on the first page."""
+        return self._url(self.page - 1) if self.page > 1 else None
+
+    @property
+    def next_url(self):
+        """URL of the next page, or None on the last page."""
+        return self._url(self.page + 1) if self.has_next else None
+
+
+def parse_pagination(args):
+    """
+    Read the `page` and `per_page` query parameters.
+
+    Args:
+        args: The request's query arguments
+
+    Returns:
+        Pagination: The requested window, or None if no paging was asked for
+
+    Raises:
+        ValueError: If either parameter is not a positive integer
+    """
+    page = args.get('page')
+    per_page = args.get('per_page')
+    if page is None and per_page is None:
+        return None
+
+    page = int(page) if page is not None else 1
+    per_page = int(per_page) if per_page is not None else DEFAULT_PER_PAGE
+    if page < 1 or per_page < 1:
+        raise ValueError("page and per_page must be positive")
+    return Pagination(page, min(per_page, MAX_PER_PAGE))
+
+
+def stream_page(template_name, products, **context):
+    """
+    Render a product page as a streamed response.
+
+    Args:
+        template_name (str): Template to render
+        products: Iterable of products, consumed while the page is sent
+        **context: Other template variables
+
+    Returns:
+        Response: Streamed HTML response
+    """
+    # Peek so that an empty result still renders "No products available"
+    products = iter(products)
+    sentinel = object()
+    first = next(products, sentinel)
+    products = [] if first is sentinel else chain([first], products)
+
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    stream = template.stream(products=products, **context)
+    stream.enable_buffering(STREAM_BUFFER)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+
+def render_page(template_name, products, pagination=None, stream=False):
+    """
+    Render a product page, whole or streamed.
+
+    Args:
+        template_name (str): Template to render
+        products: Products to display, already windowed by `pagination`
+        pagination (Pagination): Current page, or None if not paginated
+        stream (bool): Stream the response instead of building it in memory
+
+    Returns:
+        Rendered template or streamed response
+    """
+    if stream:
+        return stream_page(template_name, products, pagination=pagination)
+    if not isinstance(products, Sequence):
+        products = list(products)
+    return render_template(template_name, products=products,
+                           pagination=pagination)
@@ -0,0 +1,393 @@
+#!/usr/bin/python3
+"""
+In-memory cache of parsed product lists, shared by the Flask product apps.
+
+Each registered source keeps its parsed products in memory, indexed as a
+Catalog, together with the version of the data they were read from. A file
+source is versioned by its inode, size and mtime; a SQLite source by
+`PRAGMA data_version`, so steady-state requests never touch the parser.
+"""
+from bisect import bisect_left, bisect_right
+import os
+import sqlite3
+import threading
+
+
+# Product fields /products can be sorted on; '-field' sorts descending
+SORT_KEYS = ('id', 'name', 'category', 'price')
+
+
+def file_version(path):
+    """
+    Return a version stamp for a file on disk.
+
+    Args:
+        path (str): Path of the file to stat
+
+    Returns:
+        tuple: (inode, size, mtime_ns), or None if the file is missing
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class SQLiteVersion:
+    """
+    Version stamp of a SQLite database.
+
+    `PRAGMA data_version` only changes when *another* connection commits, so
+    a dedicated connection is kept open and reopened if the file is replaced.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """
+        Return the current version of the database.
+
+        Returns:
+            tuple: (file version, data_version), or None if unavailable
+        """
+        stamp = file_version(self.path)
+        if stamp is None:
+            return None
+
+        with self._lock:
+            try:
+                # A new inode means the database was recreated
+                if self._conn is None or stamp[0] != self._stamp[0]:
+                    self.close()
+                    self._conn = sqlite3.connect(
+                        f'file:{self.path}?mode=ro', uri=True,
+                        check_same_thread=False)
+                    self._stamp = stamp
+                data_version = self._conn.execute(
+                    'PRAGMA data_version').fetchone()[0]
+            except sqlite3.Error:
+                self.close()
+                return None
+
+        # Only the inode matters here: WAL commits do not touch the main
+        # file's mtime, and data_version already tracks content changes.
+        return (stamp[0], data_version)
+
+    def close(self):
+        """Close the version-tracking connection, if any."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def parse_product_query(args):
+    """
+    Read the filter and sort query parameters of /products.
+
+    Args:
+        args: The request's query arguments
+
+    Returns:
+        dict: Keyword arguments for Catalog.query (empty if none were given)
+
+    Raises:
+        ValueError: If a price is not a number or the sort key is unknown
+    """
+    query = {}
+    if args.get('category'):
+        query['category'] = args.get('category')
+    for name in ('min_price', 'max_price'):
+        if args.get(name):
+            query[name] = float(args.get(name))
+    if args.get('sort'):
+        if args.get('sort').lstrip('-') not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {args.get('sort')}")
+        query['sort'] = args.get('sort')
+    return query
+
+
+def _read_column(products, field):
+    """
+    Return one field of every product, in order.
+
+    Args:
+        products: Sequence of product mappings, or a ProductSnapshot
+        field (str): Field to read
+
+    Returns:
+        Sequence: The field values
+    """
+    column = getattr(products, 'column', None)
+    if column is not None:
+        return column(field)
+    return [product.get(field) for product in products]
+
+
+class Catalog:
+    """
+    Product list with lookup indexes, built once per cache generation.
+
+    Indexes hold positions into `products` rather than the products
+    themselves, so they stay valid for any sequence of product mappings.
+    Sequences with a `column(field)` method, such as a ProductSnapshot,
+    are indexed from their columns without building every product.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        self.by_id = {}
+        self.by_category = {}
+        self._orders = {}
+        self._columns = {}
+
+        # One position per id, built at C speed; the rare duplicated ids
+        # map to the list of all their positions instead
+        ids = _read_column(products, 'id')
+        self.by_id = dict(zip(ids, range(len(ids))))
+        if len(self.by_id) != len(ids):
+            positions = {}
+            for position, product_id in enumerate(ids):
+                positions.setdefault(product_id, []).append(position)
+            self.by_id.update((product_id, duplicates)
+                              for product_id, duplicates in positions.items()
+                              if len(duplicates) > 1)
+
+        for position, category in enumerate(
+                _read_column(products, 'category')):
+            self.by_category.setdefault(category, []).append(position)
+
+    def _column(self, field):
+        """Return one field of every product, kept for later sorts."""
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = \
+                _read_column(self.products, field)
+        return column
+
+    def __len__(self):
+        return len(self.products)
+
+    def _sorted(self, positions, key):
+        """
+        Sort positions by a field, breaking ties by id like the SQL query.
+
+        Args:
+            positions: Positions into `products`
+            key (str): Field to sort on
+
+        Returns:
+            list: The positions in ascending (key, id) order
+        """
+        if key != 'id':
+            positions = sorted(positions, key=self._column('id').__getitem__)
+        return sorted(positions, key=self._column(key).__getitem__)
+
+    def find(self, product_id):
+        """
+        Return the products with the given id.
+
+        Args:
+            product_id (int): Product ID to look up
+
+        Returns:
+            list: Matching product dictionaries (empty if none)
+        """
+        positions = self.by_id.get(product_id, ())
+        if isinstance(positions, int):
+            return [self.products[positions]]
+        return [self.products[i] for i in positions]
+
+    def in_category(self, category):
+        """
+        Return the products of a category, in catalog order.
+
+        Args:
+            category (str): Category name
+
+        Returns:
+            list: Matching product dictionaries (empty if none)
+        """
+        return [self.products[i] for i in self.by_category.get(category, ())]
+
+    def _ordered(self, category, key):
+        """
+        Return positions sorted by a field, with the sorted field values.
+
+        Orders are computed on first use and kept for the lifetime of the
+        catalog, so later queries only bisect or slice them. Only categories
+        present in the catalog are kept, so their number stays bounded
+        whatever categories are asked for.
+
+        Args:
+            category (str): Restrict to this category, or None for all
+            key (str): Field to sort on
+
+        Returns:
+            tuple: (positions, values), both in ascending `key` order
+        """
+        if category is not None and category not in self.by_category:
+            return (), ()
+        order = self._orders.get((category, key))
+        if order is None:
+            if category is None:
+                positions = range(len(self.products))
+            else:
+                positions = self.by_category[category]
+            positions = self._sorted(positions, key)
+            values = [self._column(key)[i] for i in positions]
+            order = self._orders[(category, key)] = (positions, values)
+        return order
+
+    def query(self, category=None, min_price=None, max_price=None,
+              sort=None):
+        """
+        Return the products matching a category and price range.
+
+        Args:
+            category (str): Only products of this category
+            min_price (float): Only products costing at least this much
+            max_price (float): Only products costing at most this much
+            sort (str): Field to sort on, prefixed with '-' for descending;
+                        catalog order if None. Equal values are ordered by
+                        id, in the same direction, as in the SQL query
+
+        Returns:
+            list: Matching product dictionaries
+        """
+        key = sort.lstrip('-') if sort else None
+
+        if min_price is None and max_price is None:
+            if key is not None:
+                positions = self._ordered(category, key)[0]
+            elif category is not None:
+                positions = self.by_category.get(category, ())
+            else:
+                positions = range(len(self.products))
+        else:
+            # Bisect the price order for the range, then re-sort the hits
+            positions, prices = self._ordered(category, 'price')
+            low = 0 if min_price is None else bisect_left(prices, min_price)
+            high = len(prices) if max_price is None \
+                else bisect_right(prices, max_price)
+            positions = positions[low:high]
+            if key is None:
+                positions = sorted(positions)
+            elif key != 'price':
+                positions = self._sorted(positions, key)
+
+        if sort and sort.startswith('-'):
+            positions = reversed(positions)
+        return [self.products[i] for i in positions]
+
+
+class ProductCache:
+    """
+    Cache of product catalogs, one entry per data source.
+
+    Sources are registered with a loader returning the product list (or None
+    on error) and a version function. The list is wrapped in a Catalog and
+    served for as long as the version it was loaded under is still current.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, source, loader, version):
+        """
+        Register a data source.
+
+        Args:
+            source (str): Source name, e.g. 'json'
+            loader (callable): Returns the product list, or None on error
+            version (callable): Returns the current data version, or None
+        """
+        self._sources[source] = (loader, version)
+        self._entries.pop(source, None)
+
+    def get(self, source):
+        """
+        Return the catalog of a source, reloading it if stale.
+
+        Args:
+            source (str): Registered source name
+
+        Returns:
+            Catalog: Indexed products, or None if loading failed
+        """
+        return self.lookup(source)[0]
+
+    def lookup(self, source):
+        """
+        Return the catalog of a source and whether it came from the cache.
+
+        Args:
+            source (str): Registered source name
+
+        Returns:
+            tuple: (Catalog or None if loading failed, True on a cache hit)
+        """
+        loader, version = self._sources[source]
+        current = version()
+
+        entry = self._entries.get(source)
+        if current is not None and entry is not None \
+                and entry[0] == current:
+            self.hits += 1
+            return entry[1], True
+
+        # Serialize reloads so concurrent misses parse the source only once
+        with self._lock:
+            entry = self._entries.get(source)
+            if current is not None and entry is not None \
+                    and entry[0] == current:
+                self.hits += 1
+                return entry[1], True
+
+            self.misses += 1
+            products = loader()
+            if products is None:
+                self._entries.pop(source, None)
+                return None, False
+
+            catalog = Catalog(products)
+            if current is None:
+                # Never cache data of unknown version
+                self._entries.pop(source, None)
+            else:
+                self._entries[source] = (current, catalog)
+            return catalog, False
+
+    def invalidate(self, source=None):
+        """
+        Drop the cached entry of a source, or of every source.
+
+        Args:
+            source (str): Source name, or None for all sources
+        """
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(source, None)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: hits, misses and the names of the cached sources
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cached': sorted(self._entries),
+        }
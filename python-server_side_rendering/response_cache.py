@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+LRU cache of rendered pages with ETag/Last-Modified revalidation.
+
+Pages are cached by route, query arguments and the version of the data
+they were rendered from. Cached pages carry an ETag and Last-Modified
+header, so clients revalidating an unchanged page get a 304 without the
+template being rendered again.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+import hashlib
+import os
+import threading
+
+from flask import current_app, make_response, request
+
+
+def templates_version(app):
+    """
+    Return a version stamp of every file in an app's templates folder.
+
+    Args:
+        app: The Flask application
+
+    Returns:
+        tuple: Sorted (name, mtime_ns, size) of each template file
+    """
+    folder = os.path.join(app.root_path, app.template_folder)
+    stamps = []
+    try:
+        for entry in os.scandir(folder):
+            if entry.is_file():
+                st = entry.stat()
+                stamps.append((entry.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        return None
+    return tuple(sorted(stamps))
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of rendered page bodies.
+
+    Entries are keyed by (path, query arguments, data version), so a new
+    data version simply misses and the stale entries age out of the LRU.
+    The templates are part of the version only while Jinja reloads them
+    (debug mode or TEMPLATES_AUTO_RELOAD); otherwise they are stamped once.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._templates_versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def cached(self, version=None):
+        """
+        Decorator caching the body returned by a view.
+
+        Args:
+            version (callable): Returns the version of the view's data;
+                                the app's templates are always included
+
+        Returns:
+            callable: The decorator
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                data_version = version() if version is not None else None
+                key = (request.path,
+                       tuple(sorted(request.args.items(multi=True))),
+                       self._templates_version(current_app), data_version)
+
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+
+                if entry is None:
+                    body = view(*args, **kwargs)
+                    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+                    modified = datetime.now(timezone.utc).replace(
+                        microsecond=0)
+                    entry = (body, etag, modified)
+                    self._store(key, entry)
+
+                body, etag, modified = entry
+                response = make_response(body)
+                response.set_etag(etag)
+                response.last_modified = modified
+                # Let browsers keep the page but revalidate it every time
+                response.cache_control.no_cache = True
+                response.make_conditional(request)
+                if response.status_code == 304:
+                    self.not_modified += 1
+                return response
+            return wrapper
+        return decorator
+
+    def _templates_version(self, app):
+        """Return the templates version, scanning only when they reload."""
+        if app.jinja_env.auto_reload:
+            return templates_version(app)
+        version = self._templates_versions.get(app)
+        if version is None:
+            version = self._templates_versions[app] = templates_version(app)
+        return version
+
+    def _store(self, key, entry):
+        """Insert an entry, evicting the least recently used ones."""
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached page."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: size, hits, misses, hit_rate, not_modified and evictions
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'not_modified': self.not_modified,
+            'evictions': self.evictions,
+        }
@@ -1,29 +1,291 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import csv
+from functools import lru_cache
+from itertools import chain, islice
+import json
 import os
+import re
+import zipfile
 
 
-def generate_invitations(template, attendees):
+PLACEHOLDERS = ('name', 'event_title', 'event_date', 'event_location')
+PLACEHOLDER_PATTERN = re.compile(r'\{(' + '|'.join(PLACEHOLDERS) + r')\}')
+
+ATTENDEE_FILE_TYPES = ('.jsonl', '.csv')
+OUTPUT_MODES = ('files', 'jsonl', 'zip')
+DEFAULT_OUTPUT_PATHS = {'jsonl': 'invitations.jsonl',
+                        'zip': 'invitations.zip'}
+
+
+class CompiledTemplate:
+    """
+    Invitation template parsed once into a format string.
+
+    Placeholder positions are found a single time, and every invitation is
+    then produced by one `str.format_map` call instead of one `str.replace`
+    pass per placeholder. Braces that are not placeholders are kept as-is.
+    """
+
+    def __init__(self, template):
+        parts = []
+        last = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            literal = template[last:match.start()]
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            parts.append('{' + match.group(1) + '}')
+            last = match.end()
+        literal = template[last:]
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        self._format = ''.join(parts)
+
+    def render(self, attendee):
+        """
+        Fill the template with an attendee's information.
+
+        Args:
+            attendee: A dictionary of attendee information
+
+        Returns:
+            str: The invitation, with "N/A" for missing/None values
+        """
+        values = {}
+        for key in PLACEHOLDERS:
+            value = attendee.get(key)
+            values[key] = str(value) if value is not None else 'N/A'
+        return self._format.format_map(values)
+
+
+@lru_cache(maxsize=8)
+def compile_template(template):
+    """
+    Return the compiled form of a template, compiling it once per process.
+
+    Args:
+        template: A string containing the invitation template
+
+    Returns:
+        CompiledTemplate: The parsed template
+    """
+    return CompiledTemplate(template)
+
+
+def write_invitation_batch(template, batch):
+    """
+    Render and write one batch of invitations to output_N.txt files.
+
+    Files are created exclusively, so an existing file is never
+    overwritten and no separate existence check is needed.
+
+    Args:
+        template: A string containing the invitation template
+        batch: A list of (index, attendee) pairs
+
+    Returns:
+        list: One status message per invitation, in batch order
+    """
+    compiled = compile_template(template)
+    messages = []
+    for index, attendee in batch:
+        output_filename = f'output_{index}.txt'
+        try:
+            with open(output_filename, 'x') as output_file:
+                output_file.write(compiled.render(attendee))
+            messages.append(f"Generated {output_filename}")
+        except FileExistsError:
+            messages.append(
+                f"Warning: {output_filename} already exists, skipping.")
+        except Exception as e:
+            messages.append(f"Error writing {output_filename}: {e}")
+    return messages
+
+
+def _file_records(path):
+    """
+    Yield (line number, record) pairs from a JSONL or CSV file.
+
+    The file is opened on the first record and closed when the records run
+    out or the generator is closed. A JSONL line that cannot be decoded is
+    yielded as its ValueError, and empty CSV fields as None so that they are
+    rendered as "N/A".
+    """
+    with open(path, 'r', newline='') as attendee_file:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(attendee_file)
+            for row in reader:
+                yield reader.line_num, {key: value if value != '' else None
+                                        for key, value in row.items()}
+            return
+
+        for line_number, line in enumerate(attendee_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+
+
+def read_attendees(attendees):
+    """
+    Return the attendee records of a list, any iterable or an attendee file.
+
+    Records are produced lazily, so a file is never loaded as a whole.
+
+    Args:
+        attendees: An iterable of dictionaries, or the path of a .jsonl
+                   (one JSON object per line) or .csv attendee file
+
+    Returns:
+        tuple: (description of a record's position, e.g. "line",
+                iterator of (position, record) pairs)
+
+    Raises:
+        TypeError: If attendees is neither an iterable nor a file path
+        OSError: If the attendee file cannot be opened
+    """
+    if isinstance(attendees, (str, bytes, os.PathLike)):
+        path = os.fsdecode(attendees)
+        if not path.lower().endswith(ATTENDEE_FILE_TYPES):
+            raise TypeError("attendees is not an iterable or attendee file")
+        # Checked here so that a missing file is reported up front, but
+        # only opened once the records are read
+        with open(path, 'rb'):
+            pass
+        return 'line', _file_records(path)
+
+    if isinstance(attendees, dict):
+        raise TypeError("attendees is not an iterable or attendee file")
+    try:
+        return 'item', enumerate(attendees, start=1)
+    except TypeError:
+        raise TypeError("attendees is not an iterable or attendee file")
+
+
+def _valid_attendees(position, records, counts):
+    """
+    Yield (index, attendee) pairs, reporting and skipping invalid records.
+
+    The index is the record's number in the input, so output_N.txt always
+    belongs to the Nth attendee even when earlier records were skipped.
+    """
+    for index, (location, record) in enumerate(records, start=1):
+        counts['records'] += 1
+        if isinstance(record, ValueError):
+            print(f"Error: {position} {location} is not valid JSON "
+                  f"({record}), skipping.")
+        elif not isinstance(record, dict):
+            print(f"Error: {position} {location} is not a dictionary, "
+                  "skipping.")
+        else:
+            yield index, record
+
+
+def _batches(pairs, batch_size):
+    """Yield lists of (index, attendee) pairs of at most batch_size."""
+    while True:
+        batch = list(islice(pairs, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _write_files(template, pairs, workers, use_processes, batch_size):
+    """Write one output_N.txt file per attendee, optionally in a pool."""
+    batches = _batches(pairs, batch_size)
+    if not workers:
+        for batch in batches:
+            for message in write_invitation_batch(template, batch):
+                print(message)
+        return
+
+    executor_class = ProcessPoolExecutor if use_processes \
+        else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        # Submit a bounded window of batches so memory use stays flat
+        pending = []
+        for batch in batches:
+            pending.append(executor.submit(
+                write_invitation_batch, template, batch))
+            if len(pending) >= 2 * workers:
+                for message in pending.pop(0).result():
+                    print(message)
+        for future in pending:
+            for message in future.result():
+                print(message)
+
+
+def _write_archive(template, pairs, output, output_path):
+    """Write every invitation into a single JSONL file or zip archive."""
+    compiled = compile_template(template)
+    count = 0
+    try:
+        if output == 'jsonl':
+            with open(output_path, 'x') as output_file:
+                for index, attendee in pairs:
+                    record = {'index': index,
+                              'filename': f'output_{index}.txt',
+                              'content': compiled.render(attendee)}
+                    output_file.write(json.dumps(record) + '\n')
+                    count += 1
+        else:
+            with zipfile.ZipFile(output_path, 'x',
+                                 zipfile.ZIP_DEFLATED) as archive:
+                for index, attendee in pairs:
+                    archive.writestr(f'output_{index}.txt',
+                                     compiled.render(attendee))
+                    count += 1
+    except FileExistsError:
+        print(f"Warning: {output_path} already exists, skipping.")
+        return
+    except UnicodeDecodeError:
+        # Reported by generate_invitations as an attendee file error
+        raise
+    except Exception as e:
+        print(f"Error writing {output_path}: {e}")
+        return
+    print(f"Generated {output_path} with {count} invitations")
+
+
+def generate_invitations(template, attendees, output='files', workers=0,
+                         use_processes=False, batch_size=1000,
+                         output_path=None):
     """
     Generate personalized invitation files from a template and attendee data.
 
     Args:
         template: A string containing the invitation template with
                   placeholders
-        attendees: A list of dictionaries containing attendee information
+        attendees: A list or any other iterable of dictionaries containing
+                   attendee information, or the path of a .jsonl or .csv
+                   attendee file. Records are read lazily, and invalid ones
+                   are reported with their line number and skipped
+        output: 'files' for one output_N.txt per attendee, 'jsonl' or
+                'zip' to write every invitation into a single file
+        workers: Number of pool workers writing 'files' batches, 0 to write
+                 them in the calling thread
+        use_processes: Use a process pool instead of a thread pool
+        batch_size: Number of invitations handed to a worker at a time
+        output_path: Path of the 'jsonl'/'zip' file, defaults to
+                     invitations.jsonl/invitations.zip
     """
     # Check if template is a string
     if not isinstance(template, str):
         print("Error: Template is not a string")
         return
 
-    # Check if attendees is a list
-    if not isinstance(attendees, list):
+    # Check if attendees is a list, another iterable or an attendee file
+    try:
+        position, records = read_attendees(attendees)
+    except TypeError:
         print("Error: Attendees is not a list")
         return
+    except OSError as e:
+        print(f"Error: Cannot read attendees file: {e}")
+        return
 
-    # Check if all items in attendees are dictionaries
-    if attendees and not all(isinstance(attendee, dict)
-                             for attendee in attendees):
-        print("Error: Attendees is not a list of dictionaries")
+    # Check the requested output mode
+    if output not in OUTPUT_MODES:
+        print(f"Error: Unknown output mode {output!r}")
         return
 
     # Check if template is empty
@@ -31,47 +293,24 @@ def generate_invitations(template, attendees):
         print("Template is empty, no output files generated.")
         return
 
-    # Check if attendees list is empty
-    if not attendees:
-        print("No data provided, no output files generated.")
-        return
-
-    # Process each attendee
-    for index, attendee in enumerate(attendees, start=1):
-        # Start with a copy of the template
-        output_content = template
-
-        # Replace placeholders with actual values or "N/A"
-        name = attendee.get('name')
-        event_title = attendee.get('event_title')
-        event_date = attendee.get('event_date')
-        event_location = attendee.get('event_location')
-
-        # Replace with actual values or "N/A" if missing/None
-        output_content = output_content.replace(
-            '{name}', str(name) if name is not None else 'N/A')
-        output_content = output_content.replace(
-            '{event_title}',
-            str(event_title) if event_title is not None else 'N/A')
-        output_content = output_content.replace(
-            '{event_date}',
-            str(event_date) if event_date is not None else 'N/A')
-        output_content = output_content.replace(
-            '{event_location}',
-            str(event_location) if event_location is not None else 'N/A')
-
-        # Generate output filename
-        output_filename = f'output_{index}.txt'
-
-        # Check if file already exists
-        if os.path.exists(output_filename):
-            print(f"Warning: {output_filename} already exists, skipping.")
-            continue
+    try:
+        # Check if attendees is empty, validating records one at a time
+        counts = {'records': 0}
+        pairs = _valid_attendees(position, records, counts)
+        first = next(pairs, None)
+        if first is None:
+            if not counts['records']:
+                print("No data provided, no output files generated.")
+            return
+        pairs = chain([first], pairs)
 
-        # Write to file
-        try:
-            with open(output_filename, 'w') as output_file:
-                output_file.write(output_content)
-            print(f"Generated {output_filename}")
-        except Exception as e:
-            print(f"Error writing {output_filename}: {e}")
+        # Process each attendee
+        if output == 'files':
+            _write_files(template, pairs, workers, use_processes,
+                         batch_size)
+        else:
+            _write_archive(template, pairs, output,
+                           output_path or DEFAULT_OUTPUT_PATHS[output])
+    except UnicodeDecodeError as e:
+        # Records are decoded as they are read, so this can happen late
+        print(f"Error: Cannot read attendees file: {e}")
@@ -1,23 +1,35 @@
-from flask import Flask, render_template
+from flask import Flask, jsonify, render_template
+from response_cache import ResponseCache
+from template_warmup import configure_templates
 
 
 app = Flask(__name__)
+configure_templates(app)
+response_cache = ResponseCache()
 
 
 @app.route('/')
+@response_cache.cached()
 def home():
     return render_template('index.html')
 
 
 @app.route('/about')
+@response_cache.cached()
 def about():
     return render_template('about.html')
 
 
 @app.route('/contact')
+@response_cache.cached()
 def contact():
     return render_template('contact.html')
 
 
+@app.route('/cache-stats')
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -1,37 +1,46 @@
-from flask import Flask, render_template
-import json
+from flask import Flask, jsonify, render_template
+from json_store import JSONFileStore
+from response_cache import ResponseCache
+from template_warmup import configure_templates
 
 
 app = Flask(__name__)
+configure_templates(app)
+response_cache = ResponseCache()
+
+# items.json is reloaded in the background; requests use the snapshot
+items_store = JSONFileStore('items.json',
+                            extract=lambda data: data.get('items', []),
+                            default=[]).start()
 
 
 @app.route('/')
+@response_cache.cached()
 def home():
     return render_template('index.html')
 
 
 @app.route('/about')
+@response_cache.cached()
 def about():
     return render_template('about.html')
 
 
 @app.route('/contact')
+@response_cache.cached()
 def contact():
     return render_template('contact.html')
 
 
 @app.route('/items')
+@response_cache.cached(lambda: items_store.generation)
 def items():
-    try:
-        with open('items.json', 'r') as file:
-            data = json.load(file)
-            items_list = data.get('items', [])
-    except FileNotFoundError:
-        items_list = []
-    except json.JSONDecodeError:
-        items_list = []
-
-    return render_template('items.html', items=items_list)
+    return render_template('items.html', items=items_store.snapshot)
+
+
+@app.route('/cache-stats')
+def cache_stats():
+    return jsonify(response_cache.stats())
 
 
 if __name__ == '__main__':
@@ -6,9 +6,22 @@ and displays them using Jinja2 templates.
 from flask import Flask, render_template, request
 import json
 import csv
+import os
+import time
+from catalog_snapshot import snapshot_loader
+from metrics import Metrics
+from pagination import parse_pagination, render_page
+from product_cache import ProductCache, parse_product_query, file_version
+from template_warmup import configure_templates
 
 
 app = Flask(__name__)
+configure_templates(app)
+
+# Stage timings, row counts and cache status, served at /metrics
+metrics = Metrics('products')
+metrics.init_app(app,
+                 server_timing=os.environ.get('PRODUCTS_SERVER_TIMING') == '1')
 
 
 def read_json_file():
@@ -57,6 +70,21 @@ def read_csv_file():
         return None
 
 
+# Parsed products are kept in memory until their source changes on disk,
+# and, when current, mapped from the columnar snapshot of the source file
+# instead of being parsed; PRODUCTS_WRITE_SNAPSHOTS=1 writes the snapshots
+write_snapshots = os.environ.get('PRODUCTS_WRITE_SNAPSHOTS') == '1'
+product_cache = ProductCache()
+product_cache.register('json', snapshot_loader('products.json',
+                                               read_json_file,
+                                               write_snapshots),
+                       lambda: file_version('products.json'))
+product_cache.register('csv', snapshot_loader('products.csv',
+                                              read_csv_file,
+                                              write_snapshots),
+                       lambda: file_version('products.csv'))
+
+
 @app.route('/products')
 def products():
     """
@@ -65,6 +93,14 @@ def products():
     Query Parameters:
         source (str): Data source - 'json' or 'csv' (required)
         id (int): Optional product ID to filter by
+        category (str): Optional category to filter by
+        min_price (float): Optional lowest price to include
+        max_price (float): Optional highest price to include
+        sort (str): Optional sort field (id, name, category or price),
+                    prefixed with '-' for descending order
+        page (int): Optional page number, starting at 1
+        per_page (int): Optional number of products per page
+        stream (str): '1' to stream the page while it is rendered
 
     Returns:
         Rendered template with products or error message
@@ -77,34 +113,62 @@ def products():
         return render_template('product_display.html',
                              error="Wrong source")
 
+    # Validate pagination parameters
+    try:
+        pagination = parse_pagination(request.args)
+    except ValueError:
+        return render_template('product_display.html',
+                               error="Invalid page")
+    stream = request.args.get('stream') == '1'
+
+    # Validate filter and sort parameters
+    try:
+        query = parse_product_query(request.args)
+    except ValueError:
+        return render_template('product_display.html',
+                               error="Invalid filter")
+
     # Read data from the appropriate source
-    if source == 'json':
-        products_data = read_json_file()
-    else:  # source == 'csv'
-        products_data = read_csv_file()
+    with metrics.span('load', source=source):
+        catalog, hit = product_cache.lookup(source)
+    status = 'hit' if hit else 'miss'
+    metrics.inc('cache_lookups', source=source, status=status)
+    metrics.note('cache', status)
 
     # Handle file reading errors
-    if products_data is None:
+    if catalog is None:
         return render_template('product_display.html',
                              error=f"Error reading {source.upper()} file")
 
-    # Filter by ID if provided
+    products_data = catalog.products
+
+    # Filter by ID if provided, using the catalog's id index
     if product_id:
         try:
             product_id = int(product_id)
-            filtered_products = [p for p in products_data if p['id'] == product_id]
-
-            if not filtered_products:
-                return render_template('product_display.html',
-                                     error="Product not found")
-
-            products_data = filtered_products
         except ValueError:
             return render_template('product_display.html',
                                  error="Invalid product ID")
 
-    # Render template with products
-    return render_template('product_display.html', products=products_data)
+        with metrics.span('filter', source=source):
+            products_data = catalog.find(product_id)
+        if not products_data:
+            return render_template('product_display.html',
+                                   error="Product not found")
+
+    # Filter and sort using the catalog's precomputed orders
+    elif query:
+        with metrics.span('filter', source=source):
+            products_data = catalog.query(**query)
+
+    # Render the requested page of products
+    if pagination is not None:
+        products_data = list(pagination.paginate(products_data))
+    metrics.inc('rows', len(products_data), source=source)
+    start = time.perf_counter()
+    page = render_page('product_display.html', products_data, pagination,
+                       stream)
+    return metrics.observe_response('render', start, page, source=source)
 
 
 if __name__ == '__main__':
@@ -3,13 +3,36 @@
 Flask application that reads product data from JSON, CSV files, or SQLite database
 and displays them using Jinja2 templates.
 """
+from collections.abc import Sequence
 from flask import Flask, render_template, request
 import json
 import csv
+import os
 import sqlite3
+import time
+from db_pool import SQLitePool
+from catalog_snapshot import snapshot_loader
+from metrics import Metrics
+from pagination import parse_pagination, render_page
+from product_cache import SORT_KEYS, ProductCache, parse_product_query
+from product_cache import SQLiteVersion, file_version
+from template_warmup import configure_templates
 
 
 app = Flask(__name__)
+configure_templates(app)
+
+# Read-only connections to products.db are reused across requests
+db_pool = SQLitePool('products.db',
+                     size=int(os.environ.get('PRODUCTS_DB_POOL_SIZE', 4)))
+
+# Stage timings, row counts and cache status, served at /metrics
+metrics = Metrics('products')
+metrics.init_app(app,
+                 server_timing=os.environ.get('PRODUCTS_SERVER_TIMING') == '1')
+metrics.gauge('db_pool_connections', "Connections of the products.db pool.",
+              lambda: {(('state', state),): db_pool.stats()[state]
+                       for state in ('open', 'idle', 'in_use')})
 
 
 def read_json_file():
@@ -66,12 +89,11 @@ def read_sql_database():
         list: List of product dictionaries, or None if database error occurs
     """
     try:
-        conn = sqlite3.connect('products.db')
-        cursor = conn.cursor()
-
-        # Fetch all products from the Products table
-        cursor.execute('SELECT id, name, category, price FROM Products')
-        rows = cursor.fetchall()
+        with db_pool.connection() as conn:
+            # Fetch all products from the Products table
+            cursor = conn.execute(
+                'SELECT id, name, category, price FROM Products')
+            rows = cursor.fetchall()
 
         # Convert rows to list of dictionaries
         products = []
@@ -84,62 +106,334 @@ def read_sql_database():
             }
             products.append(product)
 
-        conn.close()
         return products
     except (sqlite3.Error, FileNotFoundError):
         return None
 
 
-@app.route('/products')
-def products():
+def read_sql_product(product_id):
     """
-    Route to display products from JSON, CSV file, or SQLite database.
+    Read a single product from products.db by its primary key.
 
-    Query Parameters:
-        source (str): Data source - 'json', 'csv', or 'sql' (required)
-        id (int): Optional product ID to filter by
+    Args:
+        product_id (int): ID of the product to fetch
 
     Returns:
-        Rendered template with products or error message
+        list: List holding the matching product dictionary (empty if not
+              found), or None if database error occurs
     """
-    source = request.args.get('source')
-    product_id = request.args.get('id')
+    try:
+        with db_pool.connection() as conn:
+            # Parameterized lookup on the INTEGER PRIMARY KEY (rowid) index
+            cursor = conn.execute(
+                'SELECT id, name, category, price FROM Products WHERE id = ?',
+                (product_id,))
+            rows = cursor.fetchall()
+
+        products = []
+        for row in rows:
+            product = {
+                'id': row[0],
+                'name': row[1],
+                'category': row[2],
+                'price': row[3]
+            }
+            products.append(product)
+
+        return products
+    except (sqlite3.Error, FileNotFoundError):
+        return None
+
+
+def compile_product_query(category=None, min_price=None, max_price=None,
+                          sort=None, after=None):
+    """
+    Compile /products filters into a SQL query on the Products table.
+
+    Category and price filters are answered by the idx_products_category_price
+    and idx_products_price indexes created by create_database.py.
+
+    Args:
+        category (str): Only products of this category
+        min_price (float): Only products costing at least this much
+        max_price (float): Only products costing at most this much
+        sort (str): Column to sort on (validated against SORT_KEYS),
+                    prefixed with '-' for descending; id order if None
+        after (tuple): Only products following this row in the sort
+                       order, given as (sort column value, id)
+
+    Returns:
+        tuple: (SQL string without LIMIT/OFFSET, list of parameters)
+    """
+    column = sort.lstrip('-') if sort else 'id'
+    if column not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    descending = bool(sort) and sort.startswith('-')
+
+    clauses = []
+    params = []
+    if category is not None:
+        clauses.append('category = ?')
+        params.append(category)
+    if min_price is not None:
+        clauses.append('price >= ?')
+        params.append(min_price)
+    if max_price is not None:
+        clauses.append('price <= ?')
+        params.append(max_price)
+
+    if after is not None:
+        # Keyset continuation, answered by the same indexes as the sort
+        operator = '<' if descending else '>'
+        if column == 'id':
+            clauses.append(f'id {operator} ?')
+            params.append(after[1])
+        else:
+            clauses.append(f'({column}, id) {operator} (?, ?)')
+            params.extend(after)
+
+    sql = 'SELECT id, name, category, price FROM Products'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+
+    direction = 'DESC' if descending else 'ASC'
+    sql += f' ORDER BY {column} {direction}'
+    if column != 'id':
+        # Keep the order of equal values stable across pages
+        sql += f', id {direction}'
+    return sql, params
+
+
+def iter_sql_products(query=None, offset=0, limit=-1, batch_size=500):
+    """
+    Yield products from products.db, fetched in batches.
+
+    Each batch is read on a pooled connection that is returned before its
+    rows are yielded, and the next batch continues after the last row
+    read, so a slow client streaming a page never holds a connection and
+    memory use does not depend on the size of the table.
+
+    Args:
+        query (dict): Filters and sort, as returned by parse_product_query
+        offset (int): Number of products to skip
+        limit (int): Maximum number of products, -1 for no limit
+        batch_size (int): Number of rows fetched at a time
+
+    Yields:
+        dict: Product dictionaries
+
+    Raises:
+        sqlite3.Error: If the database cannot be read
+    """
+    query = query or {}
+    sort = query.get('sort')
+    # Position of the sort column in the selected row
+    key = ('id', 'name', 'category', 'price').index(
+        sort.lstrip('-') if sort else 'id')
+    after = None
+    while limit != 0:
+        size = batch_size if limit < 0 else min(batch_size, limit)
+        sql, params = compile_product_query(**query, after=after)
+        with db_pool.connection() as conn:
+            rows = conn.execute(sql + ' LIMIT ? OFFSET ?',
+                                params + [size, offset]).fetchall()
+        for row in rows:
+            yield {
+                'id': row[0],
+                'name': row[1],
+                'category': row[2],
+                'price': row[3]
+            }
+        if len(rows) < size:
+            return
+        if limit > 0:
+            limit -= len(rows)
+        after, offset = (rows[-1][key], rows[-1][0]), 0
 
+
+# Parsed products are kept in memory until their source changes on disk,
+# and, when current, mapped from the columnar snapshot of the source file
+# instead of being parsed; PRODUCTS_WRITE_SNAPSHOTS=1 writes the snapshots
+write_snapshots = os.environ.get('PRODUCTS_WRITE_SNAPSHOTS') == '1'
+product_cache = ProductCache()
+product_cache.register('json', snapshot_loader('products.json',
+                                               read_json_file,
+                                               write_snapshots),
+                       lambda: file_version('products.json'))
+product_cache.register('csv', snapshot_loader('products.csv',
+                                              read_csv_file,
+                                              write_snapshots),
+                       lambda: file_version('products.csv'))
+product_cache.register('sql', read_sql_database,
+                       SQLiteVersion('products.db'))
+
+
+def parse_products_args(args):
+    """
+    Validate the query parameters of /products.
+
+    Args:
+        args: The request's query arguments
+
+    Returns:
+        tuple: (keyword arguments for load_products, None), or
+               (None, error message) if a parameter is invalid
+    """
     # Validate source parameter
+    source = args.get('source')
     if source not in ['json', 'csv', 'sql']:
-        return render_template('product_display.html',
-                             error="Wrong source")
+        return None, "Wrong source"
 
-    # Read data from the appropriate source
-    if source == 'json':
-        products_data = read_json_file()
-    elif source == 'csv':
-        products_data = read_csv_file()
-    else:  # source == 'sql'
-        products_data = read_sql_database()
+    # Validate pagination parameters
+    try:
+        pagination = parse_pagination(args)
+    except ValueError:
+        return None, "Invalid page"
 
-    # Handle file/database reading errors
-    if products_data is None:
-        return render_template('product_display.html',
-                             error=f"Error reading {source.upper()} data")
+    # Validate filter and sort parameters
+    try:
+        query = parse_product_query(args)
+    except ValueError:
+        return None, "Invalid filter"
 
-    # Filter by ID if provided
+    # Validate product ID
+    product_id = args.get('id')
     if product_id:
         try:
             product_id = int(product_id)
-            filtered_products = [p for p in products_data if p['id'] == product_id]
+        except ValueError:
+            return None, "Invalid product ID"
+    else:
+        product_id = None
 
-            if not filtered_products:
-                return render_template('product_display.html',
-                                     error="Product not found")
+    return {
+        'source': source,
+        'product_id': product_id,
+        'query': query,
+        'pagination': pagination,
+        'stream': args.get('stream') == '1',
+    }, None
 
-            products_data = filtered_products
-        except ValueError:
-            return render_template('product_display.html',
-                                 error="Invalid product ID")
 
-    # Render template with products
-    return render_template('product_display.html', products=products_data)
+def load_products(source, product_id=None, query=None, pagination=None,
+                  stream=False):
+    """
+    Read the products to display from the selected source.
+
+    All blocking file and database I/O happens here, except for streamed
+    SQL pages, whose rows are read while the response is sent.
+
+    Args:
+        source (str): 'json', 'csv' or 'sql'
+        product_id (int): Only the product with this ID
+        query (dict): Filters and sort, as returned by parse_product_query
+        pagination (Pagination): Page to return, or None for all products
+        stream (bool): Whether the page will be streamed
+
+    Returns:
+        tuple: (products, None), or (None, error message)
+    """
+    # Look up a single SQL product by primary key instead of loading all rows
+    if source == 'sql' and product_id is not None:
+        with metrics.span('load', source=source):
+            products_data = read_sql_product(product_id)
+        if products_data is None:
+            return None, "Error reading SQL data"
+        if not products_data:
+            return None, "Product not found"
+        metrics.inc('rows', len(products_data), source=source)
+        return products_data, None
+
+    # Filter, page through or stream the table itself rather than
+    # caching all of it
+    if source == 'sql' and (query or pagination is not None or stream):
+        if pagination is not None:
+            products_data = pagination.window(iter_sql_products(
+                query, pagination.offset, pagination.per_page + 1))
+        else:
+            products_data = iter_sql_products(query)
+        if stream:
+            # Rows are read, and timed, while the page is rendered
+            return metrics.timed(products_data, 'load', count='rows',
+                                 source=source), None
+        try:
+            with metrics.span('load', source=source):
+                products_data = list(products_data)
+        except sqlite3.Error:
+            return None, "Error reading SQL data"
+        metrics.inc('rows', len(products_data), source=source)
+        return products_data, None
+
+    # Read data from the appropriate source
+    with metrics.span('load', source=source):
+        catalog, hit = product_cache.lookup(source)
+    status = 'hit' if hit else 'miss'
+    metrics.inc('cache_lookups', source=source, status=status)
+    metrics.note('cache', status)
+
+    # Handle file/database reading errors
+    if catalog is None:
+        return None, f"Error reading {source.upper()} data"
+
+    with metrics.span('filter', source=source):
+        products_data = catalog.products
+
+        # Filter by ID if provided, using the catalog's id index
+        if product_id is not None:
+            products_data = catalog.find(product_id)
+            if not products_data:
+                return None, "Product not found"
+
+        # Filter and sort using the catalog's precomputed orders
+        elif query:
+            products_data = catalog.query(**query)
+
+        if pagination is not None:
+            products_data = pagination.paginate(products_data)
+
+    if not stream:
+        if not isinstance(products_data, Sequence):
+            products_data = list(products_data)
+        metrics.inc('rows', len(products_data), source=source)
+    return products_data, None
+
+
+@app.route('/products')
+def products():
+    """
+    Route to display products from JSON, CSV file, or SQLite database.
+
+    Query Parameters:
+        source (str): Data source - 'json', 'csv', or 'sql' (required)
+        id (int): Optional product ID to filter by
+        category (str): Optional category to filter by
+        min_price (float): Optional lowest price to include
+        max_price (float): Optional highest price to include
+        sort (str): Optional sort field (id, name, category or price),
+                    prefixed with '-' for descending order
+        page (int): Optional page number, starting at 1
+        per_page (int): Optional number of products per page
+        stream (str): '1' to stream the page while it is rendered
+
+    Returns:
+        Rendered template with products or error message
+    """
+    params, error = parse_products_args(request.args)
+    if error is None:
+        products_data, error = load_products(**params)
+    if error is not None:
+        return render_template('product_display.html', error=error)
+
+    # Render the requested page of products
+    try:
+        start = time.perf_counter()
+        page = render_page('product_display.html', products_data,
+                           params['pagination'], params['stream'])
+    except sqlite3.Error:
+        return render_template('product_display.html',
+                               error="Error reading SQL data")
+    return metrics.observe_response('render', start, page,
+                                    source=params['source'])
 
 
 if __name__ == '__main__':
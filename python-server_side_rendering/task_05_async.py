@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+"""
+Async variant of the task_04_db.py product pages.
+
+/products is a coroutine view: reading products.json, products.csv or
+products.db runs on a thread pool of its own per source, off the event
+loop and under a deadline. A slow source can then hold at most its own
+pool, never the threads of the other sources, and requests that wait
+too long get a 503 instead of queueing up behind it. Work whose deadline
+passed is not started, and SQL queries still running at the deadline are
+interrupted, so timed-out requests give their threads back.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from functools import partial
+from itertools import chain
+import os
+import sqlite3
+import threading
+import time
+
+from flask import Flask, render_template, request
+
+from db_pool import deadline
+from pagination import render_page
+from task_04_db import db_pool, load_products, metrics, parse_products_args
+from template_warmup import configure_templates
+
+
+class AsyncFlask(Flask):
+    """
+    Flask app running its async views on one shared event loop.
+
+    Flask's default goes through asgiref, which starts a new thread and a
+    new event loop for every request. Here request threads hand their view
+    to a loop running in a background thread and wait for it; blocking
+    I/O still goes to the thread pools, so the loop only runs the views'
+    own code.
+    """
+
+    _loop = None
+    _loop_pid = None
+    _loop_lock = threading.Lock()
+
+    def event_loop(self):
+        """Return the shared event loop, starting it if needed."""
+        # Threads do not survive fork(): forked workers start their own
+        if self._loop_pid != os.getpid():
+            with self._loop_lock:
+                if self._loop_pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever,
+                                     name='products-loop',
+                                     daemon=True).start()
+                    self._loop, self._loop_pid = loop, os.getpid()
+        return self._loop
+
+    def async_to_sync(self, func):
+        """
+        Wrap a coroutine function to run on the shared event loop.
+
+        The view's task copies the calling thread's context, so it sees
+        the request context as a view running in that thread would.
+        """
+        def run(*args, **kwargs):
+            return asyncio.run_coroutine_threadsafe(
+                func(*args, **kwargs), self.event_loop()).result()
+        return run
+
+
+app = AsyncFlask(__name__)
+configure_templates(app)
+metrics.init_app(app,
+                 server_timing=os.environ.get('PRODUCTS_SERVER_TIMING') == '1')
+
+IO_WORKERS = int(os.environ.get('PRODUCTS_IO_WORKERS', 8))
+IO_TIMEOUT = float(os.environ.get('PRODUCTS_IO_TIMEOUT', 5))
+
+# Shared by every request, one pool per source: all views run on the one
+# event loop, which must never block, so these executors are what bound
+# source I/O. SQL threads beyond the connection pool would only wait for
+# a connection.
+io_executors = {
+    'json': ThreadPoolExecutor(max_workers=IO_WORKERS,
+                               thread_name_prefix='products-json'),
+    'csv': ThreadPoolExecutor(max_workers=IO_WORKERS,
+                              thread_name_prefix='products-csv'),
+    'sql': ThreadPoolExecutor(max_workers=db_pool.size,
+                              thread_name_prefix='products-sql'),
+}
+
+
+def _call_before_deadline(func, *args, **kwargs):
+    """Call func unless the deadline of the current context has passed."""
+    if time.monotonic() > deadline.get():
+        raise asyncio.TimeoutError
+    return func(*args, **kwargs)
+
+
+async def run_io(executor, func, *args, **kwargs):
+    """
+    Run a blocking function on an I/O pool and await its result.
+
+    The function runs with the `deadline` context variable set, so that
+    SQL queries it runs are interrupted once IO_TIMEOUT has elapsed.
+
+    Args:
+        executor (ThreadPoolExecutor): The pool to run on
+        func (callable): The blocking function
+        *args, **kwargs: Its arguments
+
+    Returns:
+        The function's return value
+
+    Raises:
+        asyncio.TimeoutError: If it did not finish within IO_TIMEOUT
+    """
+    loop = asyncio.get_running_loop()
+    # Carry the request context over, so stage timings reach flask.g
+    context = contextvars.copy_context()
+    limit = time.monotonic() + IO_TIMEOUT
+    context.run(deadline.set, limit)
+    try:
+        result = await asyncio.wait_for(
+            loop.run_in_executor(executor, partial(
+                context.run, _call_before_deadline, func, *args, **kwargs)),
+            IO_TIMEOUT)
+    except sqlite3.Error:
+        if time.monotonic() < limit:
+            raise
+    # An interrupted query ends, in an error, just after the deadline
+    if time.monotonic() >= limit:
+        raise asyncio.TimeoutError
+    return result
+
+
+def load_first_products(**params):
+    """
+    Call load_products, also reading the first rows of a streamed page.
+
+    Streamed pages are peeked at before their response starts, so reading
+    the first rows here keeps that I/O off the event loop; the rest is
+    read by the server thread while the response is sent.
+
+    Returns:
+        tuple: (products, None), or (None, error message)
+    """
+    products_data, error = load_products(**params)
+    if error is not None or not params['stream']:
+        return products_data, error
+
+    products_data = iter(products_data)
+    try:
+        first = next(products_data)
+    except StopIteration:
+        return [], None
+    except sqlite3.Error:
+        return None, "Error reading SQL data"
+    return chain([first], products_data), None
+
+
+@app.route('/products')
+async def products():
+    """
+    Route to display products from JSON, CSV file, or SQLite database.
+
+    Accepts the same query parameters as task_04_db.products.
+
+    Returns:
+        Rendered template with products or error message
+    """
+    params, error = parse_products_args(request.args)
+    if error is None:
+        try:
+            products_data, error = await run_io(
+                io_executors[params['source']], load_first_products,
+                **params)
+        except asyncio.TimeoutError:
+            return render_template(
+                'product_display.html',
+                error=f"Timed out reading {params['source'].upper()} data"
+            ), 503
+    if error is not None:
+        return render_template('product_display.html', error=error)
+
+    # Render the requested page of products
+    try:
+        start = time.perf_counter()
+        page = render_page('product_display.html', products_data,
+                           params['pagination'], params['stream'])
+    except sqlite3.Error:
+        return render_template('product_display.html',
+                               error="Error reading SQL data")
+    return metrics.observe_response('render', start, page,
+                                    source=params['source'])
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""
+Jinja bytecode cache and template warmup for the Flask apps.
+
+Templates are normally compiled on the first request that renders them.
+Warming up compiles every template in templates/ while the app is
+created, and an optional FileSystemBytecodeCache lets the compiled code be
+reused by the next worker or deploy instead of recompiling the sources.
+
+Environment:
+    JINJA_BYTECODE_CACHE_DIR: Directory of the bytecode cache (disabled
+                              if unset)
+    JINJA_WARMUP: Set to 0 to compile templates lazily instead
+"""
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def warmup_templates(app, extensions=('.html',)):
+    """
+    Compile every template of an app ahead of the first request.
+
+    Args:
+        app: The Flask application
+        extensions (tuple): Suffixes of the files to compile
+
+    Returns:
+        tuple: (number of templates compiled, seconds spent)
+    """
+    start = time.perf_counter()
+    names = app.jinja_env.list_templates(
+        filter_func=lambda name: name.endswith(extensions))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names), time.perf_counter() - start
+
+
+def configure_templates(app, cache_dir=None, warmup=None):
+    """
+    Set up the bytecode cache of an app and warm up its templates.
+
+    Args:
+        app: The Flask application
+        cache_dir (str): Bytecode cache directory, defaults to
+                         $JINJA_BYTECODE_CACHE_DIR (no cache if unset)
+        warmup (bool): Compile templates now, defaults to $JINJA_WARMUP
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+    if warmup is None:
+        warmup = os.environ.get('JINJA_WARMUP', '1') != '0'
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    if warmup:
+        count, elapsed = warmup_templates(app)
+        app.logger.debug("Compiled %d templates in %.1f ms",
+                         count, elapsed * 1000)
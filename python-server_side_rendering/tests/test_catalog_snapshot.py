@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from catalog_snapshot import export_snapshot, load_snapshot  # noqa: E402
+from catalog_snapshot import snapshot_loader  # noqa: E402
+from product_cache import Catalog, file_version  # noqa: E402
+
+PRODUCTS = [
+    {'id': 2, 'name': 'Coffee Mug', 'category': 'Home Goods', 'price': 15.99},
+    {'id': 1, 'name': 'Laptop', 'category': 'Electronics', 'price': 799.99},
+    {'id': 3, 'name': 'Café', 'category': 'Home Goods', 'price': 4.5},
+]
+
+
+def rewrite(path, text):
+    """Rewrite a file and move its mtime forward."""
+    path.write_text(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'products.json.snap')
+    export_snapshot(PRODUCTS, path, (1, 2, 3))
+    snapshot = load_snapshot(path, (1, 2, 3))
+    assert list(snapshot) == PRODUCTS
+    assert snapshot.source_version == (1, 2, 3)
+    assert Catalog(snapshot).find(3) == [PRODUCTS[2]]
+
+
+def test_stale_or_invalid_snapshots_are_ignored(tmp_path):
+    path = tmp_path / 'products.json.snap'
+    export_snapshot(PRODUCTS, str(path), (1, 2, 3))
+    assert load_snapshot(str(path), (1, 2, 4)) is None
+    path.write_bytes(path.read_bytes()[:40])
+    assert load_snapshot(str(path)) is None
+    assert load_snapshot(str(tmp_path / 'missing.snap')) is None
+
+
+def test_loader_reparses_a_changed_source(tmp_path):
+    source = tmp_path / 'products.json'
+    source.write_text(json.dumps(PRODUCTS))
+    reads = []
+
+    def reader():
+        reads.append(1)
+        return json.loads(source.read_text())
+
+    load = snapshot_loader(str(source), reader, write=True)
+    assert load() == PRODUCTS
+    assert os.path.exists(f'{source}.snap')
+    # Mapped from the snapshot, without parsing the source
+    assert list(load()) == PRODUCTS
+    assert len(reads) == 1
+
+    rewrite(source, json.dumps(PRODUCTS[:1]))
+    assert load() == PRODUCTS[:1]
+    assert len(reads) == 2
+    assert load_snapshot(f'{source}.snap').source_version == \
+        file_version(str(source))
+
+
+def test_catalog_indexes_a_snapshot_by_column(tmp_path):
+    path = str(tmp_path / 'products.json.snap')
+    export_snapshot(PRODUCTS, path)
+    catalog = Catalog(load_snapshot(path))
+    assert [p['id'] for p in catalog.query(sort='-price')] == [1, 2, 3]
+    assert catalog.in_category('Home Goods') == [PRODUCTS[0], PRODUCTS[2]]
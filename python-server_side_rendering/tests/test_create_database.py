@@ -0,0 +1,94 @@
+import json
+import os
+import sqlite3
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from create_database import SECONDARY_INDEXES  # noqa: E402
+from create_database import import_products, iter_json_array  # noqa: E402
+
+PRODUCTS = [
+    {'id': 1, 'name': 'Laptop', 'category': 'Electronics', 'price': 799.99},
+    {'id': 2, 'name': 'Café [large]', 'category': 'Home', 'price': 15},
+]
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 1000])
+@pytest.mark.parametrize('document', [
+    PRODUCTS,
+    {'products': PRODUCTS},
+    {'tags': ['a', {'b': [1]}], 'count': 2, 'products': PRODUCTS,
+     'more': [3]},
+])
+def test_json_array_is_read_in_chunks(document, size):
+    text = json.dumps(document, indent=1)
+    assert list(iter_json_array(chunked(text, size))) == PRODUCTS
+    data = text.encode('utf-8')
+    assert list(iter_json_array(chunked(data, size))) == PRODUCTS
+
+
+@pytest.mark.parametrize('text', [
+    '{"tags": [1, 2]}', '{"products": {"id": 1}}', '[{"id": 1}',
+    '[{"id": 1}, {"id"', '"products"', '',
+])
+def test_documents_without_a_products_array_are_rejected(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(text, 3)))
+
+
+def write_products(path, products):
+    path.write_text(json.dumps({'products': products}))
+    return str(path)
+
+
+def read_db(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT * FROM Products ORDER BY id').fetchall()
+    indexes = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    return rows, indexes
+
+
+def test_import_replaces_or_appends(tmp_path):
+    db_path = str(tmp_path / 'products.db')
+    source = write_products(tmp_path / 'products.json', PRODUCTS)
+    assert import_products(source, db_path, batch_size=1) == 2
+
+    other = dict(PRODUCTS[0], id=3)
+    source = write_products(tmp_path / 'more.json', [other])
+    import_products(source, db_path, append=True)
+    rows, indexes = read_db(db_path)
+    assert [row[0] for row in rows] == [1, 2, 3]
+    assert indexes >= set(SECONDARY_INDEXES)
+
+    import_products(source, db_path)
+    rows, indexes = read_db(db_path)
+    assert rows == [(3, 'Laptop', 'Electronics', 799.99)]
+    assert indexes >= set(SECONDARY_INDEXES)
+
+
+def test_import_of_csv(tmp_path):
+    source = tmp_path / 'products.csv'
+    source.write_text('id,name,category,price\n1,Pen,Office,1.5\n')
+    db_path = str(tmp_path / 'products.db')
+    import_products(str(source), db_path)
+    assert read_db(db_path)[0] == [(1, 'Pen', 'Office', 1.5)]
+
+
+def test_failed_import_keeps_the_previous_products(tmp_path):
+    db_path = str(tmp_path / 'products.db')
+    import_products(write_products(tmp_path / 'products.json', PRODUCTS),
+                    db_path)
+    before = read_db(db_path)
+
+    bad = [dict(PRODUCTS[0], id=5), dict(PRODUCTS[1], price='free')]
+    with pytest.raises(ValueError, match='#2'):
+        import_products(write_products(tmp_path / 'bad.json', bad), db_path,
+                        batch_size=1)
+    assert read_db(db_path) == before
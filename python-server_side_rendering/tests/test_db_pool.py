@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import sys
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import db_pool  # noqa: E402
+from db_pool import PoolTimeout, SQLitePool  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a database holding a single-column table of 3 rows."""
+    path = str(tmp_path / 'products.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE Products (id INTEGER PRIMARY KEY)')
+    conn.executemany('INSERT INTO Products VALUES (?)', [(1,), (2,), (3,)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_connections_are_reused(db_path):
+    pool = SQLitePool(db_path, size=2)
+    for _ in range(3):
+        with pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM Products').fetchone() \
+                == (3,)
+    stats = pool.stats()
+    assert (stats['created'], stats['reused'], stats['open']) == (1, 2, 1)
+
+
+def test_exhausted_pool_times_out(db_path):
+    pool = SQLitePool(db_path, size=1, timeout=0.05)
+    with pool.connection():
+        start = time.monotonic()
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert time.monotonic() - start >= 0.05
+    assert pool.stats()['waits'] == 1
+    # The slot is free again once the connection is returned
+    with pool.connection():
+        pass
+
+
+def test_connections_are_read_only(db_path):
+    pool = SQLitePool(db_path)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute('DELETE FROM Products')
+
+
+def test_replaced_database_drops_idle_connections(db_path, tmp_path):
+    pool = SQLitePool(db_path)
+    with pool.connection():
+        pass
+    new_path = str(tmp_path / 'new.db')
+    conn = sqlite3.connect(new_path)
+    conn.execute('CREATE TABLE Products (id INTEGER PRIMARY KEY)')
+    conn.commit()
+    conn.close()
+    os.replace(new_path, db_path)
+
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM Products').fetchone() \
+            == (0,)
+    assert pool.stats()['discarded'] == 1
+
+
+def test_wait_is_capped_at_the_deadline(db_path):
+    pool = SQLitePool(db_path, size=1, timeout=10)
+    token = db_pool.deadline.set(time.monotonic() + 0.05)
+    try:
+        with pool.connection():
+            start = time.monotonic()
+            with pytest.raises(PoolTimeout):
+                pool.acquire()
+            assert time.monotonic() - start < 5
+    finally:
+        db_pool.deadline.reset(token)
+
+
+def test_queries_are_interrupted_past_the_deadline(db_path):
+    pool = SQLitePool(db_path, size=1)
+    token = db_pool.deadline.set(time.monotonic() - 1)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection() as conn:
+                conn.execute('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL '
+                             'SELECT i + 1 FROM n) SELECT MAX(i) FROM n')
+    finally:
+        db_pool.deadline.reset(token)
+    # The failed connection was discarded, not put back
+    assert pool.stats()['discarded'] == 1
+    assert pool.stats()['open'] == 0
@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from json_store import JSONFileStore  # noqa: E402
+
+PRODUCTS = [{'id': 1, 'name': 'Laptop'}, {'id': 2, 'name': 'Mug'}]
+
+
+def rewrite(path, text):
+    """Rewrite a file and move its mtime forward."""
+    path.write_text(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store of {"products": [...]} documents, polled by hand."""
+    path = tmp_path / 'products.json'
+    path.write_text(json.dumps({'products': PRODUCTS}))
+    return path, JSONFileStore(str(path), lambda data: data['products'],
+                               default=[])
+
+
+def test_store_reloads_a_changed_file(store):
+    path, store = store
+    assert store.snapshot == PRODUCTS
+    assert not store.refresh()
+    rewrite(path, json.dumps({'products': PRODUCTS[:1]}))
+    assert store.refresh()
+    assert store.snapshot == PRODUCTS[:1]
+    assert store.generation == 2
+
+
+def test_store_keeps_the_last_good_snapshot(store):
+    path, store = store
+    rewrite(path, '{"products": [')
+    assert not store.refresh()
+    rewrite(path, json.dumps({'items': []}))
+    assert not store.refresh()
+    assert store.snapshot == PRODUCTS
+
+    rewrite(path, json.dumps({'products': []}))
+    assert store.refresh()
+    assert store.snapshot == []
+
+
+def test_store_serves_the_default_once_the_file_is_removed(store):
+    path, store = store
+    path.unlink()
+    assert store.refresh()
+    assert store.snapshot == []
+
+
+def test_watcher_picks_up_changes(store):
+    path, store = store
+    store.interval = 0.01
+    store.start()
+    try:
+        rewrite(path, json.dumps({'products': []}))
+        deadline = time.monotonic() + 5
+        while store.snapshot and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store.snapshot == []
+    finally:
+        store.stop()
+    assert store._thread is None
@@ -0,0 +1,115 @@
+import os
+import sys
+import pytest
+from flask import Flask
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_04_db  # noqa: E402
+from create_database import import_products  # noqa: E402
+from db_pool import SQLitePool  # noqa: E402
+from metrics import BUCKETS, Metrics  # noqa: E402
+
+
+def samples(text):
+    """Map each sample of an exposition text to its value."""
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in text.splitlines() if not line.startswith('#')}
+
+
+def test_histograms_counters_and_gauges():
+    metrics = Metrics('test')
+    metrics.observe('load', 0.003, source='json')
+    metrics.observe('load', 10, source='json')
+    metrics.inc('rows', 5, source='a"b')
+    metrics.inc('rows', source='a"b')
+    metrics.gauge('open', "Open things.", lambda: {(('state', 'idle'),): 2})
+    text = metrics.render()
+    values = samples(text)
+
+    labels = 'source="json",stage="load"'
+    assert values[f'test_stage_seconds_bucket{{{labels},le="0.0025"}}'] == 0
+    assert values[f'test_stage_seconds_bucket{{{labels},le="0.005"}}'] == 1
+    assert values[f'test_stage_seconds_bucket{{{labels},le="5.0"}}'] == 1
+    assert values[f'test_stage_seconds_bucket{{{labels},le="+Inf"}}'] == 2
+    assert values[f'test_stage_seconds_count{{{labels}}}'] == 2
+    assert values[f'test_stage_seconds_sum{{{labels}}}'] == 10.003
+    assert len([k for k in values if '_bucket' in k]) == len(BUCKETS) + 1
+    assert values['test_rows_total{source="a\\"b"}'] == 6
+    assert values['test_open{state="idle"}'] == 2
+    assert '# TYPE test_rows_total counter' in text.splitlines()
+
+
+def test_timed_counts_production_time_and_items():
+    metrics = Metrics('test')
+
+    def items():
+        yield 1
+        yield 2
+        yield 3
+
+    timed = metrics.timed(items(), 'render', elapsed=1.0, count='rows')
+    assert next(timed) == 1
+    # Closed early, the stage is still recorded with the items produced
+    timed.close()
+    values = samples(metrics.render())
+    assert values['test_stage_seconds_count{stage="render"}'] == 1
+    assert 1.0 <= values['test_stage_seconds_sum{stage="render"}'] < 1.1
+    assert values['test_rows_total'] == 1
+
+
+def test_server_timing_header():
+    app = Flask(__name__)
+    metrics = Metrics('test')
+    metrics.init_app(app, server_timing=True)
+
+    @app.route('/')
+    def index():
+        with metrics.span('load'):
+            pass
+        metrics.note('cache', 'hit')
+        return 'ok'
+
+    resp = app.test_client().get('/')
+    entries = resp.headers['Server-Timing'].split(', ')
+    assert entries[0].startswith('load;dur=')
+    assert entries[1] == 'cache;desc="hit"'
+    assert 'Server-Timing' not in app.test_client().get('/metrics').headers
+
+
+@pytest.fixture
+def products_db(tmp_path, monkeypatch):
+    """products.db holding 12 products, served through a fresh pool."""
+    source = tmp_path / 'products.csv'
+    lines = ['id,name,category,price']
+    lines += [f'{i},Product {i},C,{i}' for i in range(1, 13)]
+    source.write_text('\n'.join(lines) + '\n')
+    db_path = str(tmp_path / 'products.db')
+    import_products(str(source), db_path)
+    pool = SQLitePool(db_path, size=1)
+    monkeypatch.setattr(task_04_db, 'db_pool', pool)
+    yield
+    pool.close()
+
+
+def test_products_stages_are_scraped(products_db):
+    client = task_04_db.app.test_client()
+    before = samples(client.get('/metrics').get_data(as_text=True))
+    for query in ('', '&stream=1'):
+        resp = client.get(f'/products?source=sql&per_page=5{query}')
+        assert 'Product 5' in resp.get_data(as_text=True)
+    resp = client.get('/metrics')
+    assert resp.mimetype == 'text/plain'
+    after = samples(resp.get_data(as_text=True))
+
+    def added(sample):
+        return after[sample] - before.get(sample, 0)
+
+    for stage in ('load', 'render'):
+        labels = f'source="sql",stage="{stage}"'
+        assert added(f'products_stage_seconds_count{{{labels}}}') == 2
+        assert added(f'products_stage_seconds_bucket'
+                     f'{{{labels},le="+Inf"}}') == 2
+        assert added(f'products_stage_seconds_sum{{{labels}}}') > 0
+    # The products of both pages, streamed or not
+    assert added('products_rows_total{source="sql"}') == 10
+    assert after['products_db_pool_connections{state="in_use"}'] == 0
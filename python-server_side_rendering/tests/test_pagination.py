@@ -0,0 +1,97 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_04_db  # noqa: E402
+from create_database import import_products  # noqa: E402
+from db_pool import SQLitePool  # noqa: E402
+from pagination import MAX_PER_PAGE, Pagination  # noqa: E402
+from pagination import parse_pagination  # noqa: E402
+
+
+@pytest.fixture
+def products_db(tmp_path, monkeypatch):
+    """products.db holding 25 products, served through a fresh pool."""
+    source = tmp_path / 'products.csv'
+    lines = ['id,name,category,price']
+    lines += [f'{i},Product {i},{"AB"[i % 2]},{i % 5}' for i in range(1, 26)]
+    source.write_text('\n'.join(lines) + '\n')
+    db_path = str(tmp_path / 'products.db')
+    import_products(str(source), db_path)
+    pool = SQLitePool(db_path, size=1)
+    monkeypatch.setattr(task_04_db, 'db_pool', pool)
+    yield
+    pool.close()
+
+
+def test_paginate_a_sequence():
+    products = list(range(1, 8))
+    first = Pagination(1, 3)
+    assert list(first.paginate(products)) == [1, 2, 3]
+    assert first.has_next
+
+    last = Pagination(3, 3)
+    assert list(last.paginate(products)) == [7]
+    assert not last.has_next
+
+
+def test_paginate_an_iterator():
+    page = Pagination(2, 3)
+    assert list(page.paginate(iter(range(1, 7)))) == [4, 5, 6]
+    assert not page.has_next
+
+
+def test_window_stops_after_the_page():
+    consumed = []
+
+    def products():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    page = Pagination(1, 10)
+    assert list(page.window(products())) == list(range(10))
+    assert page.has_next
+    assert len(consumed) == 11
+
+
+def test_parse_pagination():
+    assert parse_pagination({}) is None
+    page = parse_pagination({'page': '3'})
+    assert (page.page, page.offset) == (3, 100)
+    assert parse_pagination({'per_page': '100000'}).per_page == MAX_PER_PAGE
+    for args in ({'page': '0'}, {'per_page': '-1'}, {'page': 'x'}):
+        with pytest.raises(ValueError):
+            parse_pagination(args)
+
+
+@pytest.mark.parametrize('sort', [None, 'price', '-price', 'name'])
+def test_sql_batches_continue_after_the_last_row(products_db, sort):
+    query = {'sort': sort} if sort else {}
+    expected = list(task_04_db.iter_sql_products(query, batch_size=100))
+    assert len(expected) == 25
+    assert list(task_04_db.iter_sql_products(query, batch_size=4)) == \
+        expected
+    assert list(task_04_db.iter_sql_products(
+        query, offset=5, limit=12, batch_size=5)) == expected[5:17]
+
+
+def test_streamed_pages_do_not_hold_a_connection(products_db):
+    products = task_04_db.iter_sql_products(batch_size=10)
+    next(products)
+    # The only connection of the pool is back while the page is consumed
+    assert task_04_db.db_pool.stats()['in_use'] == 0
+    assert len(list(products)) == 24
+
+
+def test_streamed_page_matches_the_rendered_page(products_db):
+    client = task_04_db.app.test_client()
+    url = '/products?source=sql&per_page=10&page=2'
+    page = client.get(url).get_data(as_text=True)
+    streamed = client.get(url + '&stream=1').get_data(as_text=True)
+    assert 'Product 11' in page and 'Product 21' not in page
+    assert 'page=3' in page and 'page=1' in page
+    # The page links keep the stream parameter
+    streamed = streamed.replace('&amp;stream=1', '')
+    assert ' '.join(streamed.split()) == ' '.join(page.split())
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from product_cache import Catalog, ProductCache  # noqa: E402
+from product_cache import SQLiteVersion  # noqa: E402
+from product_cache import file_version  # noqa: E402
+
+
+def touch(path, text):
+    """Rewrite a file and move its mtime forward."""
+    path.write_text(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A products file, a cache of it and the number of loads."""
+    path = tmp_path / 'products.txt'
+    path.write_text('1')
+    loads = []
+
+    def loader():
+        loads.append(path.read_text())
+        return [{'id': int(i), 'name': f'P{i}', 'category': 'C',
+                 'price': 1.0} for i in path.read_text().split(',')]
+
+    cache = ProductCache()
+    cache.register('file', loader, lambda: file_version(str(path)))
+    return path, cache, loads
+
+
+def test_unchanged_source_is_served_from_cache(source):
+    path, cache, loads = source
+    first, hit = cache.lookup('file')
+    assert not hit
+    second, hit = cache.lookup('file')
+    assert hit and second is first
+    assert loads == ['1']
+
+
+def test_changed_file_is_reloaded(source):
+    path, cache, loads = source
+    assert len(cache.get('file')) == 1
+    touch(path, '1,2')
+    catalog, hit = cache.lookup('file')
+    assert not hit
+    assert [p['id'] for p in catalog.products] == [1, 2]
+    assert cache.stats()['misses'] == 2
+
+
+def test_invalidate_forces_a_reload(source):
+    path, cache, loads = source
+    cache.get('file')
+    cache.invalidate('file')
+    cache.get('file')
+    assert loads == ['1', '1']
+
+
+def test_missing_source_is_not_cached(source):
+    path, cache, loads = source
+    path.unlink()
+    cache.register('file', lambda: [], lambda: file_version(str(path)))
+    cache.get('file')
+    cache.get('file')
+    assert cache.stats()['cached'] == []
+
+
+def test_failed_load_is_not_cached():
+    cache = ProductCache()
+    cache.register('broken', lambda: None, lambda: 1)
+    assert cache.lookup('broken') == (None, False)
+    assert cache.stats()['cached'] == []
+
+
+def test_sqlite_version_changes_on_commit(tmp_path):
+    path = str(tmp_path / 'products.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE Products (id INTEGER PRIMARY KEY)')
+    conn.commit()
+    version = SQLiteVersion(path)
+    before = version()
+    assert version() == before
+    conn.execute('INSERT INTO Products VALUES (1)')
+    conn.commit()
+    conn.close()
+    assert version() != before
+    version.close()
+
+
+def test_catalog_finds_products_by_id():
+    products = [{'id': i, 'category': 'C'} for i in (3, 1, 2)]
+    catalog = Catalog(products)
+    assert catalog.find(1) == [products[1]]
+    assert catalog.find(4) == []
+
+
+def test_catalog_keeps_duplicated_ids():
+    products = [{'id': 1, 'category': 'A'}, {'id': 2, 'category': 'B'},
+                {'id': 1, 'category': 'B'}]
+    catalog = Catalog(products)
+    assert catalog.find(1) == [products[0], products[2]]
+    assert catalog.find(2) == [products[1]]
+
+
+def test_catalog_lists_a_category_in_catalog_order():
+    products = [{'id': i, 'category': 'AB'[i % 2]} for i in range(5)]
+    catalog = Catalog(products)
+    assert [p['id'] for p in catalog.in_category('A')] == [0, 2, 4]
+    assert catalog.in_category('missing') == []
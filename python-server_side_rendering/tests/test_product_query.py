@@ -0,0 +1,108 @@
+import os
+import random
+import sqlite3
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_04_db  # noqa: E402
+from create_database import create_indexes, create_schema  # noqa: E402
+from db_pool import SQLitePool  # noqa: E402
+from product_cache import Catalog, parse_product_query  # noqa: E402
+from task_04_db import compile_product_query  # noqa: E402
+
+# Few distinct names and prices, so that sorts have many ties
+PRODUCTS = [
+    {'id': i, 'name': f'Product {i % 4}', 'category': 'ABC'[i % 3],
+     'price': float(i * 7 % 5)}
+    for i in random.Random(0).sample(range(1, 61), 60)
+]
+
+QUERIES = [
+    {},
+    {'category': 'A'},
+    {'category': 'missing'},
+    {'sort': 'price'},
+    {'sort': '-price'},
+    {'sort': '-name'},
+    {'category': 'B', 'sort': 'name'},
+    {'min_price': 1, 'max_price': 3},
+    {'min_price': 2, 'sort': '-price'},
+    {'category': 'C', 'min_price': 1, 'max_price': 3, 'sort': '-name'},
+    {'category': 'A', 'max_price': 2, 'sort': 'id'},
+    {'category': 'A', 'min_price': 2, 'sort': '-id'},
+    {'min_price': 3, 'max_price': 1},
+    {'category': 'missing', 'min_price': 1},
+]
+
+
+@pytest.fixture(scope='module')
+def products_db(tmp_path_factory):
+    """The products of PRODUCTS, in products.db."""
+    path = str(tmp_path_factory.mktemp('db') / 'products.db')
+    conn = sqlite3.connect(path)
+    create_schema(conn.cursor())
+    create_indexes(conn.cursor())
+    conn.executemany('INSERT INTO Products VALUES (?, ?, ?, ?)',
+                     [tuple(p.values()) for p in PRODUCTS])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def sql_query(path, query):
+    sql, params = compile_product_query(**query)
+    conn = sqlite3.connect(path)
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_catalog_query_filters(query):
+    result = Catalog(PRODUCTS).query(**query)
+    expected = [p for p in PRODUCTS
+                if p['category'] == query.get('category', p['category'])
+                and p['price'] >= query.get('min_price', p['price'])
+                and p['price'] <= query.get('max_price', p['price'])]
+    assert sorted(p['id'] for p in result) == \
+        sorted(p['id'] for p in expected)
+    if 'sort' not in query:
+        # Catalog order is kept without a sort
+        assert result == expected
+
+
+@pytest.mark.parametrize('query', [q for q in QUERIES if 'sort' in q])
+def test_catalog_sorts_like_sql(products_db, query):
+    catalog = Catalog(PRODUCTS)
+    # A second query reuses the cached orders
+    for _ in range(2):
+        assert [p['id'] for p in catalog.query(**query)] == \
+            sql_query(products_db, query)
+
+
+def test_inverted_price_range_is_empty(products_db):
+    query = {'min_price': 3, 'max_price': 1}
+    assert Catalog(PRODUCTS).query(**query) == []
+    assert sql_query(products_db, query) == []
+
+
+def test_sql_pages_are_filtered_and_sorted(products_db, monkeypatch):
+    pool = SQLitePool(products_db, size=1)
+    monkeypatch.setattr(task_04_db, 'db_pool', pool)
+    query = {'category': 'A', 'min_price': 2, 'sort': '-price'}
+    products = list(task_04_db.iter_sql_products(query, 3, 4, batch_size=2))
+    assert [p['id'] for p in products] == sql_query(products_db, query)[3:7]
+    pool.close()
+
+
+def test_parse_product_query():
+    assert parse_product_query({'category': 'A', 'min_price': '1.5',
+                                'sort': '-price'}) == \
+        {'category': 'A', 'min_price': 1.5, 'sort': '-price'}
+    assert parse_product_query({'category': '', 'max_price': ''}) == {}
+    for args in ({'sort': 'weight'}, {'min_price': 'cheap'}):
+        with pytest.raises(ValueError):
+            parse_product_query(args)
+    with pytest.raises(ValueError):
+        compile_product_query(sort='-weight')
@@ -0,0 +1,81 @@
+import os
+import sys
+import pytest
+from flask import Flask
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from response_cache import ResponseCache, templates_version  # noqa: E402
+
+
+@pytest.fixture
+def page_app():
+    """An app whose page renders the current data version."""
+    app = Flask(__name__)
+    cache = ResponseCache(maxsize=2)
+    data = {'version': 1, 'renders': 0}
+
+    @app.route('/page')
+    @cache.cached(lambda: data['version'])
+    def page():
+        data['renders'] += 1
+        return f"version {data['version']}"
+
+    return app.test_client(), cache, data
+
+
+def test_response_cache_misses_on_a_new_data_version(page_app):
+    client, cache, data = page_app
+    assert client.get('/page').data == b'version 1'
+    assert client.get('/page').data == b'version 1'
+    data['version'] = 2
+    assert client.get('/page').data == b'version 2'
+    assert data['renders'] == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_response_cache_revalidates_with_etag(page_app):
+    client, cache, data = page_app
+    etag = client.get('/page').headers['ETag']
+    resp = client.get('/page', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    data['version'] = 2
+    resp = client.get('/page', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+
+
+def test_response_cache_keys_on_query_and_evicts(page_app):
+    client, cache, data = page_app
+    for page in ('1', '2', '3'):
+        client.get('/page', query_string={'p': page})
+    assert cache.stats()['evictions'] == 1
+    client.get('/page', query_string={'p': '3'})
+    assert data['renders'] == 3
+
+
+def test_templates_are_stamped_once_unless_reloaded(page_app, monkeypatch):
+    client, cache, data = page_app
+    app = client.application
+    scans = []
+    monkeypatch.setattr('response_cache.templates_version',
+                        lambda app: scans.append(1) or len(scans))
+    for _ in range(2):
+        client.get('/page')
+    assert scans == [1]
+
+    app.jinja_env.auto_reload = True
+    client.get('/page')
+    client.get('/page')
+    # A new stamp on every request misses the cache
+    assert len(scans) == 3
+    assert data['renders'] == 3
+
+
+def test_templates_version_changes_with_a_template(tmp_path):
+    (tmp_path / 'templates').mkdir()
+    template = tmp_path / 'templates' / 'page.html'
+    template.write_text('a')
+    app = Flask(__name__, root_path=str(tmp_path))
+    before = templates_version(app)
+    template.write_text('ab')
+    assert templates_version(app) != before
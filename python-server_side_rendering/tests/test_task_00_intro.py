@@ -0,0 +1,190 @@
+import json
+import os
+import sys
+import zipfile
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from task_00_intro import CompiledTemplate, read_attendees  # noqa: E402
+from task_00_intro import generate_invitations  # noqa: E402
+
+TEMPLATE = ("Hello {name}, welcome to {event_title} on {event_date} "
+            "at {event_location}!")
+
+ATTENDEES = [
+    {'name': 'Alice', 'event_title': 'PyCon', 'event_date': '2024-07-15',
+     'event_location': 'New York'},
+    {'name': 'Bob', 'event_title': 'AI Summit', 'event_date': None},
+]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in an empty directory."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_template_keeps_literal_braces():
+    template = CompiledTemplate("{{name}} {name} {unknown} {} {event_date")
+    # The same result as str.replace('{name}', ...) on the template
+    assert template.render({'name': 'Alice'}) == \
+        "{Alice} Alice {unknown} {} {event_date"
+
+
+def test_one_file_per_attendee(capsys):
+    generate_invitations(TEMPLATE, ATTENDEES)
+    assert read('output_1.txt') == \
+        "Hello Alice, welcome to PyCon on 2024-07-15 at New York!"
+    assert read('output_2.txt') == \
+        "Hello Bob, welcome to AI Summit on N/A at N/A!"
+    assert capsys.readouterr().out.splitlines() == \
+        ["Generated output_1.txt", "Generated output_2.txt"]
+
+
+def test_existing_files_are_skipped(workdir, capsys):
+    (workdir / 'output_1.txt').write_text('kept')
+    generate_invitations(TEMPLATE, ATTENDEES)
+    assert read('output_1.txt') == 'kept'
+    assert capsys.readouterr().out.splitlines() == [
+        "Warning: output_1.txt already exists, skipping.",
+        "Generated output_2.txt",
+    ]
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_pool_messages_keep_the_attendee_order(use_processes, capsys):
+    attendees = [{'name': f'Guest {i}'} for i in range(1, 51)]
+    generate_invitations(TEMPLATE, attendees, workers=3,
+                         use_processes=use_processes, batch_size=4)
+    assert capsys.readouterr().out.splitlines() == \
+        [f"Generated output_{i}.txt" for i in range(1, 51)]
+    assert read('output_50.txt').startswith("Hello Guest 50,")
+
+
+def test_jsonl_output(capsys):
+    generate_invitations(TEMPLATE, ATTENDEES, output='jsonl')
+    with open('invitations.jsonl') as f:
+        records = [json.loads(line) for line in f]
+    assert [(r['index'], r['filename']) for r in records] == \
+        [(1, 'output_1.txt'), (2, 'output_2.txt')]
+    assert records[1]['content'] == \
+        "Hello Bob, welcome to AI Summit on N/A at N/A!"
+    assert capsys.readouterr().out == \
+        "Generated invitations.jsonl with 2 invitations\n"
+
+
+def test_zip_output(capsys):
+    generate_invitations(TEMPLATE, ATTENDEES, output='zip',
+                         output_path='party.zip')
+    with zipfile.ZipFile('party.zip') as archive:
+        assert archive.namelist() == ['output_1.txt', 'output_2.txt']
+        assert archive.read('output_1.txt').decode() == \
+            "Hello Alice, welcome to PyCon on 2024-07-15 at New York!"
+    assert capsys.readouterr().out == \
+        "Generated party.zip with 2 invitations\n"
+
+
+@pytest.mark.parametrize('output', ['jsonl', 'zip'])
+def test_existing_archive_is_not_overwritten(workdir, output, capsys):
+    path = f'invitations.{output}'
+    (workdir / path).write_text('kept')
+    generate_invitations(TEMPLATE, ATTENDEES, output=output)
+    assert read(path) == 'kept'
+    assert capsys.readouterr().out == \
+        f"Warning: {path} already exists, skipping.\n"
+
+
+@pytest.mark.parametrize('template, attendees, output, message', [
+    (None, ATTENDEES, 'files', "Error: Template is not a string"),
+    (TEMPLATE, 'attendees', 'files', "Error: Attendees is not a list"),
+    (TEMPLATE, ATTENDEES, 'pdf', "Error: Unknown output mode 'pdf'"),
+    ('', ATTENDEES, 'files',
+     "Template is empty, no output files generated."),
+    (TEMPLATE, [], 'zip', "No data provided, no output files generated."),
+])
+def test_nothing_is_written_on_invalid_input(workdir, template, attendees,
+                                             output, message, capsys):
+    generate_invitations(template, attendees, output=output)
+    assert capsys.readouterr().out == message + '\n'
+    assert os.listdir(workdir) == []
+
+
+def test_jsonl_errors_are_reported_with_their_line(workdir, capsys):
+    (workdir / 'attendees.jsonl').write_text(
+        '{"name": "Alice"}\n'
+        '\n'
+        '{"name": \n'
+        '["Bob"]\n'
+        '{"name": "Carol"}\n')
+    generate_invitations(TEMPLATE, 'attendees.jsonl')
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("Error: line 3 is not valid JSON (")
+    assert out[1:] == [
+        "Error: line 4 is not a dictionary, skipping.",
+        "Generated output_1.txt",
+        "Generated output_4.txt",
+    ]
+    assert read('output_4.txt').startswith("Hello Carol,")
+
+
+def test_csv_empty_fields_are_rendered_as_na(workdir):
+    (workdir / 'attendees.csv').write_text(
+        'name,event_title,event_date,event_location\n'
+        'Alice,PyCon,,New York\n')
+    generate_invitations(TEMPLATE, workdir / 'attendees.csv')
+    assert read('output_1.txt') == \
+        "Hello Alice, welcome to PyCon on N/A at New York!"
+
+
+def test_missing_attendee_file(workdir, capsys):
+    generate_invitations(TEMPLATE, 'missing.jsonl')
+    assert capsys.readouterr().out.startswith(
+        "Error: Cannot read attendees file: ")
+    assert os.listdir(workdir) == []
+
+
+def test_undecodable_attendee_file(workdir, capsys):
+    (workdir / 'attendees.jsonl').write_bytes(
+        b'{"name": "Alice"}\n{"name": "\xff"}\n')
+    generate_invitations(TEMPLATE, 'attendees.jsonl', output='jsonl')
+    assert "Error: Cannot read attendees file: " in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('attendees', [
+    42, None, {'name': 'Alice'}, 'attendees.txt'])
+def test_non_iterables_are_rejected(attendees, capsys):
+    generate_invitations(TEMPLATE, attendees)
+    assert capsys.readouterr().out == "Error: Attendees is not a list\n"
+
+
+def test_generators_are_read_lazily(capsys):
+    consumed = []
+
+    def attendees():
+        for name in ('Alice', 'Bob', 'Carol'):
+            consumed.append(name)
+            yield {'name': name} if name != 'Bob' else name
+
+    position, records = read_attendees(attendees())
+    assert position == 'item' and consumed == []
+
+    generate_invitations(TEMPLATE, attendees())
+    assert capsys.readouterr().out.splitlines() == [
+        "Error: item 2 is not a dictionary, skipping.",
+        "Generated output_1.txt",
+        "Generated output_3.txt",
+    ]
+
+
+def test_attendee_file_is_opened_lazily(workdir):
+    (workdir / 'attendees.jsonl').write_text('{"name": "Alice"}\n')
+    position, records = read_attendees('attendees.jsonl')
+    (workdir / 'attendees.jsonl').write_text('{"name": "Bob"}\n')
+    assert position == 'line'
+    assert list(records) == [(1, {'name': 'Bob'})]
@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_04_db  # noqa: E402
+import task_05_async  # noqa: E402
+from create_database import import_products  # noqa: E402
+from db_pool import SQLitePool  # noqa: E402
+from task_05_async import app, run_io  # noqa: E402
+
+# Never returns a row, until interrupted at the deadline
+ENDLESS_QUERY = ('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL '
+                 'SELECT i + 1 FROM n) '
+                 'SELECT i, i, i, i FROM n WHERE i < 0')
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    """A one-connection pool to products.db, in the working directory."""
+    monkeypatch.chdir(tmp_path)
+    products = [{'id': i, 'name': f'Product {i}', 'category': 'C',
+                 'price': i} for i in range(1, 11)]
+    with open('products.json', 'w') as f:
+        json.dump(products, f)
+    import_products('products.json')
+    task_04_db.product_cache.invalidate()
+    pool = SQLitePool(str(tmp_path / 'products.db'), size=1)
+    monkeypatch.setattr(task_04_db, 'db_pool', pool)
+    monkeypatch.setattr(task_05_async, 'IO_TIMEOUT', 0.2)
+    yield pool
+    task_04_db.product_cache.invalidate()
+    pool.close()
+
+
+def wait_until(condition, timeout=5):
+    limit = time.monotonic() + timeout
+    while not condition() and time.monotonic() < limit:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.parametrize('query', [
+    'source=json&sort=-price',
+    'source=sql&per_page=3&page=2',
+    'source=sql&per_page=3&page=2&stream=1',
+])
+def test_products_page(pool, query):
+    resp = app.test_client().get(f'/products?{query}')
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert 'Product 4' in body or 'Product 10' in body
+
+
+def test_errors_are_rendered(pool):
+    resp = app.test_client().get('/products?source=sql&id=99')
+    assert resp.status_code == 200
+    assert 'Product not found' in resp.get_data(as_text=True)
+
+
+def test_slow_sql_returns_503_and_its_connection(pool, monkeypatch):
+    monkeypatch.setattr(task_04_db, 'compile_product_query',
+                        lambda **query: (ENDLESS_QUERY, []))
+    start = time.monotonic()
+    resp = app.test_client().get('/products?source=sql&per_page=5')
+    assert resp.status_code == 503
+    assert 'Timed out reading SQL data' in resp.get_data(as_text=True)
+    assert time.monotonic() - start < 2
+    # The interrupted query gives its connection back, discarded
+    assert wait_until(lambda: pool.stats()['in_use'] == 0)
+    assert pool.stats()['discarded'] == 1
+
+
+def test_busy_pool_returns_503_at_the_deadline(pool):
+    with pool.connection():
+        start = time.monotonic()
+        resp = app.test_client().get('/products?source=sql&per_page=5')
+        assert resp.status_code == 503
+        assert time.monotonic() - start < pool.timeout
+
+
+def test_run_io_returns_the_result():
+    executor = ThreadPoolExecutor(max_workers=1)
+    assert asyncio.run(run_io(executor, sum, [1, 2], start=3)) == 6
+    executor.shutdown()
+
+
+def test_run_io_skips_work_past_its_deadline(monkeypatch):
+    monkeypatch.setattr(task_05_async, 'IO_TIMEOUT', 0.1)
+    executor = ThreadPoolExecutor(max_workers=1)
+    calls = []
+
+    async def both():
+        return await asyncio.gather(
+            run_io(executor, time.sleep, 0.3),
+            run_io(executor, calls.append, 'late'),
+            return_exceptions=True)
+
+    results = asyncio.run(both())
+    assert [type(result) for result in results] == \
+        [asyncio.TimeoutError] * 2
+    executor.shutdown(wait=True)
+    # Queued behind the slow call, it was not started after its deadline
+    assert calls == []
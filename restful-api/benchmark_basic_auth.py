@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Measure Basic Auth throughput of task_05_basic_security.py.
+
+Sends GET /basic-protected requests through the Flask test client, spread
+over --users users, for each password hash method, with the verification
+cache disabled and then enabled. Requests run one at a time, so the
+figures are per CPU core.
+
+Usage: ./benchmark_basic_auth.py [--requests 2000] [--users 50]
+"""
+import argparse
+import base64
+import time
+
+import task_05_basic_security
+from task_05_basic_security import VerificationCache, app
+from task_05_basic_security import set_password, users
+
+METHODS = "scrypt:32768:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:100000"
+
+
+def run(method, cache, args):
+    """Time the requests with one hash method and cache.
+
+    Args:
+        method (str): Password hash method
+        cache (VerificationCache): The cache to verify through
+        args (argparse.Namespace): Command line options
+
+    Returns:
+        tuple: (requests per second, password hashes computed)
+    """
+    task_05_basic_security.verification_cache = cache
+    headers = []
+    for i in range(args.users):
+        users[f"bench{i}"] = {"username": f"bench{i}", "role": "user"}
+        set_password(f"bench{i}", f"password{i}", method)
+        token = base64.b64encode(f"bench{i}:password{i}".encode()).decode()
+        headers.append({"Authorization": f"Basic {token}"})
+
+    client = app.test_client()
+    start = time.perf_counter()
+    for i in range(args.requests):
+        resp = client.get("/basic-protected",
+                          headers=headers[i % args.users])
+        assert resp.status_code == 200
+    elapsed = time.perf_counter() - start
+    hashes = cache.misses if cache.ttl > 0 else args.requests
+    return args.requests / elapsed, hashes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--methods", default=METHODS)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--ttl", type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests over {args.users} users")
+    print(f"{'method':<22} {'cache':<5} {'req/s':>9} {'hashes':>7}")
+    for method in args.methods.split(","):
+        for ttl in (0, args.ttl):
+            rate, hashes = run(method, VerificationCache(ttl=ttl), args)
+            print(f"{method:<22} {'on' if ttl else 'off':<5} {rate:>9.0f} "
+                  f"{hashes:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Load test the serving modes of task_03_http_server.py.
+
+Each mode runs the server in a subprocess on a free local port:
+
+    single    one process, one connection at a time (previous behavior)
+    threaded  one process, one thread per connection
+    prefork   --workers processes sharing the port with SO_REUSEPORT
+    asyncio   task_03_asyncio_server.py, one coroutine per connection
+
+Concurrent clients, spread over several processes so the load generator
+is not limited by one interpreter, send requests over keep-alive
+connections. Optional slow clients open a connection and stall halfway
+through their request, as a slow network would. Throughput and latency
+percentiles are printed per mode.
+
+Usage: ./benchmark_http_server.py [--clients 32] [--requests 200]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PATHS = ["/", "/data", "/status", "/info"]
+
+
+def percentile(values, fraction):
+    """Return the value below which `fraction` of the sorted values fall."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def free_port():
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, workers):
+    """Start task_03_http_server.py and wait until it accepts connections.
+
+    Args:
+        mode (str): 'single', 'threaded', 'prefork' or 'asyncio'
+        port (int): Port to listen on
+        workers (int): Worker processes of the prefork mode
+
+    Returns:
+        subprocess.Popen: The server process
+    """
+    script = "task_03_asyncio_server.py" if mode == "asyncio" \
+        else "task_03_http_server.py"
+    command = [sys.executable, os.path.join(HERE, script),
+               "--port", str(port), "--quiet"]
+    if mode == "single":
+        command.append("--no-threads")
+    elif mode == "prefork":
+        command += ["--workers", str(workers)]
+    # Dropped connections of timed out clients are logged on stderr
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def run_clients(port, clients, requests, keep_alive, timeout):
+    """Send requests from client threads; runs in a client process.
+
+    Args:
+        port (int): Server port
+        clients (int): Number of client threads
+        requests (int): Requests sent by each client
+        keep_alive (bool): Reuse one connection per client
+        timeout (float): Socket timeout of each request, in seconds
+
+    Returns:
+        tuple: (list of latencies in seconds, number of failed requests)
+    """
+    latencies = []
+    errors = []
+
+    def client(index):
+        conn = None
+        for number in range(requests):
+            path = PATHS[(index + number) % len(PATHS)]
+            start = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection("127.0.0.1", port,
+                                                      timeout=timeout)
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            except OSError as e:
+                errors.append(e)
+                conn.close()
+                conn = None
+                continue
+            latencies.append(time.perf_counter() - start)
+            if not keep_alive:
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors)
+
+
+def stall(port, count):
+    """Open connections that send half a request line and then wait.
+
+    Args:
+        port (int): Server port
+        count (int): Number of slow clients
+
+    Returns:
+        list: The open sockets, to be closed by the caller
+    """
+    sockets = []
+    for _ in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"GET /data HTTP/1.1\r\nHost: local")
+        sockets.append(sock)
+    return sockets
+
+
+def load_test(port, args):
+    """Run the client processes against a started server.
+
+    Args:
+        port (int): Server port
+        args (argparse.Namespace): Command line options
+
+    Returns:
+        tuple: (latencies, failed requests, elapsed seconds)
+    """
+    processes = max(1, min(args.client_processes, args.clients))
+    per_process = [args.clients // processes + (i < args.clients % processes)
+                   for i in range(processes)]
+    slow = stall(port, args.slow_clients)
+    try:
+        with ProcessPoolExecutor(processes) as pool:
+            start = time.perf_counter()
+            futures = [pool.submit(run_clients, port, clients, args.requests,
+                                   args.keep_alive, args.timeout)
+                       for clients in per_process]
+            results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+    finally:
+        for sock in slow:
+            sock.close()
+    latencies = [value for result in results for value in result[0]]
+    return latencies, sum(result[1] for result in results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="single,threaded,prefork,asyncio")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--client-processes", type=int,
+                        default=os.cpu_count())
+    parser.add_argument("--keep-alive", action=argparse.BooleanOptionalAction,
+                        default=True)
+    parser.add_argument("--slow-clients", type=int, default=0,
+                        help="connections stalled during the whole run")
+    parser.add_argument("--timeout", type=float, default=5,
+                        help="seconds before a request counts as failed")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients x {args.requests} requests, "
+          f"keep-alive {'on' if args.keep_alive else 'off'}, "
+          f"{args.slow_clients} slow clients")
+    print(f"{'mode':<9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'failed':>7}")
+    for mode in args.modes.split(","):
+        port = free_port()
+        server = start_server(mode, port, args.workers)
+        try:
+            latencies, failed, elapsed = load_test(port, args)
+        finally:
+            server.terminate()
+            server.wait()
+        if not latencies:
+            print(f"{mode:<9} {'-':>9} {'-':>8} {'-':>8} {'-':>8} "
+                  f"{failed:>7}")
+            continue
+        print(f"{mode:<9} {len(latencies) / elapsed:>9.0f} "
+              f"{percentile(latencies, 0.50) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.2f} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compare the JSON providers of json_provider.py on the API responses.
+
+For each provider and endpoint, prints the time to build the JSON
+response alone (encode) and to serve a whole request through the Flask
+test client (request):
+
+    /data               task_04_flask.py, listing --users usernames
+    /users/<username>   task_04_flask.py, one user
+    /login              task_05_basic_security.py, a JWT access token
+
+The /login requests also verify a password hash, which costs far more
+than the JSON, so they are repeated --login-requests times only.
+
+Usage: ./benchmark_json_provider.py [--users 10000] [--number 1000]
+"""
+import argparse
+import time
+
+import json_provider
+import task_04_flask
+import task_05_basic_security
+
+
+def per_call(func, number, repeat=3):
+    """Return the best time of a call to func, in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def endpoints(args):
+    """Return (name, app, payload, request function, number) per endpoint.
+
+    Args:
+        args (argparse.Namespace): Command line options
+    """
+    users = task_04_flask.users
+    users.clear()
+    users.update({f"user{i}": {"username": f"user{i}", "name": f"User {i}",
+                               "age": 20 + i % 50, "city": "New York"}
+                  for i in range(args.users)})
+    client = task_04_flask.app.test_client()
+
+    security = task_05_basic_security.app
+    login = {"username": "user1", "password": "password"}
+    token = security.test_client().post("/login", json=login).get_json()
+    security_client = security.test_client()
+
+    return [
+        ("/data", task_04_flask.app, list(users),
+         lambda: client.get("/data"), max(1, args.number // 100)),
+        ("/users/<username>", task_04_flask.app, users["user1"],
+         lambda: client.get("/users/user1"), args.number),
+        ("/login", security, token,
+         lambda: security_client.post("/login", json=login),
+         args.login_requests),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", default="stdlib,orjson")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--number", type=int, default=1000,
+                        help="calls per measurement")
+    parser.add_argument("--login-requests", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.users} users")
+    print(f"{'endpoint':<18} {'provider':<8} {'encode µs':>10} "
+          f"{'request µs':>11}")
+    for name, app, payload, request, number in endpoints(args):
+        for provider in args.providers.split(","):
+            json_provider.init_app(app, provider)
+            with app.app_context():
+                encode = per_call(lambda: app.json.response(payload),
+                                  max(number, args.number // 10))
+            print(f"{name:<18} {provider:<8} {encode:>10.1f} "
+                  f"{per_call(request, number):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Compare the user store backends of user_store.py.
+
+For each backend, in a fresh temporary file:
+
+    insert    users added one at a time, as POST /add_user does
+    bulk      users added by batches of --batch, as POST /users/bulk does
+    lookup    random GET /users/<username> style reads
+    list      listing every username, as GET /data does
+    shared    --processes workers reading random users while one of them
+              keeps adding users, so every lookup also checks for changes
+
+The memory backend is listed for reference only: its users are private to
+each process, so it cannot be shared by several workers.
+
+Usage: ./benchmark_user_store.py [--users 10000] [--lookups 100000]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from user_store import open_user_store
+
+
+def user(i):
+    """Return the data of the i-th test user."""
+    return {"username": f"user{i}", "name": f"User {i}", "age": 20 + i % 50,
+            "city": "New York"}
+
+
+def time_lookups(store, users, lookups, writer=False):
+    """Look random users up, adding new users meanwhile when `writer`.
+
+    Args:
+        store (MutableMapping): The users
+        users (int): Number of existing users
+        lookups (int): Number of lookups
+        writer (bool): Add a user every 100 lookups
+
+    Returns:
+        float: Elapsed seconds
+    """
+    keys = [f"user{random.randrange(users)}" for _ in range(lookups)]
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        store[key]
+        if writer and i % 100 == 0:
+            store[f"new{os.getpid()}-{i}"] = user(i)
+    return time.perf_counter() - start
+
+
+def shared_lookups(spec, users, lookups, writer):
+    """Open a store in a worker process and time lookups in it."""
+    return time_lookups(open_user_store(spec), users, lookups, writer)
+
+
+def benchmark(spec, args):
+    """Run every measurement on one backend.
+
+    Args:
+        spec (str): Backend spec
+        args (argparse.Namespace): Command line options
+
+    Returns:
+        tuple: (inserts/s, bulk inserts/s, lookup µs, list ms,
+               shared lookups/s or None)
+    """
+    bulk_store = open_user_store(spec + "-bulk" if ":" in spec else spec)
+    start = time.perf_counter()
+    for first in range(0, args.users, args.batch):
+        bulk_store.update({f"user{i}": user(i) for i in
+                           range(first, min(first + args.batch, args.users))})
+    bulk = args.users / (time.perf_counter() - start)
+
+    store = open_user_store(spec)
+    start = time.perf_counter()
+    for i in range(args.users):
+        store[f"user{i}"] = user(i)
+    inserts = args.users / (time.perf_counter() - start)
+
+    lookup = time_lookups(store, args.users, args.lookups)
+
+    start = time.perf_counter()
+    assert len(list(store)) == args.users
+    listing = time.perf_counter() - start
+
+    shared = None
+    if not spec.startswith("memory"):
+        ctx = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(args.processes, mp_context=ctx) as pool:
+            start = time.perf_counter()
+            futures = [pool.submit(shared_lookups, spec, args.users,
+                                   args.lookups, i == 0)
+                       for i in range(args.processes)]
+            for future in futures:
+                future.result()
+            shared = (args.processes * args.lookups
+                      / (time.perf_counter() - start))
+    return (inserts, bulk, lookup / args.lookups * 1e6, listing * 1000,
+            shared)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="memory,sqlite,log")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.users} users, {args.lookups} lookups, "
+          f"{args.processes} processes sharing the store")
+    print(f"{'backend':<8} {'inserts/s':>10} {'bulk/s':>10} "
+          f"{'lookup µs':>10} {'list ms':>8} {'shared lookups/s':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends.split(","):
+            spec = backend
+            if backend != "memory":
+                spec = f"{backend}:{os.path.join(tmp, backend)}"
+            inserts, bulk, lookup, listing, shared = benchmark(spec, args)
+            shared = f"{shared:>17.0f}" if shared else f"{'-':>17}"
+            print(f"{backend:<8} {inserts:>10.0f} {bulk:>10.0f} "
+                  f"{lookup:>10.2f} {listing:>8.2f} {shared}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Negotiated gzip/Brotli compression of response bodies.
+
+Shared by task_03_http_server.py, task_03_asyncio_server.py and
+task_04_flask.py. Bodies smaller than a threshold go out as they are,
+since compressing them costs more CPU than it saves bandwidth. Compressed
+static bodies, such as the http servers' fixed routes, are kept in a small
+LRU cache so they are only compressed once per encoding; dynamic bodies
+are compressed without being cached.
+
+Brotli is used when the `brotli` package is installed.
+"""
+from collections import OrderedDict
+import gzip
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Encodings we can produce, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# Bodies smaller than this many bytes are never compressed
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+
+_MISSING = object()
+
+
+def negotiate(accept_encoding, encodings=ENCODINGS):
+    """Pick the encoding of a response from the Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): The request's Accept-Encoding header, or None
+        encodings (tuple): Available encodings, preferred first
+
+    Returns:
+        str: The chosen encoding, or None to send the body as it is
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    """Compress a body.
+
+    Args:
+        body (bytes): The body to compress
+        encoding (str): 'br' or 'gzip'
+
+    Returns:
+        bytes: The compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    # mtime=0 makes the output depend on the body only
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class CompressionCache:
+    """LRU cache of compressed response bodies."""
+
+    def __init__(self, maxsize=128, min_size=MIN_SIZE,
+                 max_cached_size=1 << 20):
+        """
+        Args:
+            maxsize (int): Number of compressed bodies to keep
+            min_size (int): Smallest body worth compressing, in bytes
+            max_cached_size (int): Larger bodies are compressed every time
+        """
+        self.maxsize = maxsize
+        self.min_size = min_size
+        self.max_cached_size = max_cached_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, body, accept_encoding, cache=True):
+        """Return a body encoded for a client, with the headers to add.
+
+        Args:
+            body (bytes): The uncompressed response body
+            accept_encoding (str): The request's Accept-Encoding header
+            cache (bool): Look up and keep the compressed body in the
+                          cache; only worth it for bodies that repeat
+
+        Returns:
+            tuple: (body, tuple of (header name, value) pairs)
+        """
+        if len(body) < self.min_size:
+            return body, ()
+        vary = (("Vary", "Accept-Encoding"),)
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            return body, vary
+
+        key = (encoding, body)
+        cache = cache and len(body) <= self.max_cached_size
+        encoded = _MISSING
+        if cache:
+            with self._lock:
+                encoded = self._entries.get(key, _MISSING)
+                if encoded is not _MISSING:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+        if encoded is _MISSING:
+            encoded = compress(body, encoding)
+            # Send the original when compression does not make it smaller
+            if len(encoded) >= len(body):
+                encoded = None
+            with self._lock:
+                self.misses += 1
+                if cache:
+                    self._entries[key] = encoded
+                    if len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+
+        if encoded is None:
+            return body, vary
+        return encoded, vary + (("Content-Encoding", encoding),)
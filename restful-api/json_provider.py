@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""A Flask JSON provider backed by orjson, with a stdlib fallback.
+
+Shared by task_04_flask.py and task_05_basic_security.py. The provider is
+chosen with the JSON_PROVIDER environment variable:
+
+    orjson      orjson when it is installed, else the stdlib (default)
+    stdlib      Flask's DefaultJSONProvider, built on the json module
+
+Both produce the same JSON for the same data, except that orjson writes
+non-ASCII characters as UTF-8 rather than \\u escapes. Dates, decimals and
+dataclasses still go through Flask's `default` hook, so they are formatted
+the same way. Dicts with non-string keys, which orjson would sort as
+strings, are left to the stdlib.
+"""
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Serialize and parse JSON with orjson.
+
+    Honors the `sort_keys` and `compact` settings of the default provider.
+    Data that orjson cannot serialize, such as integers wider than 64 bits
+    or dicts with non-string keys, is handed to the stdlib provider instead.
+    """
+
+    def _options(self, indent=False):
+        """Return the orjson options matching the provider's settings."""
+        option = (orjson.OPT_PASSTHROUGH_DATETIME
+                  | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        """Serialize data as a JSON string.
+
+        orjson only writes compact JSON, so it is used when compact
+        separators are asked for; otherwise the output, like the stdlib's,
+        has a space after ',' and ':'.
+
+        Args:
+            obj: The data to serialize
+            **kwargs: json.dumps() arguments; any of them, except
+                `default` and compact `separators`, makes the stdlib
+                provider do the work
+
+        Returns:
+            str: The JSON document
+        """
+        if tuple(kwargs.get("separators", ())) == (",", ":") \
+                and set(kwargs) <= {"default", "separators"}:
+            try:
+                return orjson.dumps(obj, kwargs.get("default", self.default),
+                                    self._options()).decode("utf-8")
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """Parse a JSON string or UTF-8 bytes.
+
+        Args:
+            s (str or bytes): The JSON document
+            **kwargs: json.loads() arguments, handled by the stdlib
+
+        Returns:
+            The parsed data
+        """
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Serialize arguments to a JSON response, like flask.jsonify().
+
+        Returns:
+            flask.Response: The response, with a trailing newline
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None
+                                           and self._app.debug)
+        try:
+            body = orjson.dumps(obj, self.default, self._options(indent)
+                                | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_app(app, provider=None):
+    """Install the chosen JSON provider on an application.
+
+    Args:
+        app (flask.Flask): The application
+        provider (str): 'orjson' or 'stdlib', JSON_PROVIDER if None
+
+    Returns:
+        flask.json.provider.JSONProvider: The installed provider
+
+    Raises:
+        ValueError: If the provider is unknown
+    """
+    provider = provider or os.environ.get("JSON_PROVIDER", "orjson")
+    if provider not in ("orjson", "stdlib"):
+        raise ValueError(f"Unknown JSON provider: {provider}")
+    if provider == "orjson" and orjson is not None:
+        app.json = ORJSONProvider(app)
+    else:
+        app.json = DefaultJSONProvider(app)
+    return app.json
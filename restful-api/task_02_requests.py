@@ -1,16 +1,212 @@
 #!/usr/bin/env python3
 """Fetch posts from a RESTful API and save them to a CSV file."""
+import codecs
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import csv
+import itertools
+import json
+import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+API_URL = "https://jsonplaceholder.typicode.com/posts"
+TIMEOUT = 10    # Seconds to connect, then between bytes of the response
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+FIELDNAMES = ["id", "title", "body"]
+
+
+def make_session(concurrency=8, retries=5, backoff=0.5):
+    """Create a session with pooled connections and automatic retries.
+
+    Failed connections and 429/5xx responses are retried with exponential
+    backoff (backoff, 2 * backoff, 4 * backoff... seconds), or after the
+    delay of the Retry-After header when the server sends one. Once the
+    retries are exhausted the last response is returned, so callers see
+    its status code rather than a RetryError.
+
+    Args:
+        concurrency (int): Number of connections kept open per host
+        retries (int): Number of retries of a request
+        backoff (float): Base delay between retries, in seconds
+
+    Returns:
+        requests.Session: The configured session
+    """
+    retry = Retry(total=retries, backoff_factor=backoff,
+                  status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset(["GET"]),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_maxsize=concurrency, pool_block=True,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FetchStats:
+    """Throughput counters of a fetch, shared by its worker threads."""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.items = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, response, items):
+        """Count a successful response.
 
+        Args:
+            response (requests.Response): The response
+            items (int): Number of items it held
+        """
+        retries = response.raw.retries
+        with self._lock:
+            self.requests += 1
+            self.items += items
+            self.bytes += len(response.content)
+            if retries is not None:
+                self.retries += len(retries.history)
 
-def fetch_and_print_posts():
+    def report(self):
+        """Return a one-line throughput summary."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{self.items} items from {self.requests} requests in "
+                f"{elapsed:.2f}s: {self.requests / elapsed:.1f} req/s, "
+                f"{self.items / elapsed:.1f} items/s, "
+                f"{self.bytes / elapsed / 1024:.1f} KiB/s, "
+                f"{self.retries} retries")
+
+
+def fetch_json(session, url, params=None, timeout=TIMEOUT, stats=None):
+    """GET a URL and decode its JSON body.
+
+    Args:
+        session (requests.Session): Session to send the request with
+        url (str): URL to fetch
+        params (dict): Query parameters
+        timeout (float): Connect and read timeout, in seconds
+        stats (FetchStats): Counters to update, if any
+
+    Returns:
+        The decoded JSON
+
+    Raises:
+        requests.RequestException: If the request failed after retries
+    """
+    response = session.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if stats is not None:
+        stats.record(response, len(data) if isinstance(data, list) else 1)
+    return data
+
+
+def fetch_concurrently(session, requests_, concurrency=8, timeout=TIMEOUT,
+                       stats=None):
+    """Fetch (url, params) requests concurrently, yielding JSON in order.
+
+    At most `concurrency` requests are in flight; the next one is sent as
+    soon as the oldest has been received. Requests that are still pending
+    when the caller stops iterating are cancelled.
+
+    Args:
+        session (requests.Session): Session shared by the worker threads
+        requests_ (iterable): (url, params) pairs, possibly endless
+        concurrency (int): Maximum number of requests in flight
+        timeout (float): Connect and read timeout, in seconds
+        stats (FetchStats): Counters to update, if any
+
+    Yields:
+        The decoded JSON of each request, in request order
+    """
+    requests_ = iter(requests_)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque()
+
+        def submit(count):
+            for url, params in itertools.islice(requests_, count):
+                pending.append(pool.submit(fetch_json, session, url, params,
+                                           timeout, stats))
+
+        submit(concurrency)
+        try:
+            while pending:
+                data = pending.popleft().result()
+                submit(1)
+                yield data
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def fetch_pages(url=API_URL, session=None, concurrency=8, per_page=100,
+                max_pages=None, stats=None):
+    """Yield every item of a paginated endpoint, in order.
+
+    Pages are requested with `_page` and `_limit` query parameters,
+    several at a time, until one holds fewer than `per_page` items.
+
+    Args:
+        url (str): Endpoint returning a JSON list per page
+        session (requests.Session): Session to use, a new one if None
+        concurrency (int): Maximum number of pages in flight
+        per_page (int): Number of items requested per page
+        max_pages (int): Stop after this many pages, if given
+        stats (FetchStats): Counters to update, if any
+
+    Yields:
+        dict: The items of each page
+    """
+    session = session or make_session(concurrency)
+    pages = itertools.count(1) if max_pages is None \
+        else range(1, max_pages + 1)
+    for items in fetch_concurrently(
+            session, ((url, {"_page": page, "_limit": per_page})
+                      for page in pages),
+            concurrency, stats=stats):
+        yield from items
+        if len(items) < per_page:
+            break
+
+
+def fetch_by_id(ids, url=API_URL, session=None, concurrency=8, stats=None):
+    """Yield the items with the given ids, fetched from url/<id>.
+
+    Args:
+        ids (iterable): Item ids
+        url (str): Collection URL
+        session (requests.Session): Session to use, a new one if None
+        concurrency (int): Maximum number of requests in flight
+        stats (FetchStats): Counters to update, if any
+
+    Yields:
+        dict: The items, in the order of ids
+    """
+    session = session or make_session(concurrency)
+    yield from fetch_concurrently(
+        session, ((f"{url}/{item_id}", None) for item_id in ids),
+        concurrency, stats=stats)
+
+
+def fetch_and_print_posts(url=API_URL):
     """Fetch posts and print the HTTP status code and titles.
 
     Kept for backward compatibility with prior behavior.
+
+    Args:
+        url (str): Endpoint returning a JSON list of posts
     """
-    url = "https://jsonplaceholder.typicode.com/posts"
-    response = requests.get(url)
+    with make_session() as session:
+        response = session.get(url, timeout=TIMEOUT)
 
     if response.status_code != 200:
         print("Failed to retrieve posts. Status Code:", response.status_code)
@@ -21,40 +217,263 @@ def fetch_and_print_posts():
         print(f"{post['title']}")
 
 
-def fetch_and_save_posts(csv_path="posts.csv"):
-    """Fetch posts and write them to CSV as a list of dictionaries.
+def iter_json_array(chunks):
+    """Yield the elements of a JSON array as its bytes arrive.
 
-    Each post dictionary contains keys: id, title, body.
+    Only the element being decoded is held in memory, so arrays of any
+    size can be processed.
 
     Args:
-        csv_path (str): Path to output CSV file. Defaults to 'posts.csv'.
+        chunks (iterable): bytes chunks of a UTF-8 JSON document whose top
+                           level is an array
+
+    Yields:
+        The decoded array elements
+
+    Raises:
+        ValueError: If the document is not a well-formed array
     """
-    url = "https://jsonplaceholder.typicode.com/posts"
-    response = requests.get(url)
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf, pos, eof = "", 0, False
 
-    if response.status_code != 200:
-        print("Failed to retrieve posts. Status Code:", response.status_code)
-        return
+    # Skip ahead to the opening bracket
+    while "[" not in buf:
+        if eof:
+            raise ValueError("No JSON array found")
+        chunk = next(chunks, None)
+        eof = chunk is None
+        buf += text.decode(chunk or b"", final=eof)
+    if buf[:buf.index("[")].strip():
+        raise ValueError("No JSON array found")
+    buf = buf[buf.index("[") + 1:]
 
-    posts = []
-    for post in response.json():
-        posts.append({
-            "id": post.get("id"),
-            "title": post.get("title", ""),
-            "body": post.get("body", ""),
-        })
-
-    # Write to CSV using csv.DictWriter
-    fieldnames = ["id", "title", "body"]
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+
+        element = end = None
+        if pos < len(buf):
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                pass
+
+        # An element reaching the end of the buffer may be cut off
+        if end is None or (end == len(buf) and not eof):
+            if eof:
+                raise ValueError("Truncated or invalid JSON array")
+            chunk = next(chunks, None)
+            eof = chunk is None
+            buf, pos = buf[pos:] + text.decode(chunk or b"", final=eof), 0
+            continue
+
+        yield element
+        pos = end
+
+
+def _checkpoint_path(csv_path):
+    return csv_path + ".checkpoint"
+
+
+def _save_checkpoint(csv_path, last_id, offset):
+    """Record the last post written and the CSV size at that point."""
+    tmp_path = _checkpoint_path(csv_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"last_id": last_id, "offset": offset}, f)
+    os.replace(tmp_path, _checkpoint_path(csv_path))
+
+
+def _resume_point(csv_path):
+    """Find where an interrupted export stopped.
+
+    The checkpoint written with the last flushed batch is used when there
+    is one: rows written after it, possibly cut off, are truncated away.
+    Otherwise the id of the last row of the CSV file is used.
+
+    Args:
+        csv_path (str): Path of the CSV file
+
+    Returns:
+        int: Id of the last post already exported, or None
+    """
     try:
-        with open(csv_path, mode="w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        with open(_checkpoint_path(csv_path), encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        with open(csv_path, "r+b") as f:
+            f.truncate(checkpoint["offset"])
+        return checkpoint["last_id"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    last_id = None
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            last_id = row.get("id")
+    return int(last_id) if last_id else None
+
+
+def write_posts_csv(posts, csv_path="posts.csv", batch_size=1000,
+                    resume=False):
+    """Write posts to CSV as they arrive, flushing every batch.
+
+    After each flushed batch a checkpoint (csv_path + '.checkpoint') holds
+    the last id written, and is removed once the export completes. With
+    `resume`, posts up to the last exported id, and posts without an
+    integer id, are skipped and the rest are appended; posts must then
+    arrive in increasing id order.
+
+    Args:
+        posts (iterable): Post dictionaries
+        csv_path (str): Path to output CSV file. Defaults to 'posts.csv'.
+        batch_size (int): Number of rows written between two flushes
+        resume (bool): Continue an interrupted export of csv_path
+
+    Returns:
+        int: Number of posts written
+    """
+    last_id = None
+    if resume and os.path.exists(csv_path):
+        last_id = _resume_point(csv_path)
+        mode = "a"
+    else:
+        mode = "w"
+
+    written = 0
+    with open(csv_path, mode=mode, newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES,
+                                extrasaction="ignore")
+        if csvfile.tell() == 0:
             writer.writeheader()
+        written_id = last_id
+        try:
             for post in posts:
-                writer.writerow(post)
-        print(f"Wrote {len(posts)} posts to {csv_path}")
+                post_id = post.get("id")
+                has_id = isinstance(post_id, int)
+                # Without an id, a post cannot be placed before or after
+                # the resume point, so it is skipped
+                if last_id is not None and (not has_id or post_id <= last_id):
+                    continue
+                writer.writerow({
+                    "id": post_id,
+                    "title": post.get("title", ""),
+                    "body": post.get("body", ""),
+                })
+                written += 1
+                if has_id:
+                    written_id = post_id
+                if written % batch_size == 0:
+                    csvfile.flush()
+                    _save_checkpoint(csv_path, written_id,
+                                     csvfile.buffer.tell())
+        except BaseException:
+            # Keep what was received so far for a later resume
+            csvfile.flush()
+            _save_checkpoint(csv_path, written_id, csvfile.buffer.tell())
+            raise
+
+    if os.path.exists(_checkpoint_path(csv_path)):
+        os.remove(_checkpoint_path(csv_path))
+    return written
+
+
+def stream_posts(url=API_URL, session=None, chunk_size=1 << 16,
+                 timeout=TIMEOUT):
+    """Request a JSON array of posts and decode it while it downloads.
+
+    The request is sent right away, so HTTP errors are raised before any
+    post is consumed.
+
+    Args:
+        url (str): Endpoint returning a JSON list of posts
+        session (requests.Session): Session to use, a new one if None
+        chunk_size (int): Number of bytes read at a time
+        timeout (float): Connect and read timeout, in seconds
+
+    Returns:
+        generator: The posts, decoded as they are received
+
+    Raises:
+        requests.RequestException: If the request failed
+    """
+    session = session or make_session()
+    response = session.get(url, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+
+    def posts():
+        with response:
+            yield from iter_json_array(response.iter_content(chunk_size))
+    return posts()
+
+
+def fetch_and_save_posts(csv_path="posts.csv", url=API_URL, batch_size=1000,
+                         resume=False):
+    """Fetch posts and stream them to CSV as they are received.
+
+    Each row contains keys: id, title, body. The response is decoded
+    incrementally, so memory use does not depend on its size.
+
+    Args:
+        csv_path (str): Path to output CSV file. Defaults to 'posts.csv'.
+        url (str): Endpoint returning a JSON list of posts
+        batch_size (int): Number of rows written between two flushes
+        resume (bool): Continue an interrupted export of csv_path
+    """
+    try:
+        with make_session() as session:
+            written = write_posts_csv(stream_posts(url, session), csv_path,
+                                      batch_size, resume)
+    except requests.HTTPError as e:
+        print("Failed to retrieve posts. Status Code:",
+              e.response.status_code)
+        return
+    except (requests.RequestException, ValueError) as e:
+        print(f"Failed to retrieve posts: {e}")
+        return
+    except OSError as e:
+        print(f"Failed to write CSV file {csv_path}: {e}")
+        return
+    print(f"Wrote {written} posts to {csv_path}")
+
+
+def fetch_and_save_all_posts(csv_path="posts.csv", url=API_URL,
+                             concurrency=8, per_page=100, batch_size=1000,
+                             resume=False):
+    """Fetch every page of posts concurrently and stream them to CSV.
+
+    Args:
+        csv_path (str): Path to output CSV file. Defaults to 'posts.csv'.
+        url (str): Paginated posts endpoint
+        concurrency (int): Maximum number of pages in flight
+        per_page (int): Number of posts requested per page
+        batch_size (int): Number of rows written between two flushes
+        resume (bool): Continue an interrupted export of csv_path
+
+    Returns:
+        FetchStats: Throughput counters, or None if the fetch failed
+    """
+    stats = FetchStats()
+    try:
+        written = write_posts_csv(
+            fetch_pages(url, concurrency=concurrency, per_page=per_page,
+                        stats=stats),
+            csv_path, batch_size, resume)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Failed to retrieve posts: {e}")
+        return None
     except OSError as e:
         print(f"Failed to write CSV file {csv_path}: {e}")
+        return None
+    print(f"Wrote {written} posts to {csv_path}")
+    print(stats.report())
+    return stats
 
 
 if __name__ == "__main__":
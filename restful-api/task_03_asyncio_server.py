@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""An asyncio HTTP server for the endpoints of task_03_http_server.py.
+
+Every connection is a coroutine instead of a thread, so thousands of idle
+keep-alive connections cost little. Requests are answered by the same
+`resolve(path)` route table as the threaded server. Pipelined requests are
+read and answered in order on the same connection.
+
+Usage: ./task_03_asyncio_server.py [--port 8000] [--quiet]
+"""
+
+import argparse
+import asyncio
+from email.utils import formatdate
+from functools import lru_cache
+from http import HTTPStatus
+import sys
+import time
+
+from task_03_http_server import compression_cache, resolve, text_response
+
+
+# Seconds an idle keep-alive connection is kept open
+IDLE_TIMEOUT = 30
+MAX_HEADERS = 100
+# Largest request body read (and skipped); larger ones get a 413
+MAX_BODY_SIZE = 1 << 20
+SERVER_NAME = "AsyncHTTP/0.1 Python/" + sys.version.split()[0]
+
+BAD_REQUEST = text_response("Bad request", 400)
+NOT_IMPLEMENTED = text_response("Unsupported method", 501)
+TOO_LARGE = text_response("Request body too large", 413)
+
+
+@lru_cache(maxsize=256)
+def response_head(status, content_type, length, close, headers=()):
+    """Build the headers of a response, except for its Date.
+
+    Args:
+        status (int): HTTP status code
+        content_type (str): Value of the Content-type header
+        length (int): Body size, in bytes
+        close (bool): Whether the connection closes after this response
+        headers (tuple): Extra (name, value) headers
+
+    Returns:
+        bytes: Status line and headers, without the final blank line
+    """
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Server: {SERVER_NAME}\r\n"
+            f"Content-type: {content_type}\r\n"
+            f"Content-Length: {length}\r\n")
+    for name, value in headers:
+        head += f"{name}: {value}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode("latin-1")
+
+
+_date = [0, b""]
+
+
+def date_header():
+    """Return the Date header, formatted at most once per second."""
+    now = int(time.time())
+    if _date[0] != now:
+        _date[:] = [now, f"Date: {formatdate(now, usegmt=True)}\r\n\r\n"
+                    .encode("latin-1")]
+    return _date[1]
+
+
+async def read_request(reader):
+    """Read the request line and headers of the next request.
+
+    Args:
+        reader (asyncio.StreamReader): The connection's reader
+
+    Returns:
+        tuple: (method, path, version, headers dict with lowercase
+               names), None at end of stream, or BAD_REQUEST
+    """
+    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+    if not line:
+        return None
+    try:
+        method, path, version = line.decode("latin-1").split()
+    except ValueError:
+        return BAD_REQUEST
+    if not version.startswith("HTTP/1."):
+        return BAD_REQUEST
+
+    headers = {}
+    for _ in range(MAX_HEADERS + 1):
+        line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, colon, value = line.decode("latin-1").partition(":")
+        if not colon:
+            return BAD_REQUEST
+        headers[name.strip().lower()] = value.strip()
+    else:
+        return BAD_REQUEST
+    return method, path, version, headers
+
+
+async def handle_connection(reader, writer, quiet=False):
+    """Serve the requests of one connection until it closes.
+
+    Args:
+        reader (asyncio.StreamReader): The connection's reader
+        writer (asyncio.StreamWriter): The connection's writer
+        quiet (bool): Do not log every request
+    """
+    peer = writer.get_extra_info("peername")
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+
+            close = True
+            extra = ()
+            if request is BAD_REQUEST:
+                response = BAD_REQUEST
+                request_line = "-"
+            else:
+                method, path, version, headers = request
+                request_line = f"{method} {path} {version}"
+                connection = headers.get("connection", "").lower()
+                if version == "HTTP/1.0":
+                    close = connection != "keep-alive"
+                else:
+                    close = connection == "close"
+
+                # Skip any request body so the next request can be parsed
+                length = int(headers.get("content-length") or 0)
+                if "transfer-encoding" in headers or length < 0:
+                    response, close = BAD_REQUEST, True
+                elif length > MAX_BODY_SIZE:
+                    # Answered without reading the body, which would
+                    # otherwise be buffered whole
+                    response, close = TOO_LARGE, True
+                else:
+                    if length:
+                        await reader.readexactly(length)
+                    if method == "GET":
+                        status, content_type, body = resolve(path)
+                        body, extra = compression_cache.encode(
+                            body, headers.get("accept-encoding"))
+                        response = (status, content_type, body)
+                    else:
+                        response = NOT_IMPLEMENTED
+
+            status, content_type, body = response
+            writer.write(response_head(status, content_type, len(body),
+                                       close, extra)
+                         + date_header() + body)
+            if not quiet:
+                sys.stderr.write(f'{peer[0]} - - "{request_line}" '
+                                 f'{status} {len(body)}\n')
+            await writer.drain()
+            if close:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError, ValueError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="", port=8000, quiet=False):
+    """Serve the API until cancelled.
+
+    Args:
+        host (str): Interface to listen on, all of them if empty
+        port (int): Port to listen on
+        quiet (bool): Do not log every request
+    """
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, quiet),
+        host or None, port, backlog=1024)
+    print(f"Serving at {port}...")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the simple API over HTTP with asyncio.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--quiet", action="store_true",
+                        help="do not log every request")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(port=args.port, quiet=args.quiet))
+    except KeyboardInterrupt:
+        pass
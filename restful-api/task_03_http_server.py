@@ -1,63 +1,231 @@
 #!/usr/bin/env/python3
-"""A simple HTTP server with multiple endpoints."""
+"""A simple HTTP server with multiple endpoints.
 
+By default requests are served by one thread per connection, with HTTP/1.1
+keep-alive. --no-threads serves one connection at a time and closes it
+after each response, so an idle client cannot hold the server. --workers N
+pre-forks N processes that each bind the port with SO_REUSEPORT, so the
+kernel spreads connections across them.
+
+Usage: ./task_03_http_server.py [--port 8000] [--workers N] [--no-threads]
+"""
+
+import argparse
+from compression import CompressionCache
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import ThreadingHTTPServer
 import json
+import os
+import signal
+import socket
+from socketserver import ThreadingMixIn
+
+
+def text_response(text, status=200):
+    """Pre-serialize a plain text response.
+
+    Args:
+        text (str): Response body
+        status (int): HTTP status code
+
+    Returns:
+        tuple: (status, content type, body bytes)
+    """
+    return (status, "plain/text", text.encode("utf-8"))
+
+
+def json_response(data, status=200):
+    """Pre-serialize a JSON response.
+
+    Args:
+        data: JSON-serializable response data
+        status (int): HTTP status code
+
+    Returns:
+        tuple: (status, content type, body bytes)
+    """
+    return (status, "application/json", json.dumps(data).encode("utf-8"))
+
+
+# Route table: path -> response, serialized once at import time
+ROUTES = {
+    "/": text_response("Hello, this is a simple API!"),
+    "/data": json_response({"name": "John", "age": 30, "city": "New York"}),
+    "/status": text_response("OK"),
+    "/info": json_response({
+        "version": "1.0",
+        "description": "A simple API built with http.server"
+    }),
+}
+ROUTES[""] = ROUTES["/"]
+NOT_FOUND = text_response("Endpoint not found", 404)
+
+# Compressed bodies of responses large enough to be worth it
+compression_cache = CompressionCache()
+
+
+def resolve(path):
+    """Return the response of a GET request.
+
+    Args:
+        path (str): Request path
+
+    Returns:
+        tuple: (status, content type, body bytes)
+    """
+    return ROUTES.get(path, NOT_FOUND)
 
 
 class HTTPRequestHandler(BaseHTTPRequestHandler):
     """Custom HTTP request handler with multiple endpoints.
 
-    Endpoints:
+    Endpoints (see ROUTES):
         /          : Returns a welcome message.
         /data      : Returns a JSON object with sample data.
         /status    : Returns a plain text "OK" message.
+        /info      : Returns a JSON object describing the API.
         Any other path : Returns a 404 Not Found message.
     """
+    # Keep connections open between requests when each has its own thread
+    # (see keep_alive); every response therefore carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: with Nagle's algorithm the
+    # body would wait for the client's delayed ACK of the headers (~40ms)
+    disable_nagle_algorithm = True
+    # Seconds an idle keep-alive connection may hold its worker thread
+    timeout = 30
+    # Set to silence the per-request access log
+    quiet = False
+
+    @property
+    def keep_alive(self):
+        """Whether connections stay open after a response.
+
+        Only servers with a thread per connection keep them: a server
+        handling one connection at a time would be held by an idle client.
+        """
+        return isinstance(self.server, ThreadingMixIn)
+
+    def send_body(self, status, content_type, body, headers=()):
+        """Send a complete response.
+
+        Args:
+            status (int): HTTP status code
+            content_type (str): Value of the Content-type header
+            body (bytes): Response body
+            headers (tuple): Extra (name, value) headers
+        """
+        self.send_response(status)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if not self.keep_alive:
+            # Also sets close_connection
+            self.send_header("Connection", "close")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
         """Handle GET requests."""
-        if self.path == "/" or self.path == "":     # Root path
-            self.send_response(200)
-            self.send_header("Content-type", "plain/text")
-            self.end_headers()
-            msg = "Hello, this is a simple API!"
-            self.wfile.write(msg.encode("utf-8"))
-
-        elif self.path == "/data":  # Data path
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            data = {"name": "John", "age": 30, "city": "New York"}
-            self.wfile.write(json.dumps(data).encode("utf-8"))
-
-        elif self.path == "/status":    # Status path
-            self.send_response(200)
-            self.send_header("Content-type", "plain/text")
-            self.end_headers()
-            status_ok = "OK"
-            self.wfile.write(status_ok.encode("utf-8"))
-
-        elif self.path == "/info":  # Info path
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            info = {
-                "version": "1.0",
-                "description": "A simple API built with http.server"
-            }
-            self.wfile.write(json.dumps(info).encode("utf-8"))
-
-        else:
-            self.send_response(404)
-            self.send_header("Content-type", "plain/text")
-            self.end_headers()
-            not_found = "Endpoint not found"
-            self.wfile.write(not_found.encode("utf-8"))
+        status, content_type, body = resolve(self.path)
+        body, headers = compression_cache.encode(
+            body, self.headers.get("Accept-Encoding"))
+        self.send_body(status, content_type, body, headers)
+
+    def log_message(self, format, *args):
+        """Log a request unless the handler is quiet."""
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ReusePortMixIn:
+    """Server mix-in whose port can be bound by several processes."""
+
+    def server_bind(self):
+        """Set SO_REUSEPORT before binding the listening socket."""
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def serve_worker(server_class, server_address):
+    """Run one server until it is interrupted.
+
+    Args:
+        server_class (type): HTTPServer class to instantiate
+        server_address (tuple): (host, port) to listen on
+    """
+    httpd = server_class(server_address, HTTPRequestHandler)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def serve(port=8000, workers=1, threads=True):
+    """Serve the API, in this process or in pre-forked worker processes.
+
+    Args:
+        port (int): Port to listen on, on all interfaces
+        workers (int): Number of worker processes
+        threads (bool): Handle each connection in its own thread;
+                        otherwise one client is served at a time
+    """
+    server_address = ("", port)  # Listen on all interfaces
+    server_class = ThreadingHTTPServer if threads else HTTPServer
+    if workers <= 1:
+        print(f"Serving at {port}...")
+        serve_worker(server_class, server_address)
+        return
+
+    server_class = type("ReusePort" + server_class.__name__,
+                        (ReusePortMixIn, server_class), {})
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                serve_worker(server_class, server_address)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    print(f"Serving at {port} with {workers} workers...")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # Shut everything down as soon as one worker dies
+        os.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
 
 
 if __name__ == "__main__":
-    PORT = 8000
-    server_address = ("", PORT)  # Listen on all interfaces, port 8000
-    httpd = HTTPServer(server_address, HTTPRequestHandler)
-    print(f"Serving at {PORT}...")
-    httpd.serve_forever()
+    parser = argparse.ArgumentParser(
+        description="Serve the simple API over HTTP.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of pre-forked worker processes")
+    parser.add_argument("--threads", action=argparse.BooleanOptionalAction,
+                        default=True,
+                        help="serve each connection in its own thread")
+    parser.add_argument("--quiet", action="store_true",
+                        help="do not log every request")
+    args = parser.parse_args()
+    if args.workers > 1 and not (hasattr(os, "fork")
+                                 and hasattr(socket, "SO_REUSEPORT")):
+        parser.error("--workers needs os.fork and SO_REUSEPORT")
+    HTTPRequestHandler.quiet = args.quiet
+    serve(args.port, args.workers, args.threads)
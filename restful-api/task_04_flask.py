@@ -4,11 +4,27 @@ This modules defines a simple API using Flask,
 with multiples methods to access different routes
 and handle a POST request.
 """
-from flask import Flask, jsonify, request
+from compression import CompressionCache
+from flask import Flask, Response, jsonify, request, url_for
+import json
+import json_provider
+import os
+from user_store import open_user_store
 
 
 app = Flask(__name__)
-users = {}
+# orjson when installed, see json_provider
+json_provider.init_app(app)
+# 'memory' (default), 'sqlite:users.db' or 'log:users.log', see user_store
+users = open_user_store(os.environ.get("USER_STORE", "memory"))
+compression_cache = CompressionCache()
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NDJSON = "application/x-ndjson"
+MAX_BULK_USERS = 100000
+# Larger request bodies are refused with a 413 before being read
+app.config["MAX_CONTENT_LENGTH"] = 64 * 1024 * 1024
+json_decoder = json.JSONDecoder()
 
 
 @app.route("/")
@@ -22,15 +38,78 @@ def home():
     return "Welcome to the Flask API!"
 
 
+def iter_usernames(after=None, limit=None):
+    """
+    This method yields sorted usernames as NDJSON lines, reading the
+    store one page at a time so memory does not grow with the users.
+
+    Args:
+        after: only yield usernames greater than this one.
+        limit: maximum number of usernames, all of them if None.
+    Yields:
+        Chunks of lines, each one a JSON string.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = MAX_PAGE_SIZE if remaining is None \
+            else min(MAX_PAGE_SIZE, remaining)
+        page = users.usernames(after, size)
+        if page:
+            yield "".join(json.dumps(name) + "\n" for name in page)
+        if len(page) < size:
+            return
+        after = page[-1]
+        if remaining is not None:
+            remaining -= len(page)
+
+
 @app.route("/data")
 def jsonify_data():
     """
     This methods allows to access the 'data' route containing users data.
 
+    Without parameters, all the usernames are returned in insertion order.
+    With 'limit' and/or 'after', a page of usernames sorted by name is
+    returned, following the 'after' username; a 'Link' header gives the
+    URL of the next page, if any. With '?format=ndjson' or an
+    'Accept: application/x-ndjson' header, the sorted usernames are
+    streamed one per line.
+
     Returns:
-        A JSON containing the list of all users.
+        A JSON containing the list of users, or a stream of them.
+        Else return 'error' with status code 400 if 'limit' is invalid,
+        which for a page is more than 1000.
     """
-    return jsonify(list(users.keys()))
+    after = request.args.get("after")
+    limit = request.args.get("limit")
+    stream = request.args.get("format") == "ndjson" or \
+        request.accept_mimetypes.best_match(
+            ["application/json", NDJSON]) == NDJSON
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        # Streams are read one page at a time, whatever their length
+        if limit < 1 or (limit > MAX_PAGE_SIZE and not stream):
+            return jsonify({"error": "limit must be between 1 and "
+                            f"{MAX_PAGE_SIZE}"}), 400
+
+    if stream:
+        return Response(iter_usernames(after, limit), mimetype=NDJSON)
+
+    if limit is None and after is None:
+        return jsonify(list(users.keys()))
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    # One more username tells whether there is a next page
+    page = users.usernames(after, limit + 1)
+    response = jsonify(page[:limit])
+    if len(page) > limit:
+        next_url = url_for("jsonify_data", after=page[limit - 1],
+                           limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
 
 
 @app.route("/status")
@@ -70,16 +149,140 @@ def add_user():
     Returns:
         If a username is provided, returns confirmation message
         with the User data and status code 201.
-        Else return 'error': 'Username is required'.
+        Else return 'error': 'Username is required', or
+        'Username must be a string'.
     """
     user_data = request.get_json()
     if 'username' not in user_data:
         return jsonify({"error": "Username is required"}), 400
+    # Usernames are sorted for /data pages, so they must all be strings
+    if not isinstance(user_data["username"], str):
+        return jsonify({"error": "Username must be a string"}), 400
 
     username = user_data["username"]
     users[username] = user_data.copy()
     return jsonify({"message": "User added", "user": users[username]}), 201
 
 
+def parse_bulk_body():
+    """
+    This method parses the body of a bulk request, a JSON array of users
+    or, with an NDJSON content type, one user per line.
+
+    Returns:
+        A list of (position, user data, error) triples, where position is
+        the index in the array or the line number (from 1) in NDJSON and
+        error is None for valid JSON, or None if the body is not an array.
+    """
+    body = request.get_data()
+    if request.mimetype == NDJSON:
+        items = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            try:
+                line = line.decode("utf-8").strip()
+                if not line:
+                    continue
+                # Skips the checks json.loads() repeats for every line
+                item, end = json_decoder.raw_decode(line)
+                if end != len(line):
+                    raise ValueError("Extra data")
+            except ValueError:
+                items.append((number, None, "Invalid JSON"))
+            else:
+                items.append((number, item, None))
+        return items
+    try:
+        data = app.json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, list):
+        return None
+    return [(index, item, None) for index, item in enumerate(data)]
+
+
+@app.route("/users/bulk", methods=["POST"])
+def add_users():
+    """
+    This method allows to add many Users with one POST request,
+    using a JSON array or NDJSON data.
+
+    Every valid User is added in a single transaction; invalid ones
+    are reported and skipped. Like /add_user, a User whose username
+    was already given replaces the earlier one.
+
+    Returns:
+        The number of Users added and one result per item, in order,
+        with status code 200. Results are identified by their 'index'
+        in a JSON array, or by their 'line' number in NDJSON.
+        Else return 'error' with status code 400 if the body is not a
+        JSON array, or 413 if it holds more than MAX_BULK_USERS items.
+    """
+    items = parse_bulk_body()
+    if items is None:
+        return jsonify({"error": "Expected a JSON array of users"}), 400
+    if len(items) > MAX_BULK_USERS:
+        return jsonify({"error": "At most "
+                        f"{MAX_BULK_USERS} users per request"}), 413
+    position = "line" if request.mimetype == NDJSON else "index"
+
+    valid = {}
+    results = []
+    for at, user_data, error in items:
+        if error is None and not isinstance(user_data, dict):
+            error = "User must be a JSON object"
+        elif error is None and "username" not in user_data:
+            error = "Username is required"
+        elif error is None and not isinstance(user_data["username"], str):
+            error = "Username must be a string"
+        if error:
+            results.append({position: at, "status": 400, "error": error})
+            continue
+        valid[user_data["username"]] = user_data
+        results.append({position: at, "status": 201,
+                        "username": user_data["username"]})
+
+    users.update(valid)
+    added = sum(result["status"] == 201 for result in results)
+    return jsonify({"added": added, "results": results}), 200
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """
+    This method answers requests over MAX_CONTENT_LENGTH in JSON.
+
+    Returns:
+        'error' with status code 413.
+    """
+    return jsonify({"error": "Request body too large"}), 413
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress large responses with the best encoding the client accepts.
+
+    Arg:
+        response: the response about to be sent.
+    Returns:
+        The response, with a compressed body if it was worth it.
+    """
+    if response.direct_passthrough or response.is_streamed \
+            or "Content-Encoding" in response.headers:
+        return response
+    body = response.get_data()
+    # API responses rarely repeat, so they are not worth caching
+    encoded, headers = compression_cache.encode(
+        body, request.headers.get("Accept-Encoding"), cache=False)
+    if encoded is not body:
+        response.set_data(encoded)
+    for name, value in headers:
+        if name == "Vary":
+            response.vary.add(value)
+        else:
+            response.headers[name] = value
+    return response
+
+
 if __name__ == "__main__":
     app.run()
@@ -2,34 +2,161 @@
 """
 This modules defines simple API Security
 and Authentication techniques.
+
+Passwords are hashed with PASSWORD_HASH_METHOD, any method accepted by
+werkzeug's generate_password_hash, such as 'scrypt:32768:8:1' (default)
+or 'pbkdf2:sha256:600000'. Successful verifications are cached for
+AUTH_CACHE_TTL seconds (60, 0 disables the cache), for at most
+AUTH_CACHE_SIZE users (1024).
 """
 
+from collections import OrderedDict
 from flask_jwt_extended import create_access_token, get_jwt
 from flask_jwt_extended import jwt_required, JWTManager
 from flask import Flask, request, jsonify
 from flask_httpauth import HTTPBasicAuth
+import hashlib
+import hmac
+import json_provider
+import os
+import threading
+import time
 from werkzeug.security import generate_password_hash, check_password_hash
 
 app = Flask(__name__)
+# orjson when installed, see json_provider
+json_provider.init_app(app)
 auth = HTTPBasicAuth()
 app.config["JWT_SECRET_KEY"] = "super-secret"
 jwt = JWTManager(app)
+HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+
+
+class VerificationCache:
+    """
+    This class remembers the passwords recently verified for each user,
+    so repeated Basic Auth requests skip the slow password hash.
+
+    Only successful verifications are cached, so guessing passwords
+    stays as slow as the hash. Passwords are kept as HMACs keyed with a
+    secret of the process, never in clear, and an entry only matches
+    the password hash it was verified against: changing a password
+    invalidates it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        """
+        Args:
+            maxsize: the number of users to remember.
+            ttl: seconds an entry stays valid, 0 disables the cache.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, password):
+        """
+        This method returns the HMAC of a password.
+        """
+        return hmac.new(self._secret, password.encode("utf-8"),
+                        hashlib.sha256).digest()
+
+    def check(self, username, password, password_hash):
+        """
+        This method tells whether a password was recently verified.
+
+        Args:
+            username: the username used to login
+            password: the password of the user
+            password_hash: the current password hash of the user
+        Returns:
+            True if the password matched this hash less than ttl ago.
+        """
+        if self.ttl <= 0:
+            return False
+        digest = self._digest(password)
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[2] <= time.monotonic():
+                del self._entries[username]
+                entry = None
+            hit = entry is not None and entry[1] == password_hash \
+                and hmac.compare_digest(entry[0], digest)
+            if hit:
+                # Keep recently used entries away from eviction
+                self._entries.move_to_end(username)
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit
+
+    def add(self, username, password, password_hash):
+        """
+        This method remembers a successful verification.
+
+        Args:
+            username: the username used to login
+            password: the password of the user
+            password_hash: the password hash it was verified against
+        """
+        if self.ttl <= 0:
+            return
+        entry = (self._digest(password), password_hash,
+                 time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[username] = entry
+            self._entries.move_to_end(username)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username=None):
+        """
+        This method forgets the verifications of a user, or of everyone.
+        """
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+
+verification_cache = VerificationCache(
+    int(os.environ.get("AUTH_CACHE_SIZE", 1024)),
+    float(os.environ.get("AUTH_CACHE_TTL", 60)))
 
 
 users = {
     "user1": {
         "username": "user1",
-        "password": generate_password_hash("password"),
+        "password": generate_password_hash("password", HASH_METHOD),
         "role": "user"
         },
     "admin1": {
         "username": "admin1",
-        "password": generate_password_hash("password"),
+        "password": generate_password_hash("password", HASH_METHOD),
         "role": "admin"
         }
 }
 
 
+def set_password(username, password, method=None):
+    """
+    This method changes the password of a user.
+
+    Args:
+        username: the name of the user
+        password: the new password
+        method: the hash method, HASH_METHOD if None
+    """
+    users[username]["password"] = generate_password_hash(
+        password, method or HASH_METHOD)
+    verification_cache.invalidate(username)
+
+
 @auth.verify_password
 def verify_password(username, password):
     """
@@ -39,11 +166,15 @@ def verify_password(username, password):
         username: the username used to login
         password: the password of the user
     """
-    if username in users and \
-            check_password_hash(users.get(username).get("password"), password):
-        return username
-    else:
+    if username not in users or not isinstance(password, str):
         return None
+    password_hash = users[username]["password"]
+    if verification_cache.check(username, password, password_hash):
+        return username
+    if check_password_hash(password_hash, password):
+        verification_cache.add(username, password, password_hash)
+        return username
+    return None
 
 
 @app.route("/basic-protected", methods=["GET"])
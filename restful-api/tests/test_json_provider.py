@@ -0,0 +1,110 @@
+import dataclasses
+import datetime
+import decimal
+import os
+import sys
+import uuid
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json_provider  # noqa: E402
+from json_provider import ORJSONProvider  # noqa: E402
+
+pytest.importorskip("orjson")
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+PAYLOADS = [
+    ["user1", "user2"],
+    {"username": "bob", "age": 40, "city": "Chicago", "tags": [1, 2.5]},
+    {"b": None, "a": True, "nested": {"z": [], "y": {}}},
+    {"when": datetime.datetime(2024, 5, 1, 12, 30,
+                               tzinfo=datetime.timezone.utc),
+     "day": datetime.date(2024, 5, 1), "price": decimal.Decimal("9.99"),
+     "id": uuid.UUID(int=1), "point": Point(1, 2)},
+    {1: "one", 2: "two"},
+    {2: "two", 10: "ten", 1: "one"},
+]
+
+
+@pytest.fixture
+def apps():
+    """An app with each provider."""
+    fast, std = Flask("fast"), Flask("std")
+    json_provider.init_app(fast, "orjson")
+    json_provider.init_app(std, "stdlib")
+    return fast, std
+
+
+def test_init_app_picks_the_provider(apps, monkeypatch):
+    fast, std = apps
+    assert type(fast.json) is ORJSONProvider
+    assert type(std.json) is DefaultJSONProvider
+
+    monkeypatch.setenv("JSON_PROVIDER", "stdlib")
+    assert type(json_provider.init_app(Flask("env"))) is DefaultJSONProvider
+    with pytest.raises(ValueError):
+        json_provider.init_app(Flask("bad"), "simplejson")
+
+
+def test_init_app_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(json_provider, "orjson", None)
+    app = Flask("fallback")
+    assert type(json_provider.init_app(app, "orjson")) is DefaultJSONProvider
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_same_json_as_the_stdlib(apps, payload):
+    fast, std = apps
+    assert fast.json.dumps(payload) == std.json.dumps(payload)
+    compact = {"separators": (",", ":")}
+    assert fast.json.dumps(payload, **compact) == \
+        std.json.dumps(payload, **compact)
+    with fast.app_context():
+        fast_body = fast.json.response(payload).get_data()
+    with std.app_context():
+        std_body = std.json.response(payload).get_data()
+    assert fast_body == std_body
+    assert fast.json.loads(fast_body) == std.json.loads(std_body)
+
+
+def test_unsupported_data_uses_the_stdlib(apps):
+    fast, std = apps
+    payload = {"big": 2 ** 70}
+    with fast.app_context():
+        assert fast.json.response(payload).get_data() == b'{"big":' \
+            b'1180591620717411303424}\n'
+    with pytest.raises(TypeError):
+        fast.json.dumps({"set": {1, 2}})
+
+
+def test_int_keys_are_sorted_as_numbers(apps):
+    fast, _ = apps
+    with fast.app_context():
+        body = fast.json.response({2: "b", 10: "c", 1: "a"}).get_data()
+    assert body == b'{"1":"a","2":"b","10":"c"}\n'
+
+
+def test_non_ascii_is_written_as_utf8(apps):
+    fast, _ = apps
+    with fast.app_context():
+        body = fast.json.response({"city": "Zürich"}).get_data()
+    assert body == '{"city":"Zürich"}\n'.encode("utf-8")
+
+
+def test_debug_responses_are_indented(apps):
+    fast, std = apps
+    for app in apps:
+        app.debug = True
+    with fast.app_context():
+        fast_body = fast.json.response({"b": [1], "a": 2}).get_data()
+    with std.app_context():
+        std_body = std.json.response({"b": [1], "a": 2}).get_data()
+    assert fast_body == std_body
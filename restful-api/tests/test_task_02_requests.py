@@ -0,0 +1,216 @@
+import csv
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_02_requests  # noqa: E402
+from task_02_requests import (  # noqa: E402
+    FetchStats, fetch_and_print_posts, fetch_and_save_all_posts,
+    fetch_and_save_posts, fetch_by_id, fetch_concurrently, fetch_pages,
+    iter_json_array, make_session, write_posts_csv)
+
+POSTS = [{"id": i, "userId": i % 10, "title": f"Title {i}",
+          "body": f"Body, with \"quotes\"\n{i}"} for i in range(1, 251)]
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Serve POSTS json-server style, failing the first tries of some URLs."""
+    protocol_version = "HTTP/1.1"
+    failures = {}       # path and query -> statuses to return first
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            pending = cls.failures.get(self.path)
+            status = pending.pop(0) if pending else 200
+        try:
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if status != 200:
+                body = b"{}"
+            elif url.path == "/posts" and "_page" not in query:
+                body = json.dumps(POSTS, indent=1).encode()
+            elif url.path == "/posts":
+                page = int(query.get("_page", ["1"])[0])
+                limit = int(query.get("_limit", ["10"])[0])
+                body = json.dumps(
+                    POSTS[(page - 1) * limit:page * limit]).encode()
+            elif url.path.startswith("/posts/"):
+                post_id = int(url.path.rsplit("/", 1)[1])
+                body = json.dumps(POSTS[post_id - 1]).encode()
+            else:
+                status, body = 404, b"{}"
+            threading.Event().wait(0.01)    # Simulate network latency
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    """Run the stub API on a free port and return its posts URL."""
+    StubAPI.failures = {}
+    StubAPI.max_in_flight = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/posts"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_pages_returns_every_post_in_order(api):
+    stats = FetchStats()
+    posts = list(fetch_pages(api, concurrency=4, per_page=20, stats=stats))
+    assert posts == POSTS
+    assert StubAPI.max_in_flight <= 4
+    assert stats.items == len(POSTS)
+    assert "req/s" in stats.report()
+
+
+def test_fetch_pages_retries_429_and_5xx(api):
+    StubAPI.failures = {"/posts?_page=2&_limit=50": [503, 500],
+                        "/posts?_page=3&_limit=50": [429]}
+    stats = FetchStats()
+    session = make_session(concurrency=2, backoff=0.01)
+    posts = list(fetch_pages(api, session=session, concurrency=2,
+                             per_page=50, stats=stats))
+    assert posts == POSTS
+    assert stats.retries == 3
+
+
+def test_fetch_gives_up_after_retries(api):
+    StubAPI.failures = {"/posts?_page=1&_limit=50": [503] * 10}
+    session = make_session(retries=2, backoff=0.01)
+    with pytest.raises(requests.RequestException):
+        list(fetch_pages(api, session=session, per_page=50))
+
+
+def test_exhausted_retries_print_the_status_code(api, monkeypatch, capsys):
+    StubAPI.failures = {"/posts": [503] * 3}
+    monkeypatch.setattr(task_02_requests, "make_session",
+                        lambda: make_session(retries=2, backoff=0.01))
+    fetch_and_print_posts(api)
+    assert capsys.readouterr().out == \
+        "Failed to retrieve posts. Status Code: 503\n"
+
+    fetch_and_print_posts(api)
+    out = capsys.readouterr().out
+    assert out.startswith("Status Code: 200\nTitle 1\nTitle 2\n")
+
+
+def test_fetch_by_id_keeps_id_order(api):
+    ids = [5, 3, 250, 1, 42]
+    posts = list(fetch_by_id(ids, api, concurrency=3))
+    assert [post["id"] for post in posts] == ids
+
+
+def test_stopping_early_cancels_pending_requests(api):
+    session = make_session()
+    requests_ = ((f"{api}/{i}", None) for i in range(1, 251))
+    results = fetch_concurrently(session, requests_, concurrency=2)
+    assert next(results)["id"] == 1
+    results.close()
+    assert StubAPI.max_in_flight <= 2
+
+
+def test_fetch_and_save_all_posts_writes_csv(api, tmp_path):
+    csv_path = tmp_path / "posts.csv"
+    stats = fetch_and_save_all_posts(str(csv_path), api, per_page=40)
+    assert stats.items == len(POSTS)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["id"]) for row in rows] == [p["id"] for p in POSTS]
+    assert rows[0]["body"] == POSTS[0]["body"]
+
+
+def read_ids(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return [int(row["id"]) for row in csv.DictReader(f)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 100000])
+def test_iter_json_array_decodes_any_chunking(chunk_size):
+    data = json.dumps([{"é": "ü" * 5, "n": 12345}, 678, "x", []],
+                      ensure_ascii=False).encode()
+    chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    assert list(iter_json_array(chunks)) == json.loads(data)
+
+
+def test_iter_json_array_rejects_truncated_input():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[{"id": 1}, {"id": ']))
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"id": 1}']))
+
+
+def test_fetch_and_save_posts_streams_to_csv(api, tmp_path):
+    csv_path = str(tmp_path / "posts.csv")
+    fetch_and_save_posts(csv_path, api, batch_size=7)
+    assert read_ids(csv_path) == [p["id"] for p in POSTS]
+    assert not os.path.exists(csv_path + ".checkpoint")
+
+
+def test_http_error_keeps_previous_csv(api, tmp_path, capsys):
+    csv_path = tmp_path / "posts.csv"
+    csv_path.write_text("previous")
+    fetch_and_save_posts(str(csv_path), api.replace("/posts", "/missing"))
+    assert csv_path.read_text() == "previous"
+    assert "Status Code: 404" in capsys.readouterr().out
+
+
+def test_interrupted_export_resumes_after_last_id(tmp_path):
+    csv_path = str(tmp_path / "posts.csv")
+
+    def interrupted():
+        yield from POSTS[:120]
+        raise ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        write_posts_csv(interrupted(), csv_path, batch_size=50)
+    assert os.path.exists(csv_path + ".checkpoint")
+
+    # A row cut off by a crash after the checkpoint is dropped
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write('121,"Title 1')
+
+    assert write_posts_csv(iter(POSTS), csv_path, resume=True) == 130
+    assert read_ids(csv_path) == [p["id"] for p in POSTS]
+    assert not os.path.exists(csv_path + ".checkpoint")
+
+
+def test_resume_without_checkpoint_uses_last_csv_row(tmp_path):
+    csv_path = str(tmp_path / "posts.csv")
+    write_posts_csv(iter(POSTS[:10]), csv_path)
+    assert write_posts_csv(iter(POSTS), csv_path, resume=True) == 240
+    assert read_ids(csv_path) == [p["id"] for p in POSTS]
+
+
+def test_resume_skips_posts_without_an_id(tmp_path):
+    csv_path = str(tmp_path / "posts.csv")
+    write_posts_csv(iter(POSTS[:10]), csv_path)
+    posts = [{"title": "no id"}, {"id": "11", "title": "text id"},
+             *POSTS[10:]]
+    assert write_posts_csv(iter(posts), csv_path, resume=True) == 240
+    assert read_ids(csv_path) == [p["id"] for p in POSTS]
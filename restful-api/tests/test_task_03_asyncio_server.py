@@ -0,0 +1,89 @@
+import asyncio
+import http.client
+import os
+import socket
+import sys
+import threading
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from task_03_asyncio_server import handle_connection  # noqa: E402
+from task_03_http_server import ROUTES  # noqa: E402
+
+
+@pytest.fixture
+def port():
+    """Serve the API from an event loop in a background thread."""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(
+        lambda r, w: handle_connection(r, w, quiet=True), "127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_keep_alive_serves_every_route(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    for path in ("/", "/data", "/status", "/info"):
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        assert resp.status == 200
+        assert resp.getheader("Content-type") == ROUTES[path][1]
+        assert resp.read() == ROUTES[path][2]
+    conn.close()
+
+
+def test_unknown_endpoint_returns_404(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/nope")
+    resp = conn.getresponse()
+    assert resp.status == 404
+    assert resp.read() == b"Endpoint not found"
+    conn.close()
+
+
+def test_pipelined_requests_are_answered_in_order(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"GET /status HTTP/1.1\r\nHost: x\r\n\r\n"
+                     b"GET /data HTTP/1.1\r\nHost: x\r\n\r\n"
+                     b"GET /nope HTTP/1.1\r\nHost: x\r\n"
+                     b"Connection: close\r\n\r\n")
+        data = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    assert data.count(b"HTTP/1.1 ") == 3
+    first = data.index(b"\r\n\r\nOK")
+    second = data.index(ROUTES["/data"][2])
+    third = data.index(b"404 Not Found")
+    assert first < second < third
+    assert data.endswith(b"Endpoint not found")
+
+
+def test_unsupported_method_returns_501(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("POST", "/data", body=b"{}")
+    resp = conn.getresponse()
+    assert resp.status == 501
+    resp.read()
+    conn.close()
+
+
+def test_oversized_body_is_rejected_unread(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"GET /status HTTP/1.1\r\nHost: x\r\n"
+                     b"Content-Length: 1000000000\r\n\r\n")
+        data = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    assert data.startswith(b"HTTP/1.1 413 ")
+    assert b"Connection: close\r\n" in data
+    assert data.endswith(b"Request body too large")
@@ -0,0 +1,102 @@
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from task_03_http_server import HTTPRequestHandler, ROUTES  # noqa: E402
+from task_03_http_server import resolve  # noqa: E402
+from http.server import HTTPServer, ThreadingHTTPServer  # noqa: E402
+
+
+@pytest.fixture
+def port(request):
+    """Serve the API from a background thread on a free port."""
+    HTTPRequestHandler.quiet = True
+    server_class = getattr(request, "param", ThreadingHTTPServer)
+    httpd = server_class(("127.0.0.1", 0), HTTPRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_keep_alive_serves_several_requests_on_one_connection(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/data")
+    resp = conn.getresponse()
+    assert resp.status == 200
+    assert int(resp.getheader("Content-Length")) > 0
+    assert json.loads(resp.read()) == {
+        "name": "John", "age": 30, "city": "New York"}
+
+    # Same socket, no reconnection
+    sock = conn.sock
+    conn.request("GET", "/status")
+    resp = conn.getresponse()
+    assert resp.read() == b"OK"
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_routes_are_serialized_once():
+    assert resolve("/data") is resolve("/data")
+    assert resolve("") is ROUTES["/"]
+    for status, content_type, body in ROUTES.values():
+        assert isinstance(body, bytes)
+
+
+@pytest.mark.parametrize("path", sorted(ROUTES))
+def test_content_length_matches_body(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path or "/")
+    resp = conn.getresponse()
+    body = resp.read()
+    assert resp.status == 200
+    assert int(resp.getheader("Content-Length")) == len(body)
+    assert body == ROUTES[path or "/"][2]
+    conn.close()
+
+
+def test_unknown_endpoint_returns_404(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/nope")
+    resp = conn.getresponse()
+    assert resp.status == 404
+    assert resp.read() == b"Endpoint not found"
+    conn.close()
+
+
+def test_slow_client_does_not_block_others(port):
+    slow = socket.create_connection(("127.0.0.1", port))
+    slow.sendall(b"GET /data HTTP/1.1\r\nHost: local")
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/info")
+        resp = conn.getresponse()
+        assert resp.status == 200
+        assert json.loads(resp.read())["version"] == "1.0"
+        conn.close()
+    finally:
+        slow.close()
+
+
+@pytest.mark.parametrize("port", [HTTPServer], indirect=True)
+def test_single_threaded_server_closes_connections(port):
+    idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    idle.request("GET", "/status")
+    resp = idle.getresponse()
+    assert resp.getheader("Connection") == "close"
+    assert resp.read() == b"OK"
+    try:
+        # Served at once although the first client stays connected
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/data")
+        assert conn.getresponse().status == 200
+        conn.close()
+    finally:
+        idle.close()
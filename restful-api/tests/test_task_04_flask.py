@@ -1,8 +1,11 @@
+import gzip
+import json
 import os
 import sys
 import pytest
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_04_flask  # noqa: E402
 from task_04_flask import app, users  # noqa: E402, F401
 
 
@@ -77,3 +80,158 @@ def test_get_user_not_found_returns_404(client):
     body = resp.get_json()
     assert isinstance(body, dict)
     assert body.get("error") == "User not found"
+
+
+def test_data_is_gzipped_when_large_and_accepted(client):
+    for i in range(200):
+        users[f"user{i}"] = {"username": f"user{i}"}
+
+    resp = client.get("/data", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    body = json.loads(gzip.decompress(resp.get_data()))
+    assert body == [f"user{i}" for i in range(200)]
+
+    resp = client.get("/data")
+    assert "Content-Encoding" not in resp.headers
+    assert len(resp.get_json()) == 200
+
+
+def test_add_user_rejects_a_non_string_username(client):
+    client.post("/add_user", json={"username": "alice"})
+    resp = client.post("/add_user", json={"username": 42})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "Username must be a string"}
+    resp = client.get("/data?limit=10")
+    assert resp.status_code == 200
+    assert resp.get_json() == ["alice"]
+
+
+def test_dynamic_responses_are_not_cached(client):
+    cache = task_04_flask.compression_cache
+    cache.hits = cache.misses = 0
+    for i in range(200):
+        users[f"user{i}"] = {"username": f"user{i}"}
+
+    for _ in range(2):
+        resp = client.get("/data", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert len(cache._entries) == 0
+
+
+def test_accept_encoding_is_merged_into_vary():
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = app.response_class("x" * 2000)
+        response.headers["Vary"] = "Origin"
+        response = task_04_flask.compress_response(response)
+    assert response.headers.getlist("Vary") == ["Origin, Accept-Encoding"]
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_small_response_is_not_compressed(client):
+    resp = client.get("/status", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_data(as_text=True) == "OK"
+
+
+def test_data_pages_follow_the_next_link(client):
+    names = [f"user{i}" for i in range(25)]
+    for name in reversed(names):
+        users[name] = {"username": name}
+
+    seen = []
+    url = "/data?limit=10"
+    while url:
+        resp = client.get(url)
+        assert resp.status_code == 200
+        page = resp.get_json()
+        assert len(page) <= 10
+        seen += page
+        link = resp.headers.get("Link")
+        url = link[1:link.index(">")] if link else None
+    assert seen == sorted(names)
+
+    resp = client.get("/data?after=user8")
+    assert resp.get_json() == ["user9"]
+    assert "Link" not in resp.headers
+
+
+@pytest.mark.parametrize("limit", ["0", "1001", "ten"])
+def test_data_rejects_invalid_limit(client, limit):
+    resp = client.get(f"/data?limit={limit}")
+    assert resp.status_code == 400
+    assert "limit" in resp.get_json()["error"]
+
+
+def test_data_streams_ndjson(client):
+    names = [f"user{i:04}" for i in range(2500)]
+    for name in names:
+        users[name] = {"username": name}
+
+    resp = client.get("/data", headers={"Accept": "application/x-ndjson",
+                                        "Accept-Encoding": "gzip"})
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    assert "Content-Encoding" not in resp.headers
+    lines = resp.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == names
+
+    resp = client.get("/data?format=ndjson&after=user0999&limit=1200")
+    lines = resp.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == names[1000:2200]
+
+
+def test_bulk_adds_a_json_array(client):
+    batch = [{"username": f"user{i}", "age": i} for i in range(500)]
+    resp = client.post("/users/bulk", json=batch)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["added"] == 500
+    assert [r["username"] for r in body["results"]] == \
+        [u["username"] for u in batch]
+    assert len(users) == 500
+    assert users["user42"] == {"username": "user42", "age": 42}
+
+
+def test_bulk_reports_invalid_items(client):
+    lines = ['{"username": "alice"}', "{not json", "[1, 2]",
+             '{"name": "Bob"}', '{"username": 7}', "",
+             '{"username": "alice", "age": 30}']
+    resp = client.post("/users/bulk", data="\n".join(lines),
+                       content_type="application/x-ndjson")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    # The second alice replaces the first one, as with /add_user
+    assert body["added"] == 2
+    assert [(r["line"], r["status"], r.get("error"))
+            for r in body["results"]] == [
+        (1, 201, None), (2, 400, "Invalid JSON"),
+        (3, 400, "User must be a JSON object"),
+        (4, 400, "Username is required"),
+        (5, 400, "Username must be a string"), (7, 201, None)]
+    assert dict(users) == {"alice": {"username": "alice", "age": 30}}
+
+
+@pytest.mark.parametrize("data", ["{not json", '{"username": "alice"}'])
+def test_bulk_rejects_a_body_that_is_not_an_array(client, data):
+    resp = client.post("/users/bulk", data=data,
+                       content_type="application/json")
+    assert resp.status_code == 400
+    assert len(users) == 0
+
+
+def test_bulk_rejects_too_many_users(client, monkeypatch):
+    monkeypatch.setattr(task_04_flask, "MAX_BULK_USERS", 2)
+    resp = client.post("/users/bulk", json=[{"username": "a"}] * 3)
+    assert resp.status_code == 413
+    assert len(users) == 0
+
+
+def test_bulk_rejects_a_body_over_max_content_length(client, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 100)
+    resp = client.post("/users/bulk", json=[{"username": "a" * 100}])
+    assert resp.status_code == 413
+    assert resp.get_json() == {"error": "Request body too large"}
+    assert len(users) == 0
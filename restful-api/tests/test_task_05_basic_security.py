@@ -0,0 +1,106 @@
+import base64
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import task_05_basic_security  # noqa: E402
+from task_05_basic_security import (  # noqa: E402
+    VerificationCache, app, set_password, users, verification_cache)
+
+
+def basic_auth(username, password):
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+@pytest.fixture
+def client():
+    """Flask test client fixture."""
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    """Count the password hash verifications."""
+    calls = []
+    check = task_05_basic_security.check_password_hash
+
+    def counting_check(password_hash, password):
+        calls.append(password)
+        return check(password_hash, password)
+
+    monkeypatch.setattr(task_05_basic_security, "check_password_hash",
+                        counting_check)
+    verification_cache.invalidate()
+    yield calls
+    verification_cache.invalidate()
+
+
+def test_basic_auth_hashes_a_password_once(client, hash_calls):
+    for _ in range(3):
+        resp = client.get("/basic-protected",
+                          headers=basic_auth("user1", "password"))
+        assert resp.status_code == 200
+    assert hash_calls == ["password"]
+
+
+def test_wrong_passwords_are_never_cached(client, hash_calls):
+    client.get("/basic-protected", headers=basic_auth("user1", "password"))
+    for _ in range(2):
+        resp = client.get("/basic-protected",
+                          headers=basic_auth("user1", "wrong"))
+        assert resp.status_code == 401
+    assert hash_calls == ["password", "wrong", "wrong"]
+
+
+def test_password_change_invalidates_the_cache(client, hash_calls):
+    old_hash = users["admin1"]["password"]
+    client.get("/basic-protected", headers=basic_auth("admin1", "password"))
+    try:
+        set_password("admin1", "new password", "pbkdf2:sha256:1000")
+        assert users["admin1"]["password"].startswith("pbkdf2:sha256:1000$")
+        resp = client.get("/basic-protected",
+                          headers=basic_auth("admin1", "password"))
+        assert resp.status_code == 401
+        resp = client.get("/basic-protected",
+                          headers=basic_auth("admin1", "new password"))
+        assert resp.status_code == 200
+    finally:
+        users["admin1"]["password"] = old_hash
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(task_05_basic_security.time, "monotonic",
+                        lambda: now[0])
+    cache = VerificationCache(ttl=60)
+    cache.add("user1", "password", "hash")
+    assert cache.check("user1", "password", "hash")
+    assert not cache.check("user1", "password", "other hash")
+    now[0] += 61
+    assert not cache.check("user1", "password", "hash")
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_is_bounded_and_can_be_disabled():
+    cache = VerificationCache(maxsize=2)
+    for username in ("a", "b", "c"):
+        cache.add(username, "password", "hash")
+    assert not cache.check("a", "password", "hash")
+    assert cache.check("c", "password", "hash")
+
+    disabled = VerificationCache(ttl=0)
+    disabled.add("a", "password", "hash")
+    assert not disabled.check("a", "password", "hash")
+
+
+def test_recently_checked_entries_are_evicted_last():
+    cache = VerificationCache(maxsize=2)
+    cache.add("a", "password", "hash")
+    cache.add("b", "password", "hash")
+    assert cache.check("a", "password", "hash")
+    cache.add("c", "password", "hash")
+    assert cache.check("a", "password", "hash")
+    assert not cache.check("b", "password", "hash")
@@ -0,0 +1,243 @@
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from user_store import LogUserStore, MemoryUserStore  # noqa: E402
+from user_store import SQLiteUserStore  # noqa: E402
+from user_store import open_user_store  # noqa: E402
+
+
+@pytest.fixture(params=["sqlite", "log"])
+def spec(request, tmp_path):
+    """Backend spec of a fresh store file."""
+    return f"{request.param}:{tmp_path / 'users'}"
+
+
+def add_users(spec, start, count):
+    store = open_user_store(spec)
+    for i in range(start, start + count):
+        store[f"user{i}"] = {"username": f"user{i}", "age": i}
+
+
+def test_open_user_store_backends(tmp_path):
+    assert isinstance(open_user_store("memory"), MemoryUserStore)
+    assert open_user_store("memory") == {}
+    assert isinstance(open_user_store(f"sqlite:{tmp_path / 'u.db'}"),
+                      SQLiteUserStore)
+    assert isinstance(open_user_store(f"log:{tmp_path / 'u.log'}"),
+                      LogUserStore)
+    for spec in ("redis:localhost", "sqlite:", "log"):
+        with pytest.raises(ValueError):
+            open_user_store(spec)
+
+
+def test_store_behaves_like_a_dict(spec):
+    store = open_user_store(spec)
+    expected = {}
+    for mapping in (store, expected):
+        mapping["bob"] = {"username": "bob", "age": 30}
+        mapping["alice"] = {"username": "alice", "city": "Paris"}
+        mapping["carol"] = {"username": "carol"}
+        mapping["bob"] = {"username": "bob", "age": 31}
+        del mapping["alice"]
+    assert dict(store) == expected
+    assert list(store) == list(expected) == ["bob", "carol"]
+    assert len(store) == 2
+    assert "bob" in store and "alice" not in store
+    assert store.get("alice") is None
+    with pytest.raises(KeyError):
+        store["alice"]
+    with pytest.raises(KeyError):
+        del store["alice"]
+    store.clear()
+    assert len(store) == 0 and list(store) == []
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "log"])
+def test_usernames_are_sorted_from_a_cursor(backend, tmp_path):
+    store = open_user_store(backend if backend == "memory"
+                            else f"{backend}:{tmp_path / 'users'}")
+    for name in ["carol", "alice", "eve", "bob"]:
+        store[name] = {"username": name}
+    assert store.usernames() == ["alice", "bob", "carol", "eve"]
+    assert store.usernames(limit=2) == ["alice", "bob"]
+    assert store.usernames(after="bob", limit=2) == ["carol", "eve"]
+    assert store.usernames(after="b") == ["bob", "carol", "eve"]
+
+    # The index follows later changes
+    store["dave"] = {"username": "dave"}
+    store["alice"] = {"username": "alice", "age": 30}
+    del store["carol"]
+    assert store.usernames(after="alice") == ["bob", "dave", "eve"]
+    store.clear()
+    store["zoe"] = {"username": "zoe"}
+    assert store.usernames() == ["zoe"]
+
+
+def test_usernames_merge_keys_added_since_the_last_page():
+    store = MemoryUserStore()
+    store["m"] = {}
+    assert store.usernames() == ["m"]
+    store.update((f"u{i:04}", {}) for i in reversed(range(1000)))
+    store["a"] = {}
+    del store["u0500"]
+    del store["m"]
+    names = store.usernames()
+    assert names == sorted(names) and len(names) == 1000
+    assert names[0] == "a" and "u0500" not in names
+
+
+def test_memory_index_survives_concurrent_writes_and_pages():
+    # Switch threads as often as possible to interleave the two
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for run in range(10):
+            store = MemoryUserStore()
+            store["first"] = {}
+            done = threading.Event()
+
+            def write(prefix):
+                for i in range(2000):
+                    store[f"{prefix}{i}"] = {}
+
+            def read():
+                while not done.is_set():
+                    store.usernames(None, 5)
+
+            readers = [threading.Thread(target=read) for _ in range(2)]
+            writers = [threading.Thread(target=write, args=(prefix,))
+                       for prefix in "ab"]
+            for thread in readers + writers:
+                thread.start()
+            for thread in writers:
+                thread.join()
+            done.set()
+            for thread in readers:
+                thread.join()
+            assert store.usernames() == sorted(store)
+            assert len(store) == 4001
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_log_usernames_include_other_processes_writes(tmp_path):
+    path = str(tmp_path / "users.log")
+    store, other = LogUserStore(path), LogUserStore(path)
+    store["bob"] = {"username": "bob"}
+    assert other.usernames() == ["bob"]
+    store["alice"] = {"username": "alice"}
+    store.compact()
+    assert other.usernames() == ["alice", "bob"]
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "log"])
+def test_update_sets_many_users(backend, tmp_path):
+    store = open_user_store(backend if backend == "memory"
+                            else f"{backend}:{tmp_path / 'users'}")
+    store["bob"] = {"username": "bob"}
+    store.update({f"user{i}": {"age": i} for i in range(100)},
+                 bob={"username": "bob", "age": 40})
+    store.update([("alice", {"username": "alice"})])
+    assert len(store) == 102
+    assert store["bob"] == {"username": "bob", "age": 40}
+    assert list(store)[:2] == ["bob", "user0"]
+    assert store.usernames(limit=2) == ["alice", "bob"]
+
+
+def test_sqlite_update_is_a_single_transaction(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / "users.db"))
+    with pytest.raises(sqlite3.IntegrityError):
+        store.update([("alice", {}), (None, {})])
+    assert len(store) == 0
+
+
+def test_memory_update_is_all_or_nothing():
+    store = MemoryUserStore()
+    with pytest.raises(TypeError):
+        store.update([("alice", {}), ([], {})])
+    assert len(store) == 0
+
+
+def test_log_update_is_all_or_nothing(tmp_path):
+    path = str(tmp_path / "users.log")
+    LogUserStore(path).update({f"user{i}": {} for i in range(10)})
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 20)
+    assert len(LogUserStore(path)) == 0
+
+
+def test_writes_are_seen_by_other_instances(spec):
+    first, second = open_user_store(spec), open_user_store(spec)
+    first["alice"] = {"username": "alice"}
+    assert second["alice"] == {"username": "alice"}
+    del second["alice"]
+    assert "alice" not in first
+
+
+def test_writes_from_concurrent_processes_are_kept(spec):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=add_users, args=(spec, i * 50, 50))
+               for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    store = open_user_store(spec)
+    assert len(store) == 200
+    assert store["user199"] == {"username": "user199", "age": 199}
+
+
+def test_log_compaction_keeps_users(tmp_path):
+    path = str(tmp_path / "users.log")
+    store, other = LogUserStore(path), LogUserStore(path)
+    for i in range(100):
+        store["alice"] = {"username": "alice", "age": i}
+    store["bob"] = {"username": "bob"}
+    del store["bob"]
+    store.compact()
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+    assert dict(other) == {"alice": {"username": "alice", "age": 99}}
+    other["carol"] = {"username": "carol"}
+    assert list(store) == ["alice", "carol"]
+
+
+def test_log_ignores_a_record_being_written(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = LogUserStore(path)
+    store["alice"] = {"username": "alice"}
+    with open(path, "a") as f:
+        f.write('{"op": "set", "key": "bob"')
+    assert list(LogUserStore(path)) == ["alice"]
+    with open(path, "a") as f:
+        f.write(', "value": {"username": "bob"}}\n')
+    assert store["bob"] == {"username": "bob"}
+
+
+def test_log_drops_a_record_cut_off_by_a_crash(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = LogUserStore(path)
+    store["alice"] = {"username": "alice"}
+    # A writer died half way through its record
+    with open(path, "a") as f:
+        f.write('{"op": "set", "key": "bob"')
+    store["carol"] = {"username": "carol"}
+    assert list(LogUserStore(path)) == ["alice", "carol"]
+    with open(path) as f:
+        assert all(line.endswith("}\n") for line in f)
+
+
+def test_log_skips_corrupt_records(tmp_path):
+    path = str(tmp_path / "users.log")
+    with open(path, "w") as f:
+        f.write('{"op": "set", "key": "alice", "value": {}}\n'
+                '{"op": "set", "key": "bo{"op": "clear"}\n'
+                '{"op": "set"}\n'
+                '{"op": "set", "key": "carol", "value": {}}\n')
+    assert list(LogUserStore(path)) == ["alice", "carol"]
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""Storage backends for the users of task_04_flask.py.
+
+Every backend is a mutable mapping from username to user data, so the
+API uses it exactly like the original in-memory dict:
+
+    memory          a dict, private to the process (default)
+    sqlite:PATH     an SQLite database in WAL mode
+    log:PATH        an append-only JSON lines log, replayed into memory
+
+The SQLite and log backends are shared by every process opening the same
+file, such as the workers of a gunicorn server. Every backend also lists
+usernames in sorted order from a cursor, see usernames().
+"""
+import bisect
+from collections.abc import MutableMapping
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+def _pairs(other, kwargs):
+    """Return the (key, value) pairs given to MutableMapping.update()."""
+    if hasattr(other, "keys"):
+        pairs = [(key, other[key]) for key in other.keys()]
+    else:
+        pairs = list(other)
+    return pairs + list(kwargs.items())
+
+
+class _SortedIndex:
+    """Sorted list of the keys of a mapping, for cursor pagination.
+
+    The list is only built the first time a page is requested. Keys added
+    afterwards are collected and merged in, with a single sort, when the
+    next page is requested, so filling a store costs no more than one
+    sort however many keys are added between two pages.
+    """
+
+    def __init__(self):
+        self._keys = None
+        self._added = []
+
+    def add(self, key):
+        """Index a new key."""
+        if self._keys is not None:
+            self._added.append(key)
+
+    def _merge(self):
+        """Merge the keys added since the last page into the list."""
+        if self._added:
+            # Timsort merges the sorted list and the sorted run in O(n)
+            self._added.sort()
+            self._keys += self._added
+            self._keys.sort()
+            self._added = []
+
+    def discard(self, key):
+        """Remove a key from the index, if present."""
+        if self._keys is not None:
+            self._merge()
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def reset(self):
+        """Forget every key; the index is rebuilt on next use."""
+        self._keys = None
+        self._added = []
+
+    def page(self, keys, after=None, limit=None):
+        """Return the sorted keys following a cursor.
+
+        Args:
+            keys (iterable): Every key, used to build the index if needed
+            after (str): Only return keys greater than this one
+            limit (int): Maximum number of keys, all of them if None
+
+        Returns:
+            list: The keys, sorted
+        """
+        if self._keys is None:
+            self._keys = sorted(keys)
+        self._merge()
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(self._keys, after)
+        end = len(self._keys) if limit is None else start + limit
+        return self._keys[start:end]
+
+
+class MemoryUserStore(MutableMapping):
+    """Users kept in a dict private to the process.
+
+    Changes and usernames() hold a lock, so that the sorted index stays in
+    step with the dict when requests are served by several threads.
+    """
+
+    def __init__(self):
+        self._users = {}
+        self._index = _SortedIndex()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, username):
+        return self._users[username]
+
+    def __contains__(self, username):
+        return username in self._users
+
+    def __setitem__(self, username, data):
+        with self._lock:
+            if username not in self._users:
+                self._index.add(username)
+            self._users[username] = data
+
+    def __delitem__(self, username):
+        with self._lock:
+            del self._users[username]
+            self._index.discard(username)
+
+    def __iter__(self):
+        return iter(self._users)
+
+    def __len__(self):
+        return len(self._users)
+
+    def clear(self):
+        """Remove every user."""
+        with self._lock:
+            self._users.clear()
+            self._index.reset()
+
+    def update(self, other=(), **kwargs):
+        """Set many users at once.
+
+        The users are gathered before any is set, so an invalid key
+        leaves the store unchanged.
+        """
+        added = dict(_pairs(other, kwargs))
+        with self._lock:
+            for username in added.keys() - self._users.keys():
+                self._index.add(username)
+            self._users.update(added)
+
+    def usernames(self, after=None, limit=None):
+        """Return usernames in sorted order.
+
+        Args:
+            after (str): Only return usernames greater than this one
+            limit (int): Maximum number of usernames, all of them if None
+
+        Returns:
+            list: The usernames
+        """
+        with self._lock:
+            return self._index.page(self._users, after, limit)
+
+
+class SQLiteUserStore(MutableMapping):
+    """Users stored in an SQLite table keyed by username.
+
+    Users are listed in insertion order, as with a dict, and looked up
+    through the unique index on username. Each thread (and each forked
+    process) gets its own connection; the statements are constant
+    strings, so sqlite3 prepares them once per connection and reuses them
+    from its statement cache.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the database file
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS users ("
+                         "id INTEGER PRIMARY KEY, "
+                         "username TEXT NOT NULL UNIQUE, data TEXT NOT NULL)")
+
+    def _connection(self):
+        """Return the connection of the current thread and process."""
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            conn = sqlite3.connect(self.path, timeout=5,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+            # Readers never block the writer, nor the writer readers
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, pid
+        return self._local.conn
+
+    def _transaction(self):
+        """Return a context manager running statements in a transaction."""
+        conn = self._connection()
+        return _Transaction(conn)
+
+    def __getitem__(self, username):
+        row = self._connection().execute(
+            "SELECT data FROM users WHERE username = ?",
+            (username,)).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return json.loads(row[0])
+
+    def __contains__(self, username):
+        return self._connection().execute(
+            "SELECT 1 FROM users WHERE username = ?",
+            (username,)).fetchone() is not None
+
+    # Updating in place keeps the user's position, like a dict
+    _UPSERT = ("INSERT INTO users (username, data) VALUES (?, ?) "
+               "ON CONFLICT (username) DO UPDATE SET data = excluded.data")
+
+    def __setitem__(self, username, data):
+        self._connection().execute(self._UPSERT,
+                                   (username, json.dumps(data)))
+
+    def __delitem__(self, username):
+        cursor = self._connection().execute(
+            "DELETE FROM users WHERE username = ?", (username,))
+        if cursor.rowcount == 0:
+            raise KeyError(username)
+
+    def __iter__(self):
+        cursor = self._connection().execute(
+            "SELECT username FROM users ORDER BY id")
+        return (row[0] for row in cursor)
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def clear(self):
+        """Remove every user."""
+        self._connection().execute("DELETE FROM users")
+
+    def update(self, other=(), **kwargs):
+        """Set many users at once, in a single transaction."""
+        rows = [(username, json.dumps(data))
+                for username, data in _pairs(other, kwargs)]
+        with self._transaction() as conn:
+            conn.executemany(self._UPSERT, rows)
+
+    def usernames(self, after=None, limit=None):
+        """Return usernames in sorted order, read from the username index.
+
+        Args:
+            after (str): Only return usernames greater than this one
+            limit (int): Maximum number of usernames, all of them if None
+
+        Returns:
+            list: The usernames
+        """
+        limit = -1 if limit is None else limit
+        if after is None:
+            cursor = self._connection().execute(
+                "SELECT username FROM users ORDER BY username LIMIT ?",
+                (limit,))
+        else:
+            cursor = self._connection().execute(
+                "SELECT username FROM users WHERE username > ? "
+                "ORDER BY username LIMIT ?", (after, limit))
+        return [row[0] for row in cursor]
+
+
+class _Transaction:
+    """Context manager wrapping statements in BEGIN IMMEDIATE/COMMIT."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class LogUserStore(MutableMapping):
+    """Users kept in memory and persisted to an append-only JSON lines log.
+
+    Every change is appended to the log under an exclusive file lock.
+    Before each access the store replays the records other processes
+    appended since, which only costs a stat() when nothing changed, so
+    lookups are dictionary lookups. compact() rewrites the log with one
+    record per user.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the log file
+        """
+        self.path = path
+        self._users = {}
+        self._index = _SortedIndex()
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.RLock()
+        open(self.path, "ab").close()
+        self._refresh()
+
+    def _apply(self, record):
+        """Apply one log record to the in-memory users."""
+        op = record.get("op")
+        if op == "set":
+            if record["key"] not in self._users:
+                self._index.add(record["key"])
+            self._users[record["key"]] = record["value"]
+        elif op == "del":
+            if record["key"] in self._users:
+                del self._users[record["key"]]
+                self._index.discard(record["key"])
+        elif op == "clear":
+            self._users.clear()
+            self._index.reset()
+        elif op == "batch":
+            for item in record["records"]:
+                self._apply(item)
+
+    def _refresh(self):
+        """Replay the records appended to the log since the last call."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino == self._inode and st.st_size == self._offset:
+            return
+
+        with self._lock, open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._inode:
+                # New or compacted log: replay it from the start
+                self._users, self._offset, self._inode = {}, 0, st.st_ino
+                self._index.reset()
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+            # A record still being written has no newline yet
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                if not line:
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError,
+                        AttributeError) as e:
+                    # Such as a record cut off by a crash, then followed
+                    # by the next one on the same line
+                    logger.warning("Skipping corrupt record in %s: %s",
+                                   self.path, e)
+            self._offset += end
+
+    def _truncate_partial_record(self, f):
+        """Cut off a record left without its newline by a crashed writer.
+
+        Writers hold the file lock while they write, so under the lock an
+        unterminated last line can only come from a writer that died.
+
+        Args:
+            f (file): The log, opened for appending and locked
+        """
+        size = os.fstat(f.fileno()).st_size
+        end = size
+        with open(self.path, "rb") as log:
+            while end > 0:
+                start = max(0, end - 4096)
+                log.seek(start)
+                block = log.read(end - start)
+                if end == size and block.endswith(b"\n"):
+                    return
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+        if end < size:
+            logger.warning("Truncating a partial record at the end of %s",
+                           self.path)
+            f.truncate(end)
+
+    def _append(self, records):
+        """Append records to the log and apply them.
+
+        Args:
+            records (list): Log records, written with a single write()
+        """
+        data = b"".join(json.dumps(record).encode("utf-8") + b"\n"
+                        for record in records)
+        with self._lock:
+            while True:
+                with open(self.path, "ab") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    # The log may have been compacted while we waited
+                    if os.fstat(f.fileno()).st_ino != \
+                            os.stat(self.path).st_ino:
+                        continue
+                    self._truncate_partial_record(f)
+                    self._refresh()
+                    f.write(data)
+                    f.flush()
+                    for record in records:
+                        self._apply(record)
+                    self._offset += len(data)
+                    return
+
+    def __getitem__(self, username):
+        self._refresh()
+        return self._users[username]
+
+    def __contains__(self, username):
+        self._refresh()
+        return username in self._users
+
+    def __setitem__(self, username, data):
+        self._append([{"op": "set", "key": username, "value": data}])
+
+    def __delitem__(self, username):
+        if username not in self:
+            raise KeyError(username)
+        self._append([{"op": "del", "key": username}])
+
+    def __iter__(self):
+        self._refresh()
+        return iter(list(self._users))
+
+    def __len__(self):
+        self._refresh()
+        return len(self._users)
+
+    def clear(self):
+        """Remove every user."""
+        self._append([{"op": "clear"}])
+
+    def update(self, other=(), **kwargs):
+        """Set many users at once.
+
+        The users are written as a single batch record: as a record
+        without its final newline is ignored, other processes and a
+        replay after a crash see either all of them or none.
+        """
+        records = [{"op": "set", "key": username, "value": data}
+                   for username, data in _pairs(other, kwargs)]
+        if records:
+            self._append([{"op": "batch", "records": records}])
+
+    def usernames(self, after=None, limit=None):
+        """Return usernames in sorted order.
+
+        Args:
+            after (str): Only return usernames greater than this one
+            limit (int): Maximum number of usernames, all of them if None
+
+        Returns:
+            list: The usernames
+        """
+        self._refresh()
+        with self._lock:
+            return self._index.page(self._users, after, limit)
+
+    def compact(self):
+        """Rewrite the log with a single record per current user."""
+        with self._lock, open(self.path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._refresh()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as tmp:
+                for username, data in self._users.items():
+                    tmp.write(json.dumps({"op": "set", "key": username,
+                                          "value": data}).encode("utf-8")
+                              + b"\n")
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, self.path)
+        self._refresh()
+
+
+def open_user_store(spec="memory"):
+    """Open the user store described by a backend spec.
+
+    Args:
+        spec (str): 'memory', 'sqlite:PATH' or 'log:PATH'
+
+    Returns:
+        MutableMapping: The users, keyed by username
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    backend, _, path = spec.partition(":")
+    if backend == "memory":
+        return MemoryUserStore()
+    if backend == "sqlite" and path:
+        return SQLiteUserStore(path)
+    if backend == "log" and path:
+        return LogUserStore(path)
+    raise ValueError(f"Unknown user store: {spec}")